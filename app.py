@@ -4,10 +4,14 @@ Handwritten Question Papers → Professional Print-Ready Documents
 """
 
 import streamlit as st
-import os, json, tempfile
+import os, json, uuid
+import metrics, upload_store
+from formatter import assign_ids, new_id
+from model import as_paper
 from datetime import datetime
 
 st.set_page_config(page_title="PrashnaPro", page_icon="📄", layout="wide", initial_sidebar_state="collapsed")
+metrics.start_from_env()  # /metrics endpoint when PRASHNAPRO_METRICS_PORT is set
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # DESIGN SYSTEM — Apple HIG inspired
@@ -162,9 +166,30 @@ div[data-testid="stExpander"] { border: 1px solid #e8e8ed !important; border-rad
 """, unsafe_allow_html=True)
 
 # ─── State ─────────────────────────────────────────────────────────────────────
-defaults = {"step": 0, "structured_data": None, "raw_text": None, "docx_path": None, "error": None}
+# Uploads and generated files live in the upload store; session state only holds their handles
+defaults = {"step": 0, "structured_data": None, "raw_text": None, "page_files": [], "logo_file": None,
+    "docx_file": None, "pdf_file": None, "stored_uploads": {}, "ocr_job": None, "error": None}
 for k, v in defaults.items():
     if k not in st.session_state: st.session_state[k] = v
+if "session_id" not in st.session_state: st.session_state.session_id = uuid.uuid4().hex
+# A refreshed or reconnected browser picks its running OCR job back up from the URL
+if st.session_state.step == 0 and not st.session_state.ocr_job and st.query_params.get("job"):
+    st.session_state.ocr_job = st.query_params["job"]; st.session_state.step = 2
+
+# Defined before the settings row below, whose "Start over" button calls reset_session
+def store_upload(f):
+    """Put an UploadedFile in the upload store (once per upload) and return its handle."""
+    store, seen = upload_store.uploads(), st.session_state.stored_uploads
+    fid = getattr(f, "file_id", None) or f"{f.name}:{f.size}"
+    if fid not in seen or store.path(seen[fid]) is None:
+        seen[fid] = store.put(f, os.path.splitext(f.name)[1], session_id=st.session_state.session_id)
+    return seen[fid]
+
+def reset_session():
+    """Back to step 0, deleting this session's uploads and generated files."""
+    upload_store.release_session(st.session_state.session_id)
+    for k in [k for k in st.session_state if k.startswith(("img_", "imgsrc_"))]: del st.session_state[k]
+    for k in defaults: st.session_state[k] = defaults[k]
 
 # ─── Header ───────────────────────────────────────────────────────────────────
 st.markdown("""
@@ -232,61 +257,67 @@ with _sc4:
         st.session_state.step = 3; st.rerun()
 with _sc5:
     if st.button("Start over", use_container_width=True):
-        for k in defaults: st.session_state[k] = defaults[k]
-        st.rerun()
+        if st.session_state.ocr_job:
+            from jobs import default_queue
+            default_queue().cancel(st.session_state.ocr_job); st.query_params.pop("job", None)
+        reset_session(); st.rerun()
 
 # ─── Helpers ──────────────────────────────────────────────────────────────────
+def logo_path():
+    return upload_store.uploads().path(st.session_state.get("logo_file"))
+
+def question_images(data):
+    """Attached question images: question id -> file path in the upload store."""
+    images, store = {}, upload_store.uploads()
+    for sec in data.get("sections",[]):
+        for q in sec.get("questions",[]):
+            path = store.path(st.session_state.get(f"img_{q.get('id')}"))
+            if path: images[q["id"]] = path
+    return images
+
 def render_preview(data):
-    h = '<div class="pp-paper">'
-    school = st.session_state.get("school_name","")
-    if school: h += f'<h2>{school.upper()}</h2>'
-    if data.get("exam_title"): h += f'<h3>{data["exam_title"]}</h3>'
-    ml, mr = [], []
-    if data.get("class"): ml.append(f'Class: <b>{data["class"]}</b>')
-    if data.get("subject"): ml.append(f'Subject: <b>{data["subject"]}</b>')
-    if data.get("time"): mr.append(f'Time: <b>{data["time"]}</b>')
-    if data.get("total_marks"): mr.append(f'Max Marks: <b>{data["total_marks"]}</b>')
-    if ml or mr:
-        h += f'<div class="pp-paper-meta"><span>{" &nbsp;·&nbsp; ".join(ml)}</span><span>{" &nbsp;·&nbsp; ".join(mr)}</span></div>'
-    if data.get("instructions"):
-        h += '<div style="margin:6px 0;font-size:0.76rem;color:#48484a"><b>General Instructions:</b><br>'
-        for i,ins in enumerate(data["instructions"],1): h += f'<span style="color:#636366">{i}.</span> {ins}<br>'
-        h += '</div><hr style="border:none;border-top:1px solid #e5e5ea;margin:8px 0">'
-    for si, sec in enumerate(data.get("sections",[])):
-        h += f'<div class="pp-paper-sec">{sec.get("section_name","")}</div>'
-        for qi, q in enumerate(sec.get("questions",[])):
-            m = f'<span class="pp-paper-m">[{q["marks"]}]</span>' if q.get("marks") else ''
-            h += f'<div class="pp-paper-q"><span><b>Q{q["number"]}.</b> {q["text"]}</span>{m}</div>'
-            for sp in q.get("subparts",[]): h += f'<div class="pp-paper-sp">{sp}</div>'
-            if st.session_state.get(f"img_{si}_{qi}"):
-                import base64
-                img_b64 = base64.b64encode(st.session_state[f"img_{si}_{qi}"]).decode()
-                h += f'<div style="margin:6px 0 6px 20px;"><img src="data:image/png;base64,{img_b64}" style="max-width:60%;max-height:180px;border-radius:4px;border:1px solid #e5e5ea;"/></div>'
-    h += '<hr style="border:none;border-top:1px solid #e5e5ea;margin:10px 0">'
-    h += '<div style="text-align:center;color:#aeaeb2;font-size:0.72rem;font-style:italic">End of Question Paper</div></div>'
-    return h
+    from preview import render_preview as paper_preview
+    with metrics.span("app.preview"):
+        return paper_preview(data, st.session_state.get("school_name",""), question_images(data))
+
+def paper_style_for(data, paper=None):
+    """The style to render with: the compact/normal default, or tightened to fit the page target."""
+    from layout import fit_to_pages
+    target = st.session_state.get("fit_pages", 0)
+    if not target: return None
+    return fit_to_pages(paper or data, target, school_name=st.session_state.get("school_name",""),
+        logo_path=logo_path(), compact=compact_mode, question_images=question_images(data))
+
+def page_estimate(data):
+    from layout import estimate_layout
+    opts = dict(school_name=st.session_state.get("school_name",""),
+        logo_path=logo_path(), question_images=question_images(data))
+    with metrics.span("app.estimate"):
+        paper = as_paper(data)  # parsed once for both estimates and the fit search
+        compact, normal = estimate_layout(paper, compact=True, **opts), estimate_layout(paper, compact=False, **opts)
+        h = f'≈ <b>{compact.pages}</b> pages compact · <b>{normal.pages}</b> normal'
+        target = st.session_state.get("fit_pages", 0)
+        if target:
+            style = paper_style_for(data, paper)
+            h += f' · fits in {target}' if style else f' · <span style="color:#ff3b30">cannot fit in {target}</span>'
+    return f'<div style="font-size:0.78rem;color:#636366;margin:2px 0 6px">{h}</div>'
 
 def generate_docx(data):
     from formatter import create_question_paper, generate_filename
-    td = tempfile.mkdtemp(); fn = generate_filename(data); op = os.path.join(td, fn)
-    lp = None
-    if st.session_state.get("logo_file"):
-        lp = os.path.join(td,"logo.png")
-        with open(lp,'wb') as f: f.write(st.session_state.logo_file.getbuffer())
-    
-    # Collect question images: dict of "si_qi" -> image_path
-    q_images = {}
-    for si, sec in enumerate(data.get("sections", [])):
-        for qi, q in enumerate(sec.get("questions", [])):
-            img_data = st.session_state.get(f"img_{si}_{qi}")
-            if img_data:
-                img_path = os.path.join(td, f"qimg_{si}_{qi}.png")
-                with open(img_path, 'wb') as f: f.write(img_data)
-                q_images[f"{si}_{qi}"] = img_path
-    
-    create_question_paper(data, op, school_name=st.session_state.get("school_name",""),
-        logo_path=lp, compact=compact_mode, question_images=q_images)
-    st.session_state.docx_path = op; st.session_state.docx_filename = fn
+    from pdf_writer import pdf_available, create_question_paper_pdf
+    out, sid = upload_store.outputs(), st.session_state.session_id
+    # One trace per generated paper: cache/traces/<id>.json (see metrics.py)
+    with metrics.trace("generate_paper", session=sid):
+        # Logo and question images are read from the upload store: question id -> path
+        q_images, paper = question_images(data), as_paper(data)
+        opts = dict(school_name=st.session_state.get("school_name",""),
+            logo_path=logo_path(), compact=compact_mode, question_images=q_images,
+            style=paper_style_for(data, paper))
+        st.session_state.docx_file = out.put(create_question_paper(paper, **opts), ".docx", session_id=sid)
+        st.session_state.docx_filename = generate_filename(paper)
+        # PDF alongside the .docx when reportlab is installed
+        st.session_state.pdf_file = (out.put(create_question_paper_pdf(paper, **opts), ".pdf", session_id=sid)
+            if pdf_available() else None)
 
 def hindi_tool():
     st.markdown('<div class="pp-hindi-bar">Type in English, press <b>Space</b> to convert each word. Use arrow keys to pick alternatives.</div>', unsafe_allow_html=True)
@@ -363,7 +394,7 @@ if st.session_state.step == 0:
         cols = st.columns(min(len(files),5))
         for i,(c,f) in enumerate(zip(cols,files)):
             with c: st.image(f, caption=f"Page {i+1}", use_container_width=True)
-        st.session_state.uploaded_files = files
+        st.session_state.page_files = [store_upload(f) for f in files]
         if st.button("Continue", type="primary", use_container_width=True):
             st.session_state.step = 1; st.rerun()
 
@@ -381,14 +412,14 @@ elif st.session_state.step == 1:
         su = st.text_input("Subject", value=st.session_state.get("subject",""))
         logo = st.file_uploader("School logo", type=["jpg","jpeg","png"])
     st.session_state.school_name = sn; st.session_state.class_name = cn; st.session_state.subject = su
-    if logo: st.session_state.logo_file = logo
+    if logo: st.session_state.logo_file = store_upload(logo)
     c1, c2 = st.columns(2)
     with c1:
         if st.button("Back", use_container_width=True): st.session_state.step = 0; st.rerun()
     with c2:
         if st.button("Generate", type="primary", use_container_width=True):
             if not api_key: st.error("Enter your OpenAI API key in the sidebar.")
-            elif not getattr(st.session_state,'uploaded_files',None): st.error("Upload images first.")
+            elif not st.session_state.page_files: st.error("Upload images first.")
             else: st.session_state.step = 2; st.rerun()
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -396,37 +427,74 @@ elif st.session_state.step == 1:
 # ═══════════════════════════════════════════════════════════════════════════════
 elif st.session_state.step == 2:
     st.markdown("#### Reading your paper…")
-    from ocr import process_images_to_structured
-    prog = st.progress(0); stat = st.empty()
-    try:
-        stat.caption("Preparing images…"); prog.progress(10)
-        td = tempfile.mkdtemp(); paths = []
-        for i,f in enumerate(st.session_state.uploaded_files):
-            p = os.path.join(td,f"page_{i+1}.{f.name.split('.')[-1]}")
-            with open(p,'wb') as fh: fh.write(f.getbuffer())
-            paths.append(p)
-        stat.caption("Extracting text with GPT-4o Vision…"); prog.progress(25)
-        data, raw = process_images_to_structured(paths, api_key, model_name=model_choice)
-        prog.progress(80)
+    from jobs import default_queue, DONE, FAILED, CANCELLED
+    import time
+    queue = default_queue()
+    prog = st.progress(0); stat = st.empty(); live = st.empty()
+    if not st.session_state.get("ocr_job"):
+        paths = [upload_store.uploads().path(h) for h in st.session_state.page_files]
+        if not paths or None in paths:
+            st.error("The uploaded pages have expired. Please upload them again.")
+            if st.button("Upload again", use_container_width=True): reset_session(); st.rerun()
+            st.stop()
+        # OCR runs in the background job pool straight from the upload store; this script only polls
+        with metrics.span("app.submit", pages=len(paths)):
+            st.session_state.ocr_job = queue.submit(paths, api_key, model_name=model_choice,
+                per_page=len(paths) > 1, session_id=st.session_state.session_id)
+        st.query_params["job"] = st.session_state.ocr_job
+    job = queue.get(st.session_state.ocr_job)
+    if job is not None and job.status == DONE:
+        data, raw = job.result["structured"], job.result["raw_text"]
+        st.session_state.image_stats = job.result.get("image_stats", [])
         if st.session_state.get("class_name"): data["class"] = st.session_state.class_name
         if st.session_state.get("subject"): data["subject"] = st.session_state.subject
-        st.session_state.structured_data = data; st.session_state.raw_text = raw
+        st.session_state.structured_data = assign_ids(data); st.session_state.raw_text = raw
+        st.session_state.ocr_job = None; st.query_params.pop("job", None)
         prog.progress(100); st.session_state.step = 3; st.rerun()
-    except Exception as e:
-        prog.progress(0); stat.empty(); st.error(f"Something went wrong: {e}")
-        if st.button("Try again", use_container_width=True): st.session_state.step = 1; st.rerun()
+    elif job is None or job.status in (FAILED, CANCELLED):
+        if job is None: st.error("This job is no longer available. Please upload the paper again.")
+        elif job.error_type == "RateLimitError": st.error("OpenAI is busy right now (rate limit reached). Please try again in a minute.")
+        else: st.error(f"Something went wrong: {job.error or 'the job was cancelled'}")
+        if st.button("Try again", use_container_width=True):
+            st.session_state.ocr_job = None; st.query_params.pop("job", None)
+            st.session_state.step = 1; st.rerun()
+    else:
+        pr = job.progress; n_pages = max(1, pr.get("n_pages", 1)); pages_done = min(pr.get("pages_done", 0), n_pages)
+        if pr.get("stage") == "queued":
+            prog.progress(5); stat.caption("Waiting for a free worker…")
+        elif pr.get("stage") == "ocr":
+            prog.progress(5 + int(65 * pages_done / n_pages))
+            stat.caption(f"Extracting text with GPT-4o Vision… {pages_done} of {n_pages} pages")
+            page_text = pr.get("page_text", {})
+            if page_text:
+                live.code("\n\n".join(f"--- Page {p} ---\n{t}" if p != "0" else t
+                    for p, t in sorted(page_text.items(), key=lambda kv: int(kv[0]))), language=None)
+        else:
+            raw = pr.get("raw_text", "")
+            prog.progress(70 + int(25 * min(1.0, pr.get("json_chars", 0) / max(1, len(raw) * 1.5))))
+            sec = pr.get("section")
+            stat.caption(f"Organising questions and sections… found {sec['name'] or 'a section'} ({sec['questions']} questions)"
+                if sec else "Organising questions and sections…")
+            live.code(raw, language=None)
+        time.sleep(0.4); st.rerun()
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # STEP 3 — Edit & Fix
 # ═══════════════════════════════════════════════════════════════════════════════
 elif st.session_state.step == 3:
     data = st.session_state.structured_data
+    if data: assign_ids(data)
     if not data:
         st.error("No data found.")
         if st.button("Back"): st.session_state.step = 1; st.rerun()
     else:
         st.markdown("#### Review and edit")
         st.caption("Fix any mistakes. Refresh the preview after making changes.")
+        if st.session_state.get("image_stats"):
+            from imaging import format_bytes
+            _orig = sum(s["original_bytes"] for s in st.session_state.image_stats)
+            _sent = sum(s["encoded_bytes"] for s in st.session_state.image_stats)
+            st.caption(f"Photos compressed {format_bytes(_orig)} → {format_bytes(_sent)} before upload.")
 
         ed, pv = st.columns([3, 2], gap="medium")
 
@@ -453,41 +521,45 @@ elif st.session_state.step == 3:
             # ── Sections ──
             st.markdown("###### Sections and questions")
             sections = data.get("sections",[]); sdel = []
+            # Widgets are keyed by section/question id, so deleting one leaves the others' state alone
             for si,sec in enumerate(sections):
+                sid = sec["id"]
                 st.markdown(f'<div class="pp-sec">{sec.get("section_name",f"Section {si+1}")}</div>', unsafe_allow_html=True)
                 sc1,sc2 = st.columns([5,1])
                 with sc1:
-                    sec["section_name"] = st.text_input(f"s{si}", value=sec.get("section_name",""),
-                        key=f"sn_{si}", label_visibility="collapsed", placeholder="Section name")
+                    sec["section_name"] = st.text_input(f"s{sid}", value=sec.get("section_name",""),
+                        key=f"sn_{sid}", label_visibility="collapsed", placeholder="Section name")
                 with sc2:
-                    if st.button("Delete", key=f"ds_{si}"): sdel.append(si)
+                    if st.button("Delete", key=f"ds_{sid}"): sdel.append(si)
 
                 qs = sec.get("questions",[]); qdel = []
                 for qi,q in enumerate(qs):
+                    qid = q["id"]
                     st.markdown('<div class="pp-qcard">', unsafe_allow_html=True)
                     r1,r2,r3 = st.columns([1.2,1.2,1])
-                    with r1: q["number"] = st.text_input("Q#", value=q.get("number",""), key=f"qn_{si}_{qi}")
-                    with r2: q["marks"] = st.text_input("Marks", value=q.get("marks",""), key=f"qm_{si}_{qi}")
+                    with r1: q["number"] = st.text_input("Q#", value=q.get("number",""), key=f"qn_{qid}")
+                    with r2: q["marks"] = st.text_input("Marks", value=q.get("marks",""), key=f"qm_{qid}")
                     with r3:
                         st.write("")
-                        if st.button(f"Delete Q{q.get('number','')}", key=f"dq_{si}_{qi}"): qdel.append(qi)
-                    q["text"] = st.text_area(f"q{si}{qi}", value=q.get("text",""), key=f"qt_{si}_{qi}",
+                        if st.button(f"Delete Q{q.get('number','')}", key=f"dq_{qid}"): qdel.append(qi)
+                    q["text"] = st.text_area(f"q{qid}", value=q.get("text",""), key=f"qt_{qid}",
                         height=70, label_visibility="collapsed", placeholder="Question text…")
                     subs = q.get("subparts",[])
                     if subs:
                         st.caption("One option per line. For match-the-following use Tab between columns.")
-                        sv = st.text_area(f"sp{si}{qi}", value="\n".join(subs), key=f"qs_{si}_{qi}",
+                        sv = st.text_area(f"sp{qid}", value="\n".join(subs), key=f"qs_{qid}",
                             height=max(45,min(len(subs)*24,150)), label_visibility="collapsed")
                         q["subparts"] = [l for l in sv.split("\n") if l.strip()]
-                        if st.button("Remove options", key=f"rs_{si}_{qi}"): q["subparts"]=[]; st.rerun()
+                        if st.button("Remove options", key=f"rs_{qid}"): q["subparts"]=[]; st.rerun()
                     else:
-                        if st.button("Add options", key=f"as_{si}_{qi}"):
+                        if st.button("Add options", key=f"as_{qid}"):
                             q["subparts"]=["(a) ","(b) ","(c) ","(d) "]; st.rerun()
 
                     # ── Image attachment ──
-                    img_key = f"qimg_{si}_{qi}"
-                    state_img_key = f"img_{si}_{qi}"
-                    has_img = st.session_state.get(state_img_key) is not None
+                    img_key = f"qimg_{qid}"
+                    state_img_key = f"img_{qid}"
+                    img_path = upload_store.uploads().path(st.session_state.get(state_img_key))
+                    has_img = img_path is not None
                     
                     ic1, ic2 = st.columns([3, 1])
                     with ic1:
@@ -498,35 +570,39 @@ elif st.session_state.step == 3:
                             label_visibility="collapsed",
                             help="Attach a photo of diagram, graph, map, or figure for this question"
                         )
-                        if img_file:
-                            st.session_state[state_img_key] = img_file.getvalue()
+                        # Store each upload once; a removed image stays removed while the widget still holds it
+                        img_id = getattr(img_file, "file_id", None) or (img_file and f"{img_file.name}:{img_file.size}")
+                        if img_file and st.session_state.get(f"imgsrc_{qid}") != img_id:
+                            st.session_state[f"imgsrc_{qid}"] = img_id
+                            st.session_state[state_img_key] = store_upload(img_file); st.rerun()
                         if not has_img:
                             st.caption("Tip: Crop the image on your phone before uploading for best fit.")
-                        if img_file:
-                            st.session_state[state_img_key] = img_file.getvalue()
                     with ic2:
                         if has_img:
-                            st.image(st.session_state[state_img_key], width=80)
-                            if st.button("✕", key=f"rmimg_{si}_{qi}", help="Remove image"):
+                            st.image(img_path, width=80)
+                            if st.button("✕", key=f"rmimg_{qid}", help="Remove image"):
                                 st.session_state[state_img_key] = None; st.rerun()
                         else:
                             st.caption("📎 No image")
                     st.markdown('</div>', unsafe_allow_html=True)
                 for qi in sorted(qdel, reverse=True): qs.pop(qi)
                 if qdel: st.rerun()
-                if st.button("Add question", key=f"aq_{si}"):
+                if st.button("Add question", key=f"aq_{sid}"):
                     n = str(int(qs[-1]["number"])+1) if qs and qs[-1].get("number","").isdigit() else str(len(qs)+1)
-                    qs.append({"number":n,"text":"","marks":"","subparts":[]}); st.rerun()
+                    qs.append({"id":new_id(),"number":n,"text":"","marks":"","subparts":[]}); st.rerun()
 
             for si in sorted(sdel, reverse=True): sections.pop(si)
             if sdel: st.rerun()
             if st.button("Add section"):
-                sections.append({"section_name":f"Section {chr(65+len(sections))}","questions":[]}); st.rerun()
+                sections.append({"id":new_id(),"section_name":f"Section {chr(65+len(sections))}","questions":[]}); st.rerun()
             data["sections"] = sections; st.session_state.structured_data = data
 
         with pv:
             st.markdown("###### Preview")
             if st.button("Refresh preview", use_container_width=True): st.rerun()
+            st.number_input("Fit to pages", min_value=0, max_value=20, step=1, key="fit_pages",
+                help="Tighten spacing and font sizes until the paper fits this many A4 pages (0 = off)")
+            st.markdown(page_estimate(data), unsafe_allow_html=True)
             st.markdown(render_preview(data), unsafe_allow_html=True)
 
         st.markdown("---")
@@ -549,14 +625,24 @@ elif st.session_state.step == 4:
         <p>Download the formatted document below.</p>
     </div>
     """, unsafe_allow_html=True)
-    if st.session_state.docx_path and os.path.exists(st.session_state.docx_path):
-        with open(st.session_state.docx_path,"rb") as f: db = f.read()
+    out = upload_store.outputs()
+    db = out.read(st.session_state.docx_file) if st.session_state.docx_file else None
+    if db:
         fn = st.session_state.get("docx_filename","Question_Paper.docx")
         c1,c2,c3 = st.columns([1,2,1])
         with c2:
             st.download_button(f"Download {fn}", data=db, file_name=fn,
                 mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
                 use_container_width=True, type="primary")
+            pdf = out.read(st.session_state.pdf_file) if st.session_state.pdf_file else None
+            if pdf:
+                pfn = os.path.splitext(fn)[0] + ".pdf"
+                st.download_button(f"Download {pfn}", data=pdf, file_name=pfn,
+                    mime="application/pdf", use_container_width=True)
+                from pdf_writer import devanagari_font_missing
+                if devanagari_font_missing(st.session_state.structured_data, st.session_state.get("school_name","")):
+                    st.warning("No Devanagari font is installed on this server, so Hindi text in the PDF will show "
+                        "as empty boxes. The .docx is not affected. See \"PDF export\" in the README.")
         st.markdown("---")
         st.markdown("###### Preview")
         st.markdown(render_preview(st.session_state.structured_data), unsafe_allow_html=True)
@@ -566,8 +652,8 @@ elif st.session_state.step == 4:
             if st.button("Back to edit", use_container_width=True): st.session_state.step = 3; st.rerun()
         with c2:
             if st.button("New paper", type="primary", use_container_width=True):
-                for k in defaults: st.session_state[k] = defaults[k]
-                st.rerun()
+                reset_session(); st.rerun()
     else:
-        st.error("File not found.")
+        st.error("The document has expired. Please generate it again." if st.session_state.docx_file
+            else "No document generated yet.")
         if st.button("Back"): st.session_state.step = 3; st.rerun()
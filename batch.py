@@ -0,0 +1,176 @@
+"""
+Batch conversion of many papers without Streamlit.
+
+Each subfolder of the input directory is one paper; its images are the
+pages in natural filename order. Every paper goes through
+process_images_to_structured -> create_question_paper and is written to
+the output directory as <folder>.docx, next to <folder>.json with the
+structured data (and <folder>.pdf with --pdf). Papers that already have a
+.docx are skipped, so an interrupted run can simply be started again.
+
+Usage:
+    python batch.py papers/ --workers 8
+    python batch.py papers/ --output output/ --school-name "Delhi Public School" --logo logo.png
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from clients import close_clients
+from formatter import BACKENDS, create_question_paper
+from ocr import process_images_to_structured
+from pdf_writer import create_question_paper_pdf, pdf_available
+
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+DEFAULT_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "output")
+
+
+def natural_key(name: str) -> list:
+    """Sort key so page_2 comes before page_10."""
+    return [int(t) if t.isdigit() else t.lower() for t in re.split(r"(\d+)", name)]
+
+
+def find_papers(input_dir: str) -> list:
+    """Return [(paper_name, [image_paths])] for every subfolder containing images."""
+    papers = []
+    for name in sorted(os.listdir(input_dir), key=natural_key):
+        folder = os.path.join(input_dir, name)
+        if not os.path.isdir(folder):
+            continue
+        images = [
+            os.path.join(folder, f) for f in sorted(os.listdir(folder), key=natural_key)
+            if os.path.splitext(f)[1].lower() in IMAGE_EXTENSIONS
+        ]
+        if images:
+            papers.append((name, images))
+    return papers
+
+
+def convert_paper(name: str, image_paths: list, args) -> dict:
+    """OCR, structure and render one paper. Returns a result record."""
+    started = time.perf_counter()
+    docx_path = os.path.join(args.output, f"{name}.docx")
+    json_path = os.path.join(args.output, f"{name}.json")
+
+    data, raw_text = process_images_to_structured(
+        image_paths, args.api_key, model_name=args.model,
+        per_page=args.per_page, base_url=args.base_url, single_call=args.single_call,
+    )
+    ocr_done = time.perf_counter()
+
+    tmp_json = json_path + ".part"
+    with open(tmp_json, "w", encoding="utf-8") as f:
+        json.dump({"structured_data": data, "raw_text": raw_text}, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_json, json_path)
+
+    # Render to a temporary name so an interrupted save never looks finished
+    tmp_docx = docx_path + ".part"
+    create_question_paper(
+        data, tmp_docx, school_name=args.school_name,
+        logo_path=args.logo, compact=not args.normal, backend=args.backend,
+    )
+    os.replace(tmp_docx, docx_path)
+
+    if args.pdf:
+        pdf_path = os.path.join(args.output, f"{name}.pdf")
+        create_question_paper_pdf(data, pdf_path + ".part", school_name=args.school_name,
+                                  logo_path=args.logo, compact=not args.normal)
+        os.replace(pdf_path + ".part", pdf_path)
+
+    return {
+        "paper": name,
+        "pages": len(image_paths),
+        "ocr_seconds": ocr_done - started,
+        "render_seconds": time.perf_counter() - ocr_done,
+        "seconds": time.perf_counter() - started,
+        "output": docx_path,
+    }
+
+
+def run(args) -> int:
+    papers = find_papers(args.input)
+    if not papers:
+        print(f"No paper folders with images found in {args.input}")
+        return 1
+    os.makedirs(args.output, exist_ok=True)
+
+    todo, skipped = [], 0
+    for name, images in papers:
+        if not args.force and os.path.exists(os.path.join(args.output, f"{name}.docx")):
+            skipped += 1
+        else:
+            todo.append((name, images))
+    print(f"{len(papers)} papers found, {skipped} already done, {len(todo)} to convert "
+          f"with {args.workers} workers")
+
+    done, failed, pages = [], [], 0
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(convert_paper, name, images, args): name for name, images in todo}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                failed.append(name)
+                print(f"  FAILED {name}: {e}", file=sys.stderr)
+                continue
+            done.append(result)
+            pages += result["pages"]
+            elapsed = time.perf_counter() - started
+            print(f"  [{len(done) + len(failed)}/{len(todo)}] {name}: {result['pages']} pages in "
+                  f"{result['seconds']:.1f}s ({len(done) / elapsed * 60:.1f} papers/min)")
+
+    close_clients()
+
+    elapsed = time.perf_counter() - started
+    print()
+    print(f"Converted {len(done)} papers ({pages} pages) in {elapsed:.1f}s, {len(failed)} failed")
+    if done:
+        print(f"Throughput: {len(done) / elapsed * 60:.1f} papers/min, {pages / elapsed:.2f} pages/s")
+        print(f"Mean per paper: OCR {sum(r['ocr_seconds'] for r in done) / len(done):.1f}s, "
+              f"render {sum(r['render_seconds'] for r in done) / len(done):.2f}s")
+    return 1 if failed else 0
+
+
+def parse_args(argv: list):
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+    p = argparse.ArgumentParser(description="Convert a folder of handwritten papers to .docx")
+    p.add_argument("input", help="Folder with one subfolder of page images per paper")
+    p.add_argument("--output", default=DEFAULT_OUTPUT_DIR, help="Where to write .docx files (default: output/)")
+    p.add_argument("--workers", type=int, default=4, help="Papers processed in parallel (default: 4)")
+    p.add_argument("--model", default="gpt-4o")
+    p.add_argument("--api-key", default=os.environ.get("OPENAI_API_KEY"), help="Defaults to $OPENAI_API_KEY")
+    p.add_argument("--base-url", default=os.environ.get("OPENAI_BASE_URL"), help="OpenAI-compatible server URL")
+    p.add_argument("--per-page", action="store_true", help="OCR each page in its own parallel request")
+    p.add_argument("--single-call", action="store_true",
+                   help="OCR and structure in one structured-outputs request")
+    p.add_argument("--school-name", default="")
+    p.add_argument("--logo", default=None, help="School logo image")
+    p.add_argument("--normal", action="store_true", help="Normal spacing instead of compact mode")
+    p.add_argument("--backend", choices=BACKENDS, default="python-docx",
+                   help="docx renderer; 'stream' writes the XML directly (much faster)")
+    p.add_argument("--pdf", action="store_true", help="Also write a PDF of each paper (needs reportlab)")
+    p.add_argument("--force", action="store_true", help="Reconvert papers that already have a .docx")
+    args = p.parse_args(argv)
+    if not args.api_key:
+        p.error("No API key: pass --api-key or set OPENAI_API_KEY")
+    if args.pdf and not pdf_available():
+        p.error("--pdf needs reportlab: pip install reportlab")
+    return args
+
+
+if __name__ == "__main__":
+    sys.exit(run(parse_args(sys.argv[1:])))
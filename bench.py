@@ -0,0 +1,543 @@
+"""
+Benchmarks for PrashnaPro.
+OCR benchmarks run against a local fake OpenAI-compatible server that
+simulates model latency (time to first token + output tokens per second),
+so they are repeatable and cost nothing.
+
+Usage:
+    python bench.py ocr-modes [--papers 2] [--ttft 0.6] [--tps 80]
+    python bench.py oxml [--papers 20]
+    python bench.py render-backends [--papers 20]
+    python bench.py render-pool [--papers 16]
+    python bench.py render-pdf [--papers 20]
+    python bench.py preview [--papers 50]
+    python bench.py layout [--papers 50]
+    python bench.py model [--papers 50]
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# ─── Fixtures ──────────────────────────────────────────────────────────────────
+
+def fixture_pages(paper_no: int, pages: int = 2, questions_per_page: int = 6) -> list:
+    """Deterministic synthetic transcripts, one string per page."""
+    out = []
+    q = 1
+    for page in range(1, pages + 1):
+        lines = []
+        if page == 1:
+            lines += [
+                f"Unit Test {paper_no} 2024-25",
+                "Class: IX    Subject: Science",
+                "Time: 1 Hour    Max. Marks: 40",
+                "General Instructions:",
+                "1. All questions are compulsory.",
+                "2. Draw neat diagrams wherever required.",
+            ]
+        lines.append(f"Section {chr(64 + page)}")
+        for _ in range(questions_per_page):
+            if q % 3 == 0:
+                lines.append(f"Q{q}. Which of the following is a property of matter number {q}? [1]")
+                lines += ["(a) It has mass", "(b) It occupies space", "(c) Both (a) and (b)", "(d) None of these"]
+            else:
+                lines.append(f"Q{q}. Explain with an example the process described in chapter {q} "
+                             f"and state two of its applications in daily life. [{q % 5 + 1}]")
+            q += 1
+        out.append("\n".join(lines))
+    return out
+
+
+def make_fixture_images(directory: str, papers: int) -> list:
+    """Write one small distinct image per fixture page. Returns [(image_paths, page_texts)]."""
+    from PIL import Image as PILImage, ImageDraw
+
+    fixtures = []
+    for p in range(1, papers + 1):
+        texts = fixture_pages(p)
+        paths = []
+        for i, text in enumerate(texts, 1):
+            img = PILImage.new("RGB", (1200, 1600), "white")
+            ImageDraw.Draw(img).multiline_text((40, 40), text, fill="black")
+            path = os.path.join(directory, f"paper{p}_page{i}.jpg")
+            img.save(path, quality=90)
+            paths.append(path)
+        fixtures.append((paths, texts))
+    return fixtures
+
+
+def fixture_paper(mcqs: int = 20, matches: int = 5, rows: int = 5) -> dict:
+    """Structured data for a paper heavy on option grids and match-the-following tables."""
+    questions = []
+    for i in range(1, mcqs + 1):
+        questions.append({"number": str(i), "text": f"Which of the following is true about topic {i}?",
+                          "marks": "1", "subparts": ["(a) first", "(b) second", "(c) third", "(d) fourth"]})
+    for i in range(1, matches + 1):
+        questions.append({"number": str(mcqs + i), "text": "Match the following:", "marks": str(rows),
+                          "subparts": [f"{chr(64 + r)}. term {r}\t{r}. definition {r}" for r in range(1, rows + 1)]})
+    return {
+        "school_name": "Bench Public School", "exam_title": "Periodic Test", "class": "X",
+        "subject": "Science", "time": "2 Hours", "total_marks": "80",
+        "instructions": ["All questions are compulsory."],
+        "sections": [{"section_name": "Section A", "questions": questions}],
+    }
+
+
+# ─── Fake OpenAI-compatible server ─────────────────────────────────────────────
+
+class FakeOpenAIServer:
+    """
+    Minimal /v1/chat/completions server. Page images are mapped to known
+    transcripts by the hash of their base64 payload; structuring requests
+    are answered with rule_structurer output. Each reply is delayed by
+    ttft + output_tokens / tps to mimic a real model.
+    """
+
+    def __init__(self, ttft: float = 0.6, tps: float = 80.0):
+        self.ttft = ttft
+        self.tps = tps
+        self.pages = {}
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length))
+                server.requests += 1
+                text = server.reply(body)
+                time.sleep(server.ttft + len(text) / 4 / server.tps)
+                payload = json.dumps({
+                    "id": "chatcmpl-fake", "object": "chat.completion", "created": 0,
+                    "model": body.get("model", "fake"),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": text}}],
+                    "usage": {"prompt_tokens": 1000, "completion_tokens": len(text) // 4,
+                              "total_tokens": 1000 + len(text) // 4},
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}/v1"
+
+    def register_page(self, image_path: str, text: str) -> None:
+        """Make image_path (as encode_image will send it) OCR to text."""
+        from ocr import encode_image
+        b64 = encode_image(image_path)[0]
+        self.pages[hashlib.sha256(b64.encode()).hexdigest()] = text
+
+    def _page_texts(self, content: list) -> list:
+        texts = []
+        for part in content:
+            if part.get("type") == "image_url":
+                b64 = part["image_url"]["url"].split(",", 1)[1]
+                texts.append(self.pages.get(hashlib.sha256(b64.encode()).hexdigest(), "[unclear]"))
+        return texts
+
+    def reply(self, body: dict) -> str:
+        from ocr import merge_pages
+        from rule_structurer import structure_text_locally
+
+        content = body["messages"][-1]["content"]
+        if isinstance(content, list):
+            texts = self._page_texts(content)
+            transcript = merge_pages(texts) if len(texts) > 1 else texts[0]
+            if body.get("response_format", {}).get("type") == "json_schema":
+                structured = structure_text_locally(transcript)[0]
+                return json.dumps({"transcript": transcript, **structured}, ensure_ascii=False)
+            return transcript
+        raw = content.split("Here is the raw OCR text:", 1)[-1].rsplit("Return ONLY the JSON object:", 1)[0]
+        return json.dumps(structure_text_locally(raw.strip())[0], ensure_ascii=False)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+# ─── Benchmarks ────────────────────────────────────────────────────────────────
+
+def _summary(times: list) -> str:
+    return (f"mean {statistics.mean(times):6.2f}s  median {statistics.median(times):6.2f}s  "
+            f"max {max(times):6.2f}s")
+
+
+def bench_ocr_modes(args) -> None:
+    """Two-step (vision -> text -> JSON) vs single structured-outputs call, per paper."""
+    from ocr import process_images_to_structured
+    from scheduler import configure_scheduler
+
+    # The fake server has no quota; keep the scheduler from throttling the run
+    configure_scheduler("sk-fake", rpm=10**6, tpm=10**9)
+
+    with tempfile.TemporaryDirectory() as tmp, FakeOpenAIServer(args.ttft, args.tps) as server:
+        fixtures = make_fixture_images(tmp, args.papers)
+        for paths, texts in fixtures:
+            for path, text in zip(paths, texts):
+                server.register_page(path, text)
+
+        modes = [
+            ("two-step (LLM structuring)", dict(fast_path=False)),
+            ("two-step (rule fast path)", dict(fast_path=True)),
+            ("two-step per-page", dict(fast_path=False, per_page=True)),
+            ("single call (json_schema)", dict(single_call=True)),
+        ]
+        print(f"{args.papers} papers x {len(fixtures[0][0])} pages, "
+              f"fake model ttft={args.ttft}s, {args.tps} tokens/s\n")
+        baseline = None
+        for label, options in modes:
+            times, questions = [], 0
+            for paths, _ in fixtures:
+                started = time.perf_counter()
+                data, _raw = process_images_to_structured(
+                    paths, "sk-fake", base_url=server.base_url, use_cache=False, **options
+                )
+                times.append(time.perf_counter() - started)
+                questions += sum(len(s["questions"]) for s in data["sections"])
+            baseline = baseline or statistics.mean(times)
+            print(f"  {label:<28} {_summary(times)}  "
+                  f"x{baseline / statistics.mean(times):4.2f}  ({questions} questions)")
+
+
+def _set_cell_border_uncached(cell, **kwargs):
+    """set_cell_border as it was before fragment caching: one lxml parse per edge."""
+    from docx.oxml import parse_xml
+    from docx.oxml.ns import nsdecls
+
+    tcPr = cell._tc.get_or_add_tcPr()
+    tcBorders = parse_xml(f'<w:tcBorders {nsdecls("w")}></w:tcBorders>')
+    for edge, attrs in kwargs.items():
+        tcBorders.append(parse_xml(
+            f'<w:{edge} {nsdecls("w")} w:val="single" w:sz="{attrs.get("sz", 4)}" '
+            f'w:space="0" w:color="{attrs.get("color", "000000")}"/>'
+        ))
+    tcPr.append(tcBorders)
+
+
+def bench_oxml(args) -> None:
+    """Table border XML per paper: parse per edge vs cached fragments vs one pass per table."""
+    from docx import Document
+    import formatter
+
+    data = fixture_paper()
+    shapes = [(2, 2)] * 20 + [(5, 2)] * 5 + [(1, 2), (2, 2)]  # option grids, match tables, header, meta
+    edges = {edge: formatter.LIGHT_BORDER for edge in ("top", "bottom", "left", "right")}
+
+    def per_cell(set_border):
+        def style(doc):
+            for rows, cols in shapes:
+                table = doc.add_table(rows=rows, cols=cols)
+                for row in table.rows:
+                    for cell in row.cells:
+                        set_border(cell, **edges)
+        return style
+
+    def per_table(doc):
+        for rows, cols in shapes:
+            formatter.set_table_borders(doc.add_table(rows=rows, cols=cols), **formatter.all_edges(formatter.LIGHT_BORDER))
+
+    def no_borders(doc):
+        for rows, cols in shapes:
+            doc.add_table(rows=rows, cols=cols)
+
+    def timed(fn) -> float:
+        times = []
+        for _ in range(args.papers):
+            doc = Document()
+            started = time.perf_counter()
+            fn(doc)
+            times.append(time.perf_counter() - started)
+        return statistics.mean(times)
+
+    cells = sum(r * c for r, c in shapes)
+    print(f"{len(shapes)} tables, {cells} cells per paper, mean of {args.papers} papers\n")
+    base = timed(no_borders)
+    rows = [
+        ("parse per edge (before)", timed(per_cell(_set_cell_border_uncached))),
+        ("cached fragment per cell", timed(per_cell(formatter.set_cell_border))),
+        ("one pass per table", timed(per_table)),
+    ]
+    before = rows[0][1] - base
+    for label, t in rows:
+        print(f"  {label:<26} {(t - base) * 1000:7.2f} ms/paper on top of table creation  "
+              f"x{before / max(t - base, 1e-9):5.1f}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "paper.docx")
+        formatter.create_question_paper(data, path)
+        times = []
+        for _ in range(args.papers):
+            started = time.perf_counter()
+            formatter.create_question_paper(data, path)
+            times.append(time.perf_counter() - started)
+    print(f"\n  full create_question_paper   {statistics.mean(times) * 1000:7.2f} ms/paper")
+
+
+# ru_maxrss survives fork/exec on Linux, so read the fresh process's own VmHWM instead
+_RSS_SCRIPT = """
+import os, re, sys, tempfile
+import bench, formatter
+hwm = lambda: int(re.search(r"VmHWM:\\s+(\\d+)", open("/proc/self/status").read()).group(1))
+data = bench.fixture_paper(mcqs=int(sys.argv[1]), matches=int(sys.argv[2]))
+before = hwm()
+with tempfile.TemporaryDirectory() as tmp:
+    formatter.create_question_paper(data, os.path.join(tmp, "p.docx"), backend=sys.argv[3])
+print(hwm() - before)
+"""
+
+
+def _render_rss_kb(mcqs: int, matches: int, backend: str) -> int:
+    """Peak RSS growth (KB) of rendering one paper in a fresh interpreter. Linux only."""
+    import subprocess
+    out = subprocess.run([sys.executable, "-c", _RSS_SCRIPT, str(mcqs), str(matches), backend],
+                         capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)))
+    return int(out.stdout.strip())
+
+
+def bench_render_backends(args) -> None:
+    """create_question_paper with the python-docx DOM vs the streaming zip writer."""
+    import formatter
+
+    papers = [("one paper", 20, 5), ("question bank", 400, 100)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "paper.docx")
+        for label, mcqs, matches in papers:
+            data = fixture_paper(mcqs=mcqs, matches=matches)
+            print(f"{label}: {mcqs + matches} questions, mean of {args.papers} renders")
+            baseline = None
+            for backend in formatter.BACKENDS:
+                formatter.create_question_paper(data, path, backend=backend)  # warm template caches
+                started = time.perf_counter()
+                for _ in range(args.papers):
+                    formatter.create_question_paper(data, path, backend=backend)
+                per_paper = (time.perf_counter() - started) / args.papers
+                baseline = baseline or per_paper
+                rss = _render_rss_kb(mcqs, matches, backend)
+                print(f"  {backend:<12} {per_paper * 1000:8.1f} ms/paper  {1 / per_paper:7.1f} papers/s  "
+                      f"x{baseline / per_paper:5.1f}  peak RSS +{rss / 1024:6.1f} MB")
+            print()
+
+
+def bench_render_pdf(args) -> None:
+    """PDF export (reportlab) against the two .docx backends."""
+    import formatter
+    import pdf_writer
+
+    if not pdf_writer.pdf_available():
+        sys.exit("render-pdf needs reportlab: pip install reportlab")
+
+    renderers = [(f"docx/{b}", "docx", lambda d, p, b=b: formatter.create_question_paper(d, p, backend=b))
+                 for b in formatter.BACKENDS]
+    renderers.append(("pdf", "pdf", pdf_writer.create_question_paper_pdf))
+    papers = [("one paper", 20, 5), ("question bank", 400, 100)]
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, mcqs, matches in papers:
+            data = fixture_paper(mcqs=mcqs, matches=matches)
+            print(f"{label}: {mcqs + matches} questions, mean of {args.papers} renders")
+            for name, ext, render in renderers:
+                path = os.path.join(tmp, f"paper.{ext}")
+                render(data, path)  # warm template and font caches
+                started = time.perf_counter()
+                for _ in range(args.papers):
+                    render(data, path)
+                per_paper = (time.perf_counter() - started) / args.papers
+                print(f"  {name:<18} {per_paper * 1000:8.1f} ms/paper  {1 / per_paper:7.1f} papers/s  "
+                      f"{os.path.getsize(path) / 1024:7.1f} KB")
+            print()
+
+
+def _preview_uncached(data: dict, school: str, images: dict) -> str:
+    """The editor preview as it was before memoization: full rebuild, full-size base64 images."""
+    import base64
+    h = '<div class="pp-paper">'
+    if school: h += f'<h2>{school.upper()}</h2>'
+    if data.get("exam_title"): h += f'<h3>{data["exam_title"]}</h3>'
+    for i, ins in enumerate(data.get("instructions", []), 1): h += f'{i}. {ins}<br>'
+    for si, sec in enumerate(data.get("sections", [])):
+        h += f'<div class="pp-paper-sec">{sec.get("section_name","")}</div>'
+        for qi, q in enumerate(sec.get("questions", [])):
+            m = f'<span class="pp-paper-m">[{q["marks"]}]</span>' if q.get("marks") else ''
+            h += f'<div class="pp-paper-q"><span><b>Q{q["number"]}.</b> {q["text"]}</span>{m}</div>'
+            for sp in q.get("subparts", []): h += f'<div class="pp-paper-sp">{sp}</div>'
+            if images.get(f"{si}_{qi}"):
+                img_b64 = base64.b64encode(images[f"{si}_{qi}"]).decode()
+                h += f'<img src="data:image/png;base64,{img_b64}"/>'
+    return h + '</div>'
+
+
+def _fixture_photo(seed: int, size: tuple = (2400, 1800)) -> bytes:
+    """A noisy phone-photo-sized JPEG, so it does not compress to nothing."""
+    import random
+    from PIL import Image
+    rnd = random.Random(seed)
+    img = Image.frombytes("RGB", (size[0] // 8, size[1] // 8), rnd.randbytes(size[0] * size[1] * 3 // 64))
+    buf = io.BytesIO()
+    img.resize(size).save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+def bench_preview(args) -> None:
+    """Editor preview per keystroke: full rebuild vs memoized fragments and thumbnails."""
+    import preview
+
+    data = fixture_paper(mcqs=20, matches=5)
+    images = {f"0_{i}": _fixture_photo(i) for i in range(0, 25, 5)}
+    questions = data["sections"][0]["questions"]
+    print(f"{len(questions)} questions, {len(images)} images "
+          f"({sum(map(len, images.values())) / 1e6:.1f} MB), one edited question per rerun\n")
+
+    for label, render in [("full rebuild (before)", _preview_uncached), ("memoized", preview.render_preview)]:
+        render(data, "Bench Public School", images)  # first render fills the caches
+        times, size = [], 0
+        for n in range(args.papers):
+            questions[n % len(questions)]["text"] += "x"
+            started = time.perf_counter()
+            size = len(render(data, "Bench Public School", images))
+            times.append(time.perf_counter() - started)
+        print(f"  {label:<22} {statistics.mean(times) * 1000:8.2f} ms/rerun  "
+              f"HTML {size / 1024:8.1f} KB")
+    print(f"\n  cache: {preview.preview_cache_stats()}")
+
+
+def bench_layout(args) -> None:
+    """Page-count estimates per second, and fit_to_pages, against actually rendering the .docx."""
+    import formatter
+    import layout
+
+    for label, mcqs, matches in [("one paper", 20, 5), ("question bank", 400, 100)]:
+        data = fixture_paper(mcqs=mcqs, matches=matches)
+        layout.estimate_layout(data)  # warm the word-width cache
+        started = time.perf_counter()
+        for _ in range(args.papers):
+            est = layout.estimate_layout(data)
+        per_estimate = (time.perf_counter() - started) / args.papers
+
+        started = time.perf_counter()
+        formatter.create_question_paper(data)
+        render = time.perf_counter() - started
+
+        target = max(1, est.pages - 1)
+        started = time.perf_counter()
+        style = layout.fit_to_pages(data, target)
+        fit = time.perf_counter() - started
+        print(f"{label}: {mcqs + matches} questions, {est.pages} pages compact")
+        print(f"  estimate            {per_estimate * 1000:8.2f} ms  {1 / per_estimate:8.0f} layouts/s")
+        print(f"  render .docx        {render * 1000:8.2f} ms")
+        print(f"  fit to {target} pages     {fit * 1000:8.2f} ms  "
+              f"{'question size ' + str(style.question_size) + 'pt' if style else 'does not fit'}\n")
+
+
+def bench_model(args) -> None:
+    """Validating a paper into the typed model once, against rendering from the dict every time."""
+    import formatter
+    import layout
+    from model import as_paper
+
+    for label, mcqs, matches in [("one paper", 20, 5), ("question bank", 400, 100)]:
+        data = fixture_paper(mcqs=mcqs, matches=matches)
+        layout.estimate_layout(data)  # warm the word-width cache
+        started = time.perf_counter()
+        for _ in range(args.papers):
+            paper = as_paper(data)
+        parse = (time.perf_counter() - started) / args.papers
+        print(f"{label}: {mcqs + matches} questions, parse + validate {parse * 1000:.2f} ms")
+        for name, run in [("estimate", lambda d: layout.estimate_layout(d)),
+                          ("render stream", lambda d: formatter.create_question_paper(d, backend="stream"))]:
+            timings = {}
+            for source, value in (("dict", data), ("Paper", paper)):
+                started = time.perf_counter()
+                for _ in range(args.papers):
+                    run(value)
+                timings[source] = (time.perf_counter() - started) / args.papers
+            print(f"  {name:<14} from dict {timings['dict'] * 1000:8.2f} ms   "
+                  f"from Paper {timings['Paper'] * 1000:8.2f} ms")
+        target = max(1, layout.estimate_layout(paper).pages - 1)
+        started = time.perf_counter()
+        layout.fit_to_pages(data, target)
+        print(f"  fit to {target} pages   {(time.perf_counter() - started) * 1000:8.2f} ms (parsed once)\n")
+
+
+def bench_render_pool(args) -> None:
+    """render_papers throughput as the process pool grows, up to one worker per CPU."""
+    from render_pool import RenderJob, render_papers, summarize
+
+    data = fixture_paper()
+    jobs = [RenderJob(data, compact=i % 2 == 0, name=f"paper{i}") for i in range(args.papers)]
+    cpus = os.cpu_count() or 1
+    counts = sorted({1, *[n for n in (2, 4, 8, 16, 32) if n <= cpus], cpus})
+    print(f"{len(jobs)} papers (compact and normal), {cpus} CPUs\n")
+    baseline = None
+    for workers in counts:
+        started = time.perf_counter()
+        results = render_papers(jobs, workers=workers)
+        wall = time.perf_counter() - started
+        stats = summarize(results, wall)
+        baseline = baseline or wall
+        print(f"  {workers:>3} workers  {wall:6.2f}s  {len(jobs) / wall:6.1f} papers/s  "
+              f"x{baseline / wall:5.2f}  (mean job {stats['job_seconds_total'] / len(jobs) * 1000:.0f} ms)")
+
+
+BENCHMARKS = {
+    "ocr-modes": bench_ocr_modes,
+    "layout": bench_layout,
+    "model": bench_model,
+    "oxml": bench_oxml,
+    "preview": bench_preview,
+    "render-backends": bench_render_backends,
+    "render-pdf": bench_render_pdf,
+    "render-pool": bench_render_pool,
+}
+
+# --papers when not given; the usage lines in the module docstring show the same numbers
+DEFAULT_PAPERS = {
+    "ocr-modes": 2,
+    "layout": 50,
+    "model": 50,
+    "oxml": 20,
+    "preview": 50,
+    "render-backends": 20,
+    "render-pdf": 20,
+    "render-pool": 16,
+}
+
+
+def main(argv: list) -> int:
+    p = argparse.ArgumentParser(description="PrashnaPro benchmarks")
+    p.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    p.add_argument("--papers", type=int, default=None, help="Fixture papers to run (default: per benchmark)")
+    p.add_argument("--ttft", type=float, default=0.6, help="Fake model time to first token (s)")
+    p.add_argument("--tps", type=float, default=80.0, help="Fake model output tokens per second")
+    args = p.parse_args(argv)
+    if args.papers is None:
+        args.papers = DEFAULT_PAPERS[args.benchmark]
+    BENCHMARKS[args.benchmark](args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,82 @@
+"""
+Process-wide registry of pooled OpenAI clients.
+One client per (API key, base URL, timeout) is created lazily and reused, so
+back-to-back OCR and structuring calls - and every Streamlit session sharing
+a key - go over warm keep-alive connections instead of a fresh TLS handshake.
+"""
+
+import os
+import threading
+
+import openai
+
+
+DEFAULT_TIMEOUT = float(os.environ.get("PRASHNAPRO_OPENAI_TIMEOUT", 120))
+DEFAULT_CONNECT_TIMEOUT = float(os.environ.get("PRASHNAPRO_OPENAI_CONNECT_TIMEOUT", 10))
+MAX_CONNECTIONS = int(os.environ.get("PRASHNAPRO_OPENAI_MAX_CONNECTIONS", 50))
+MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("PRASHNAPRO_OPENAI_MAX_KEEPALIVE", 20))
+KEEPALIVE_EXPIRY = 60.0
+
+# openai exports its default pool limits. Building ours from the same class
+# keeps them the type DefaultHttpxClient accepts, without importing the
+# HTTP library openai happens to be built on.
+_Limits = type(openai.DEFAULT_CONNECTION_LIMITS)
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package."""
+    if os.environ.get("PRASHNAPRO_DISABLE_HTTP2"):
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def get_client(api_key: str, base_url: str = None, timeout: float = None) -> openai.OpenAI:
+    """
+    Return the shared OpenAI client for this API key and base URL, creating
+    it on first use. The underlying connection pool is kept alive between
+    calls and safe to use from multiple threads.
+    """
+    timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+    key = (api_key, base_url, timeout)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            http_client = openai.DefaultHttpxClient(
+                http2=http2_available(),
+                timeout=openai.Timeout(timeout, connect=DEFAULT_CONNECT_TIMEOUT),
+                limits=_Limits(
+                    max_connections=MAX_CONNECTIONS,
+                    max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=KEEPALIVE_EXPIRY,
+                ),
+            )
+            client = openai.OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                timeout=openai.Timeout(timeout, connect=DEFAULT_CONNECT_TIMEOUT),
+                # Retries are handled by scheduler.RateLimitScheduler
+                max_retries=0,
+                http_client=http_client,
+            )
+            _clients[key] = client
+    return client
+
+
+def close_clients() -> None:
+    """Close every pooled client, e.g. at the end of a batch run."""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
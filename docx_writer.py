@@ -0,0 +1,325 @@
+"""
+Streaming .docx writer - an alternative backend for create_question_paper.
+
+python-docx builds the whole document as an lxml tree and serialises it in
+doc.save. Here the paper's WordprocessingML is generated as text and
+written straight into the zip's word/document.xml stream as it is
+produced. Every other part (styles, footer, settings, theme...) is copied
+from the same cached template formatter.py clones, and the markup mirrors
+what the python-docx backend emits, so both give the same layout for the
+same structured_data.
+
+Selected per call with create_question_paper(..., backend="stream").
+"""
+
+import io
+import re
+import threading
+import zipfile
+from xml.sax.saxutils import escape, quoteattr
+
+from docx import Document
+from docx.image.image import Image
+from docx.shared import Cm, Emu, Pt
+
+from formatter import (
+    LIGHT_BORDER, NO_BORDER, PaperStyle, _borders_xml, _edges, all_edges, find_question_image, open_image,
+    paper_meta_parts, paper_style, question_image, template_bytes,
+)
+from model import Paper, as_paper
+
+
+DOCUMENT_PART = "word/document.xml"
+RELS_PART = "word/_rels/document.xml.rels"
+CONTENT_TYPES_PART = "[Content_Types].xml"
+IMAGE_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/image"
+# Extensions python-docx can name image parts with (docx.image)
+IMAGE_CONTENT_TYPES = {
+    "png": "image/png", "jpg": "image/jpeg", "jpeg": "image/jpeg",
+    "gif": "image/gif", "bmp": "image/bmp", "tiff": "image/tiff",
+}
+FLUSH_BYTES = 64 * 1024
+
+_INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+# ─── Template parts ───────────────────────────────────────────────────────────
+
+class _TemplateParts:
+    """The template .docx split into what is copied verbatim and what is written per paper."""
+
+    def __init__(self, style: PaperStyle):
+        data = template_bytes(style)
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            self.static = [(info, zf.read(info)) for info in zf.infolist()
+                           if info.filename not in (DOCUMENT_PART, RELS_PART, CONTENT_TYPES_PART)]
+            document = zf.read(DOCUMENT_PART).decode("utf-8")
+            rels = zf.read(RELS_PART).decode("utf-8")
+            content_types = zf.read(CONTENT_TYPES_PART).decode("utf-8")
+
+        # Paper content goes where python-docx would add it: just before the body's sectPr
+        split = document.rindex("<w:sectPr")
+        self.head = document[:split].encode("utf-8")
+        self.tail = document[split:].encode("utf-8")
+
+        self.rels_head, self.rels_tail = rels.rsplit("</Relationships>", 1)[0], "</Relationships>"
+        self.next_rid = max(int(n) for n in re.findall(r'Id="rId(\d+)"', rels)) + 1
+
+        for ext, content_type in IMAGE_CONTENT_TYPES.items():
+            if f'Extension="{ext}"' not in content_types:
+                content_types = content_types.replace(
+                    "</Types>", f'<Default Extension="{ext}" ContentType="{content_type}"/></Types>')
+        self.content_types = content_types.encode("utf-8")
+
+        self.block_width = Document(io.BytesIO(data))._block_width
+
+
+_parts = {}
+_parts_lock = threading.Lock()
+
+
+def _template_parts(style: PaperStyle) -> _TemplateParts:
+    parts = _parts.get(style)
+    if parts is None:
+        with _parts_lock:
+            parts = _parts.get(style)
+            if parts is None:
+                parts = _parts[style] = _TemplateParts(style)
+    return parts
+
+
+# ─── Markup ───────────────────────────────────────────────────────────────────
+
+def _t(text: str) -> str:
+    preserve = ' xml:space="preserve"' if len(text.strip()) < len(text) else ""
+    return f"<w:t{preserve}>{escape(text)}</w:t>"
+
+
+def _run(text: str = "", style_id: str = None) -> str:
+    """A w:r for text, with tabs and line breaks split out the way python-docx does."""
+    rpr = f'<w:rPr><w:rStyle w:val="{style_id}"/></w:rPr>' if style_id else ""
+    content = []
+    for i, piece in enumerate(re.split(r"([\t\r\n])", _INVALID_XML_CHARS.sub("", text))):
+        if i % 2:
+            content.append("<w:tab/>" if piece == "\t" else "<w:br/>")
+        elif piece:
+            content.append(_t(piece))
+    return f"<w:r>{rpr}{''.join(content)}</w:r>"
+
+
+def _twips(points: float) -> int:
+    return Pt(points).twips
+
+
+def _paragraph(runs: str = "", style_id: str = None, before: float = None, after: float = None,
+               align: str = None, border: str = None) -> str:
+    """A w:p with its pPr children in schema order (pStyle, pBdr, spacing, jc)."""
+    ppr = []
+    if style_id:
+        ppr.append(f'<w:pStyle w:val="{style_id}"/>')
+    if border:
+        ppr.append(border)
+    if before is not None or after is not None:
+        spacing = "".join(f' w:{k}="{_twips(v)}"' for k, v in (("before", before), ("after", after))
+                          if v is not None)
+        ppr.append(f"<w:spacing{spacing}/>")
+    if align:
+        ppr.append(f'<w:jc w:val="{align}"/>')
+    ppr = f"<w:pPr>{''.join(ppr)}</w:pPr>" if ppr else ""
+    return f"<w:p>{ppr}{runs}</w:p>"
+
+
+def _rule(edge: str, sz: int, before: float = None, after: float = None) -> str:
+    """Same as formatter.add_rule."""
+    border = f'<w:pBdr><w:{edge} w:val="single" w:sz="{sz}" w:space="1" w:color="000000"/></w:pBdr>'
+    return _paragraph(before=before, after=after, border=border)
+
+
+def _table_borders(border: dict) -> str:
+    return _borders_xml("tblBorders", _edges(all_edges(border))).replace(
+        ' xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"', "")
+
+
+_TABLE_BORDERS = {"none": _table_borders(NO_BORDER), "light": _table_borders(LIGHT_BORDER)}
+
+
+def _table(cells: list, block_width: Emu, align: str, borders: str,
+           row_height: int = None, cell_widths: dict = None) -> str:
+    """
+    A w:tbl like Document.add_table: columns share the text block width
+    evenly. cells is a list of rows of cell paragraph markup; cell_widths
+    overrides the tcW of (row, col) cells in twips.
+    """
+    cols = len(cells[0])
+    col_twips = Emu(block_width // cols).twips
+    out = [
+        '<w:tbl><w:tblPr><w:tblW w:type="auto" w:w="0"/>',
+        f'<w:jc w:val="{align}"/>{borders}',
+        '<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" w:lastRow="0" '
+        'w:noHBand="0" w:noVBand="1" w:val="04A0"/></w:tblPr>',
+        "<w:tblGrid>", f'<w:gridCol w:w="{col_twips}"/>' * cols, "</w:tblGrid>",
+    ]
+    trpr = f'<w:trPr><w:trHeight w:val="{row_height}" w:hRule="atLeast"/></w:trPr>' if row_height else ""
+    for ri, row in enumerate(cells):
+        out.append(f"<w:tr>{trpr}")
+        for ci, para in enumerate(row):
+            width = (cell_widths or {}).get((ri, ci), col_twips)
+            out.append(f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{width}"/></w:tcPr>{para}</w:tc>')
+        out.append("</w:tr>")
+    out.append("</w:tbl>")
+    return "".join(out)
+
+
+class _Media:
+    """Image parts and their relationships, deduplicated by content like python-docx."""
+
+    def __init__(self, next_rid: int):
+        self.next_rid = next_rid
+        self.by_sha1 = {}  # sha1 -> (rId, part name)
+        self.parts = []    # (part name, blob)
+        self.next_shape_id = 1
+
+    def picture(self, image_file, width=None, height=None) -> str:
+        """A w:r holding an inline picture of image_file (a path or binary stream)."""
+        image = Image.from_file(image_file)
+        sha1 = image.sha1
+        if sha1 not in self.by_sha1:
+            name = f"media/image{len(self.parts) + 1}.{image.ext}"
+            self.by_sha1[sha1] = (f"rId{self.next_rid}", name)
+            self.parts.append((name, image.blob))
+            self.next_rid += 1
+        rid = self.by_sha1[sha1][0]
+        cx, cy = image.scaled_dimensions(width, height)
+        shape_id = self.next_shape_id
+        self.next_shape_id += 1
+        return (
+            '<w:r><w:drawing><wp:inline xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+            'xmlns:pic="http://schemas.openxmlformats.org/drawingml/2006/picture">'
+            f'<wp:extent cx="{cx}" cy="{cy}"/><wp:docPr id="{shape_id}" name="Picture {shape_id}"/>'
+            '<wp:cNvGraphicFramePr><a:graphicFrameLocks noChangeAspect="1"/></wp:cNvGraphicFramePr>'
+            '<a:graphic><a:graphicData uri="http://schemas.openxmlformats.org/drawingml/2006/picture">'
+            f'<pic:pic><pic:nvPicPr><pic:cNvPr id="0" name={quoteattr(image.filename)}/><pic:cNvPicPr/></pic:nvPicPr>'
+            f'<pic:blipFill><a:blip r:embed="{rid}"/><a:stretch><a:fillRect/></a:stretch></pic:blipFill>'
+            f'<pic:spPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="{cx}" cy="{cy}"/></a:xfrm>'
+            '<a:prstGeom prst="rect"/></pic:spPr></pic:pic></a:graphicData></a:graphic></wp:inline>'
+            '</w:drawing></w:r>'
+        )
+
+    def relationships(self) -> str:
+        return "".join(
+            f'<Relationship Id="{rid}" Type="{IMAGE_REL}" Target="{name}"/>'
+            for rid, name in self.by_sha1.values()
+        )
+
+
+# ─── Paper body ───────────────────────────────────────────────────────────────
+
+def _body(paper: Paper, style: PaperStyle, parts: _TemplateParts, media: _Media,
+          school_name: str, logo_path, compact: bool, question_images: dict):
+    """Yield the paper's body markup piece by piece, in create_question_paper's order."""
+    width = parts.block_width
+
+    # ─── Header ────────────────────────────────────────────────────────────
+    display_school = school_name or paper.school_name
+    logo = open_image(logo_path)
+    if logo is not None and display_school:
+        logo = _paragraph(media.picture(logo, height=Cm(1.8)), align="right")
+        name = _paragraph(_run(display_school.upper()), "SchoolName", after=style.base_space_after, align="left")
+        yield _table([[logo, name]], width, "center", _TABLE_BORDERS["none"],
+                     cell_widths={(0, 0): Cm(2.5).twips})
+    elif display_school:
+        yield _paragraph(_run(display_school.upper()), "SchoolName")
+    elif logo is not None:
+        yield _paragraph(media.picture(logo, height=Cm(2.0)), "SchoolName")
+
+    if paper.exam_title:
+        yield _paragraph(_run(paper.exam_title), "ExamTitle")
+
+    meta_parts = paper_meta_parts(paper)
+    if len(meta_parts) >= 4:
+        cell = lambda text, align: _paragraph(_run(text), "Meta", align=align)
+        yield _table([[cell(meta_parts[0], "left"), cell(meta_parts[2], "right")],
+                      [cell(meta_parts[1], "left"), cell(meta_parts[3], "right")]],
+                     width, "center", _TABLE_BORDERS["none"])
+    elif meta_parts:
+        yield _paragraph(_run("  |  ".join(meta_parts)), "Meta", after=2, align="center")
+
+    yield _rule("bottom", 6, before=3, after=3)
+
+    if paper.instructions:
+        yield _paragraph(_run("General Instructions:"), "InstructionHeading")
+        for idx, instr in enumerate(paper.instructions, 1):
+            yield _paragraph(_run(f"{idx}. {instr}"), "Instruction")
+
+    yield _rule("bottom", 4, before=2, after=4)
+
+    # ─── Sections & questions ──────────────────────────────────────────────
+    for si, section in enumerate(paper.sections):
+        section_name = section.name or f"Section {si + 1}"
+        yield _paragraph(_run(section_name.upper()), "SectionHeader")
+
+        for qi, question in enumerate(section.questions):
+            q_num = question.number or str(qi + 1)
+            q_marks = question.marks
+            subparts = question.subpart_texts
+
+            runs = _run(f"Q{q_num}. ", "QuestionNumber") + _run(question.text)
+            if q_marks:
+                runs += _run(f"\t[{q_marks}]", "Marks")
+            yield _paragraph(runs, "QuestionText")
+
+            if subparts:
+                if question.is_match:
+                    rows = [[_paragraph(_run(text), "MatchCell") for text in row]
+                            for row in question.match_rows]
+                    yield _table(rows, width, "left", _TABLE_BORDERS["light"], row_height=300)
+                elif compact and question.is_mcq:
+                    cells = [_paragraph(_run(opt), "OptionCell") for opt in subparts]
+                    yield _table([cells[:2], cells[2:]], width, "left", _TABLE_BORDERS["none"], row_height=280)
+                else:
+                    for sp in subparts:
+                        yield _paragraph(_run(sp), "Subpart")
+
+            img = question_image(find_question_image(question_images, si, qi, question), style)
+            if img is not None:
+                yield _paragraph(media.picture(io.BytesIO(img.data), width=Cm(img.width_cm)), "QuestionImage")
+
+    yield _rule("top", 4, before=12)
+    yield _paragraph(_run("— End of Question Paper —"), "EndOfPaper")
+
+
+# ─── Writer ───────────────────────────────────────────────────────────────────
+
+def write_question_paper(structured_data: dict, output_path, school_name: str = "",
+                         logo_path=None, compact: bool = True,
+                         question_images: dict = None, style: PaperStyle = None):
+    """
+    Write the paper to output_path (a path or a writable binary file)
+    without building a document tree. Same arguments and layout as
+    formatter.create_question_paper.
+    """
+    style = style or paper_style(compact)
+    parts = _template_parts(style)
+    media = _Media(parts.next_rid)
+
+    with zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(CONTENT_TYPES_PART, parts.content_types)
+        with zf.open(DOCUMENT_PART, "w") as out:
+            out.write(parts.head)
+            pending, size = [], 0
+            for chunk in _body(as_paper(structured_data), style, parts, media, school_name,
+                               logo_path, compact, question_images):
+                pending.append(chunk)
+                size += len(chunk)
+                if size >= FLUSH_BYTES:
+                    out.write("".join(pending).encode("utf-8"))
+                    pending, size = [], 0
+            out.write("".join(pending).encode("utf-8"))
+            out.write(parts.tail)
+        zf.writestr(RELS_PART, parts.rels_head + media.relationships() + parts.rels_tail)
+        for name, blob in media.parts:
+            zf.writestr(f"word/{name}", blob)
+        for info, blob in parts.static:
+            zf.writestr(info.filename, blob)
+    return output_path
+
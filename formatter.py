@@ -6,85 +6,477 @@ Uses python-docx for document generation.
 
 from docx import Document
 from docx.shared import Inches, Pt, Cm, Emu, RGBColor
-from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.enum.style import WD_STYLE_TYPE
+from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_TAB_ALIGNMENT
 from docx.enum.table import WD_TABLE_ALIGNMENT
 from docx.enum.section import WD_ORIENT
 from docx.oxml.ns import qn, nsdecls
 from docx.oxml import parse_xml
+from dataclasses import dataclass
+import copy
+import functools
+import io
 import os
+import threading
+import uuid
 from datetime import datetime
 
+from imaging import print_image
+from metrics import count, span
+from model import Paper, as_paper
+
+
+# ─── OXML fragments ──────────────────────────────────────────────────────────
+
+# Schema order of border edges inside w:tcBorders / w:tblBorders
+BORDER_EDGES = ("top", "left", "bottom", "right", "insideH", "insideV")
+NO_BORDER = {"sz": 0, "color": "FFFFFF"}
+LIGHT_BORDER = {"sz": 4, "color": "CCCCCC"}
+
+
+@functools.lru_cache(maxsize=256)
+def _parsed_fragment(xml: str):
+    return parse_xml(xml)
+
+
+def oxml_fragment(xml: str):
+    """
+    A fresh element for an XML snippet. Each distinct snippet is parsed
+    once; later calls deep-copy the cached element, which is much cheaper
+    than running lxml's parser again.
+    """
+    return copy.deepcopy(_parsed_fragment(xml))
+
+
+@functools.lru_cache(maxsize=64)
+def _borders_xml(tag: str, edges: tuple) -> str:
+    """<w:tag> holding one single-line border per (edge, sz, color)."""
+    order = {edge: i for i, edge in enumerate(BORDER_EDGES)}
+    parts = [
+        f'<w:{edge} w:val="single" w:sz="{sz}" w:space="0" w:color="{color}"/>'
+        for edge, sz, color in sorted(edges, key=lambda e: order.get(e[0], len(order)))
+    ]
+    return f'<w:{tag} {nsdecls("w")}>{"".join(parts)}</w:{tag}>'
+
+
+def _edges(kwargs: dict) -> tuple:
+    return tuple((edge, attrs.get("sz", 4), attrs.get("color", "000000")) for edge, attrs in kwargs.items())
+
 
 def set_cell_border(cell, **kwargs):
     """Set cell border. Usage: set_cell_border(cell, top={"sz":4, "color":"000000"})"""
-    tc = cell._tc
-    tcPr = tc.get_or_add_tcPr()
-    tcBorders = parse_xml(f'<w:tcBorders {nsdecls("w")}></w:tcBorders>')
-    for edge, attrs in kwargs.items():
-        element = parse_xml(
-            f'<w:{edge} {nsdecls("w")} w:val="single" w:sz="{attrs.get("sz", 4)}" '
-            f'w:space="0" w:color="{attrs.get("color", "000000")}"/>'
-        )
-        tcBorders.append(element)
-    tcPr.append(tcBorders)
+    tcPr = cell._tc.get_or_add_tcPr()
+    tcPr.append(oxml_fragment(_borders_xml("tcBorders", _edges(kwargs))))
+
+
+def set_table_borders(table, **kwargs):
+    """
+    Border every cell of a table in one pass via w:tblBorders.
+    Usage: set_table_borders(table, **all_edges(LIGHT_BORDER))
+    """
+    tblPr = table._tbl.tblPr
+    tblPr.insert_element_before(
+        oxml_fragment(_borders_xml("tblBorders", _edges(kwargs))),
+        "w:shd", "w:tblLayout", "w:tblCellMar", "w:tblLook", "w:tblCaption", "w:tblDescription",
+    )
+
+
+def all_edges(border: dict) -> dict:
+    """The same border on the outside and between all cells of a table."""
+    return {edge: border for edge in BORDER_EDGES}
+
+
+def set_row_heights(table, twips: int):
+    """Give every row of a table a minimum height."""
+    xml = f'<w:trHeight {nsdecls("w")} w:val="{twips}" w:hRule="atLeast"/>'
+    for row in table.rows:
+        row._tr.get_or_add_trPr().append(oxml_fragment(xml))
+
+
+def add_rule(doc, edge: str, sz: int, before: float = None, after: float = None):
+    """An empty paragraph drawn as a horizontal line (its top or bottom border)."""
+    p = doc.add_paragraph()
+    # pBdr goes in first so the spacing python-docx inserts lands after it (schema order)
+    p._p.get_or_add_pPr().append(oxml_fragment(
+        f'<w:pBdr {nsdecls("w")}>'
+        f'<w:{edge} w:val="single" w:sz="{sz}" w:space="1" w:color="000000"/>'
+        f'</w:pBdr>'
+    ))
+    if before is not None:
+        p.paragraph_format.space_before = Pt(before)
+    if after is not None:
+        p.paragraph_format.space_after = Pt(after)
+    return p
+
+
+def paper_meta_parts(paper: Paper) -> list:
+    """The Class / Subject / Time / Max. Marks items present in the paper."""
+    parts = []
+    if paper.class_name:
+        parts.append(f"Class: {paper.class_name}")
+    if paper.subject:
+        parts.append(f"Subject: {paper.subject}")
+    if paper.time:
+        parts.append(f"Time: {paper.time}")
+    if paper.total_marks:
+        parts.append(f"Max. Marks: {paper.total_marks}")
+    return parts
+
+
+# ─── Question and section IDs ────────────────────────────────────────────────
+
+def new_id() -> str:
+    return uuid.uuid4().hex[:10]
+
+
+def assign_ids(data: dict) -> dict:
+    """
+    Give every section and question a persistent "id" (in place) unless it
+    has a unique one already, and return data. Editor widgets and question
+    images are keyed by these, so they follow a question when others are
+    added, deleted or reordered.
+    """
+    seen = set()
+    for section in data.get("sections", []):
+        for item in [section] + section.get("questions", []):
+            if not item.get("id") or item["id"] in seen:
+                item["id"] = new_id()
+            seen.add(item["id"])
+    return data
+
+
+def find_question_image(question_images: dict, si: int, qi: int, question: dict):
+    """
+    A question's entry in question_images: keyed by the question's id, or
+    by position as "<section>_<question>" for papers without ids.
+    """
+    if not question_images:
+        return None
+    qid = question.get("id") if isinstance(question, dict) else question.id
+    if qid and qid in question_images:
+        return question_images[qid]
+    return question_images.get(f"{si}_{qi}")
+
+
+def image_bytes(source) -> bytes:
+    """
+    The bytes of a logo / question image given as a path, bytes or a
+    binary file-like object (e.g. a Streamlit UploadedFile). None for a
+    missing file or empty data.
+    """
+    if source is None:
+        return None
+    if isinstance(source, (str, os.PathLike)):
+        if not os.path.exists(source):
+            return None
+        with open(source, "rb") as f:
+            data = f.read()
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        data = bytes(source)
+    elif hasattr(source, "getvalue"):
+        data = source.getvalue()
+    else:
+        source.seek(0)
+        data = source.read()
+    return data or None
+
+
+def open_image(source):
+    """image_bytes(source) as a fresh stream python-docx can read, or None."""
+    data = image_bytes(source)
+    return io.BytesIO(data) if data else None
+
+
+# ─── Paper styles ─────────────────────────────────────────────────────────────
+
+@dataclass(frozen=True)
+class PaperStyle:
+    """Page setup, font sizes (pt) and spacing (pt) for one layout mode."""
+    top_margin_cm: float
+    bottom_margin_cm: float
+    left_margin_cm: float
+    right_margin_cm: float
+    base_size: float
+    base_space_after: float
+    base_line_spacing: float
+    school_size: float
+    title_size: float
+    meta_size: float
+    instruction_heading_size: float
+    instruction_size: float
+    section_size: float
+    section_space_before: float
+    section_space_after: float
+    question_size: float
+    question_space_before: float
+    question_space_after: float
+    question_line_spacing: float
+    marks_size: float
+    subpart_size: float
+    image_max_cm: float
+
+
+COMPACT_STYLE = PaperStyle(
+    top_margin_cm=1.2, bottom_margin_cm=1.0, left_margin_cm=1.5, right_margin_cm=1.5,
+    base_size=11, base_space_after=1, base_line_spacing=1.0,
+    school_size=14, title_size=12, meta_size=10,
+    instruction_heading_size=10, instruction_size=9,
+    section_size=11, section_space_before=6, section_space_after=3,
+    question_size=10.5, question_space_before=3, question_space_after=1, question_line_spacing=1.0,
+    marks_size=10, subpart_size=10, image_max_cm=8.0,
+)
+
+NORMAL_STYLE = PaperStyle(
+    top_margin_cm=2.0, bottom_margin_cm=1.5, left_margin_cm=2.0, right_margin_cm=2.0,
+    base_size=12, base_space_after=3, base_line_spacing=1.15,
+    school_size=16, title_size=13, meta_size=11,
+    instruction_heading_size=11, instruction_size=10,
+    section_size=12, section_space_before=10, section_space_after=6,
+    question_size=11, question_space_before=4, question_space_after=2, question_line_spacing=1.1,
+    marks_size=11, subpart_size=11, image_max_cm=10.0,
+)
+
+
+def paper_style(compact: bool = True) -> PaperStyle:
+    """The built-in style for compact or normal mode."""
+    return COMPACT_STYLE if compact else NORMAL_STYLE
+
+
+def question_image(source, style: PaperStyle):
+    """The print-ready version of a question image (imaging.print_image), or None."""
+    data = image_bytes(source)
+    return print_image(data, style.image_max_cm) if data else None
+
+
+def _add_style(doc, name: str, style_type, size: float = None, bold: bool = None,
+               italic: bool = None, underline: bool = None, color: RGBColor = None):
+    """Add a named style based on Normal (paragraph) or the default font (character)."""
+    style = doc.styles.add_style(name, style_type)
+    if style_type == WD_STYLE_TYPE.PARAGRAPH:
+        style.base_style = doc.styles['Normal']
+        style.quick_style = True
+    if size is not None:
+        style.font.size = Pt(size)
+    if bold is not None:
+        style.font.bold = bold
+    if italic is not None:
+        style.font.italic = italic
+    if underline is not None:
+        style.font.underline = underline
+    if color is not None:
+        style.font.color.rgb = color
+    return style
+
+
+def _paragraph_format(style, align=None, before: float = None, after: float = None,
+                      line_spacing: float = None, left_indent_cm: float = None):
+    pf = style.paragraph_format
+    if align is not None:
+        pf.alignment = align
+    if before is not None:
+        pf.space_before = Pt(before)
+    if after is not None:
+        pf.space_after = Pt(after)
+    if line_spacing is not None:
+        pf.line_spacing = line_spacing
+    if left_indent_cm is not None:
+        pf.left_indent = Cm(left_indent_cm)
+    return style
+
+
+def build_template(style: PaperStyle) -> bytes:
+    """
+    Build the base .docx for a paper style: A4 page setup, Normal font, the
+    named paragraph/character styles used by create_question_paper, and the
+    page-number footer. Returns the saved package bytes.
+    """
+    P, C = WD_STYLE_TYPE.PARAGRAPH, WD_STYLE_TYPE.CHARACTER
+    doc = Document()
+
+    # ─── Page Setup ────────────────────────────────────────────────────────
+    for section in doc.sections:
+        section.orientation = WD_ORIENT.PORTRAIT
+        section.page_width = Cm(21)    # A4
+        section.page_height = Cm(29.7)
+        section.top_margin = Cm(style.top_margin_cm)
+        section.bottom_margin = Cm(style.bottom_margin_cm)
+        section.left_margin = Cm(style.left_margin_cm)
+        section.right_margin = Cm(style.right_margin_cm)
+
+    # ─── Default font setup ────────────────────────────────────────────────
+    normal = doc.styles['Normal']
+    normal.font.name = 'Times New Roman'
+    normal.font.size = Pt(style.base_size)
+    _paragraph_format(normal, before=0, after=style.base_space_after, line_spacing=style.base_line_spacing)
+
+    # ─── Named styles ──────────────────────────────────────────────────────
+    _paragraph_format(_add_style(doc, 'SchoolName', P, size=style.school_size, bold=True),
+                      align=WD_ALIGN_PARAGRAPH.CENTER, after=0)
+    _paragraph_format(_add_style(doc, 'ExamTitle', P, size=style.title_size, bold=True),
+                      align=WD_ALIGN_PARAGRAPH.CENTER, before=2, after=2)
+    _paragraph_format(_add_style(doc, 'Meta', P, size=style.meta_size), before=0, after=0)
+    _paragraph_format(_add_style(doc, 'InstructionHeading', P, size=style.instruction_heading_size,
+                                 bold=True, underline=True), before=2, after=1)
+    _paragraph_format(_add_style(doc, 'Instruction', P, size=style.instruction_size),
+                      before=0, after=0, line_spacing=1.0, left_indent_cm=0.5)
+    _paragraph_format(_add_style(doc, 'SectionHeader', P, size=style.section_size, bold=True),
+                      align=WD_ALIGN_PARAGRAPH.CENTER,
+                      before=style.section_space_before, after=style.section_space_after)
+    question = _paragraph_format(_add_style(doc, 'QuestionText', P, size=style.question_size),
+                                 before=style.question_space_before, after=style.question_space_after,
+                                 line_spacing=style.question_line_spacing)
+    # Tab stop for right-aligned marks
+    question.paragraph_format.tab_stops.add_tab_stop(Cm(18.0), alignment=WD_TAB_ALIGNMENT.RIGHT)
+    _paragraph_format(_add_style(doc, 'Subpart', P, size=style.subpart_size),
+                      before=0, after=0, line_spacing=1.0, left_indent_cm=1.2)
+    _paragraph_format(_add_style(doc, 'MatchCell', P, size=style.subpart_size),
+                      before=1, after=1, left_indent_cm=0.2)
+    _paragraph_format(_add_style(doc, 'OptionCell', P, size=style.subpart_size),
+                      before=0, after=0, left_indent_cm=0.3)
+    _paragraph_format(_add_style(doc, 'QuestionImage', P),
+                      before=4, after=4, line_spacing=1.0, left_indent_cm=0.5)
+    _paragraph_format(_add_style(doc, 'EndOfPaper', P, size=9, italic=True, color=RGBColor(100, 100, 100)),
+                      align=WD_ALIGN_PARAGRAPH.CENTER)
+    _paragraph_format(_add_style(doc, 'PageNumber', P, size=8, color=RGBColor(128, 128, 128)),
+                      align=WD_ALIGN_PARAGRAPH.CENTER, before=0, after=0)
+    _add_style(doc, 'QuestionNumber', C, bold=True)
+    _add_style(doc, 'Marks', C, size=style.marks_size, bold=True)
+
+    # ─── Page numbers in footer ────────────────────────────────────────────
+    for section in doc.sections:
+        footer = section.footer
+        footer.is_linked_to_previous = False
+        fp = footer.paragraphs[0] if footer.paragraphs else footer.add_paragraph()
+        fp.style = doc.styles['PageNumber']
+        fp.add_run("Page ")
+
+        # Add page number field
+        fldChar1 = oxml_fragment(f'<w:fldChar {nsdecls("w")} w:fldCharType="begin"/>')
+        run1 = fp.add_run()
+        run1._r.append(fldChar1)
+
+        instrText = oxml_fragment(f'<w:instrText {nsdecls("w")} xml:space="preserve"> PAGE </w:instrText>')
+        run2 = fp.add_run()
+        run2._r.append(instrText)
+
+        fldChar2 = oxml_fragment(f'<w:fldChar {nsdecls("w")} w:fldCharType="end"/>')
+        run3 = fp.add_run()
+        run3._r.append(fldChar2)
+
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+def template_bytes(style: PaperStyle) -> bytes:
+    """The base .docx for style, built once per process."""
+    data = _templates.get(style)
+    if data is None:
+        with _templates_lock:
+            data = _templates.get(style)
+            if data is None:
+                data = _templates[style] = build_template(style)
+    return data
+
+
+def _styled(paragraph, style_id: str):
+    """Apply a template style by id. Skips python-docx's by-name lookup, which scans every style."""
+    paragraph._p.style = style_id
+    return paragraph
+
+
+def _styled_run(paragraph, text: str, style_id: str):
+    run = paragraph.add_run(text)
+    run._r.style = style_id
+    return run
+
+
+def new_document(style: PaperStyle):
+    """A fresh Document cloned from the cached template for style."""
+    return Document(io.BytesIO(template_bytes(style)))
+
+
+BACKENDS = ("python-docx", "stream")
 
 
 def create_question_paper(
     structured_data: dict,
-    output_path: str,
+    output_path=None,
     school_name: str = "",
-    logo_path: str = None,
+    logo_path=None,
     compact: bool = True,
-    question_images: dict = None
-) -> str:
+    question_images: dict = None,
+    style: PaperStyle = None,
+    backend: str = "python-docx",
+):
     """
     Generate a professional .docx question paper from structured data.
     
     Args:
-        structured_data: Dict with exam_title, sections, questions etc.
-        output_path: Where to save the .docx file
+        structured_data: Dict with exam_title, sections, questions etc., or a
+            model.Paper (validated once; see model.as_paper)
+        output_path: Where to save the .docx file (path or writable binary
+            file). If None, nothing touches the disk and a BytesIO is returned.
         school_name: School name for header
-        logo_path: Path to school logo image
+        logo_path: School logo as a path, bytes or binary file-like object
         compact: If True, optimize for minimal paper usage
+        question_images: {question id or "<section>_<question>": image}, images
+            given like logo_path
+        style: Explicit PaperStyle; overrides compact when given
+        backend: "python-docx", or "stream" to write the XML straight into
+            the zip (docx_writer) - same layout, far less memory and CPU
     
     Returns:
-        Path to the generated .docx file
+        output_path, or a BytesIO positioned at the start when output_path is None
     """
-    doc = Document()
-    
-    # ─── Page Setup: Compact margins ───────────────────────────────────────
-    for section in doc.sections:
-        section.orientation = WD_ORIENT.PORTRAIT
-        section.page_width = Cm(21)    # A4
-        section.page_height = Cm(29.7)
-        if compact:
-            section.top_margin = Cm(1.2)
-            section.bottom_margin = Cm(1.0)
-            section.left_margin = Cm(1.5)
-            section.right_margin = Cm(1.5)
+    if output_path is None:
+        buf = io.BytesIO()
+        create_question_paper(structured_data, buf, school_name, logo_path, compact,
+                              question_images, style, backend)
+        buf.seek(0)
+        return buf
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}; use one of {', '.join(BACKENDS)}")
+    with span("render.docx", backend=backend) as s:
+        if backend == "stream":
+            from docx_writer import write_question_paper
+            write_question_paper(structured_data, output_path, school_name, logo_path,
+                                 compact, question_images, style)
         else:
-            section.top_margin = Cm(2.0)
-            section.bottom_margin = Cm(1.5)
-            section.left_margin = Cm(2.0)
-            section.right_margin = Cm(2.0)
+            _build_document(structured_data, output_path, school_name, logo_path,
+                            compact, question_images, style)
+        size = _written_bytes(output_path)
+        s.set(bytes=size)
+    count("documents_total", format="docx", backend=backend)
+    count("document_bytes_total", size, format="docx")
+    return output_path
 
-    # ─── Default font setup ────────────────────────────────────────────────
-    style = doc.styles['Normal']
-    font = style.font
-    font.name = 'Times New Roman'
-    font.size = Pt(11) if compact else Pt(12)
-    style.paragraph_format.space_before = Pt(0)
-    style.paragraph_format.space_after = Pt(1) if compact else Pt(3)
-    style.paragraph_format.line_spacing = 1.0 if compact else 1.15
-
-    data = structured_data
+
+def _written_bytes(output) -> int:
+    """Size of a finished document, given as a path or a file object."""
+    return output.tell() if hasattr(output, "tell") else os.path.getsize(output)
+
+
+def _build_document(structured_data, output_path, school_name, logo_path, compact,
+                    question_images, style) -> None:
+    """The python-docx backend of create_question_paper."""
+    style = style or paper_style(compact)
+    doc = new_document(style)
+
+    paper = as_paper(structured_data)
     
     # ─── HEADER SECTION ────────────────────────────────────────────────────
     
     # School Logo + Name (using table for side-by-side layout)
-    display_school = school_name or data.get("school_name", "")
+    display_school = school_name or paper.school_name
     
-    if logo_path and os.path.exists(logo_path) and display_school:
+    logo = open_image(logo_path)
+    if logo is not None and display_school:
         # Logo + School Name side by side
         header_table = doc.add_table(rows=1, cols=2)
         header_table.alignment = WD_TABLE_ALIGNMENT.CENTER
@@ -95,62 +487,31 @@ def create_question_paper(
         logo_para = logo_cell.paragraphs[0]
         logo_para.alignment = WD_ALIGN_PARAGRAPH.RIGHT
         run = logo_para.add_run()
-        run.add_picture(logo_path, height=Cm(1.8))
+        run.add_picture(logo, height=Cm(1.8))
         
         # School name cell
         name_cell = header_table.cell(0, 1)
         name_para = name_cell.paragraphs[0]
+        _styled(name_para, 'SchoolName')
         name_para.alignment = WD_ALIGN_PARAGRAPH.LEFT
-        run = name_para.add_run(display_school.upper())
-        run.bold = True
-        run.font.size = Pt(14) if compact else Pt(16)
-        run.font.name = 'Times New Roman'
+        name_para.paragraph_format.space_after = Pt(style.base_space_after)
+        name_para.add_run(display_school.upper())
         
         # Remove table borders
-        for row in header_table.rows:
-            for cell in row.cells:
-                set_cell_border(cell,
-                    top={"sz": 0, "color": "FFFFFF"},
-                    bottom={"sz": 0, "color": "FFFFFF"},
-                    left={"sz": 0, "color": "FFFFFF"},
-                    right={"sz": 0, "color": "FFFFFF"})
+        set_table_borders(header_table, **all_edges(NO_BORDER))
     elif display_school:
-        p = doc.add_paragraph()
-        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        run = p.add_run(display_school.upper())
-        run.bold = True
-        run.font.size = Pt(14) if compact else Pt(16)
-        run.font.name = 'Times New Roman'
-        p.paragraph_format.space_after = Pt(0)
-    elif logo_path and os.path.exists(logo_path):
-        p = doc.add_paragraph()
-        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        _styled(doc.add_paragraph(display_school.upper()), 'SchoolName')
+    elif logo is not None:
+        p = _styled(doc.add_paragraph(), 'SchoolName')
         run = p.add_run()
-        run.add_picture(logo_path, height=Cm(2.0))
-        p.paragraph_format.space_after = Pt(0)
+        run.add_picture(logo, height=Cm(2.0))
 
     # Exam Title
-    exam_title = data.get("exam_title", "")
-    if exam_title:
-        p = doc.add_paragraph()
-        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        run = p.add_run(exam_title)
-        run.bold = True
-        run.font.size = Pt(12) if compact else Pt(13)
-        run.font.name = 'Times New Roman'
-        p.paragraph_format.space_before = Pt(2)
-        p.paragraph_format.space_after = Pt(2)
+    if paper.exam_title:
+        _styled(doc.add_paragraph(paper.exam_title), 'ExamTitle')
 
     # ─── Metadata line (Class | Subject | Time | Marks) - single line ─────
-    meta_parts = []
-    if data.get("class"):
-        meta_parts.append(f"Class: {data['class']}")
-    if data.get("subject"):
-        meta_parts.append(f"Subject: {data['subject']}")
-    if data.get("time"):
-        meta_parts.append(f"Time: {data['time']}")
-    if data.get("total_marks"):
-        meta_parts.append(f"Max. Marks: {data['total_marks']}")
+    meta_parts = paper_meta_parts(paper)
 
     if meta_parts:
         # Use a table for clean alignment: left side and right side
@@ -159,198 +520,69 @@ def create_question_paper(
             meta_table.alignment = WD_TABLE_ALIGNMENT.CENTER
             
             # Row 1: Class (left) | Time (right)
-            left1 = meta_table.cell(0, 0).paragraphs[0]
-            run = left1.add_run(meta_parts[0])
-            run.font.size = Pt(10) if compact else Pt(11)
-            run.font.name = 'Times New Roman'
-            left1.alignment = WD_ALIGN_PARAGRAPH.LEFT
-            
-            right1 = meta_table.cell(0, 1).paragraphs[0]
-            run = right1.add_run(meta_parts[2])
-            run.font.size = Pt(10) if compact else Pt(11)
-            run.font.name = 'Times New Roman'
-            right1.alignment = WD_ALIGN_PARAGRAPH.RIGHT
-            
             # Row 2: Subject (left) | Marks (right)
-            left2 = meta_table.cell(1, 0).paragraphs[0]
-            run = left2.add_run(meta_parts[1])
-            run.font.size = Pt(10) if compact else Pt(11)
-            run.font.name = 'Times New Roman'
-            left2.alignment = WD_ALIGN_PARAGRAPH.LEFT
-            
-            right2 = meta_table.cell(1, 1).paragraphs[0]
-            run = right2.add_run(meta_parts[3])
-            run.font.size = Pt(10) if compact else Pt(11)
-            run.font.name = 'Times New Roman'
-            right2.alignment = WD_ALIGN_PARAGRAPH.RIGHT
+            for (ri, ci, text, align) in (
+                (0, 0, meta_parts[0], WD_ALIGN_PARAGRAPH.LEFT),
+                (0, 1, meta_parts[2], WD_ALIGN_PARAGRAPH.RIGHT),
+                (1, 0, meta_parts[1], WD_ALIGN_PARAGRAPH.LEFT),
+                (1, 1, meta_parts[3], WD_ALIGN_PARAGRAPH.RIGHT),
+            ):
+                para = meta_table.cell(ri, ci).paragraphs[0]
+                _styled(para, 'Meta')
+                para.alignment = align
+                para.add_run(text)
             
             # Remove borders
-            for row in meta_table.rows:
-                for cell in row.cells:
-                    set_cell_border(cell,
-                        top={"sz": 0, "color": "FFFFFF"},
-                        bottom={"sz": 0, "color": "FFFFFF"},
-                        left={"sz": 0, "color": "FFFFFF"},
-                        right={"sz": 0, "color": "FFFFFF"})
-                    for para in cell.paragraphs:
-                        para.paragraph_format.space_before = Pt(0)
-                        para.paragraph_format.space_after = Pt(0)
+            set_table_borders(meta_table, **all_edges(NO_BORDER))
         else:
-            p = doc.add_paragraph()
+            p = _styled(doc.add_paragraph("  |  ".join(meta_parts)), 'Meta')
             p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-            run = p.add_run("  |  ".join(meta_parts))
-            run.font.size = Pt(10) if compact else Pt(11)
-            run.font.name = 'Times New Roman'
             p.paragraph_format.space_after = Pt(2)
 
     # ─── Divider line ──────────────────────────────────────────────────────
-    p = doc.add_paragraph()
-    p.paragraph_format.space_before = Pt(3)
-    p.paragraph_format.space_after = Pt(3)
-    pPr = p._p.get_or_add_pPr()
-    pBdr = parse_xml(
-        f'<w:pBdr {nsdecls("w")}>'
-        f'<w:bottom w:val="single" w:sz="6" w:space="1" w:color="000000"/>'
-        f'</w:pBdr>'
-    )
-    pPr.append(pBdr)
+    add_rule(doc, "bottom", 6, before=3, after=3)
 
     # ─── Instructions ──────────────────────────────────────────────────────
-    instructions = data.get("instructions", [])
-    if instructions:
-        p = doc.add_paragraph()
-        run = p.add_run("General Instructions:")
-        run.bold = True
-        run.font.size = Pt(10) if compact else Pt(11)
-        run.font.name = 'Times New Roman'
-        run.underline = True
-        p.paragraph_format.space_before = Pt(2)
-        p.paragraph_format.space_after = Pt(1)
-
-        for idx, instr in enumerate(instructions, 1):
-            p = doc.add_paragraph()
-            p.paragraph_format.left_indent = Cm(0.5)
-            p.paragraph_format.space_before = Pt(0)
-            p.paragraph_format.space_after = Pt(0)
-            p.paragraph_format.line_spacing = 1.0
-            
-            run = p.add_run(f"{idx}. ")
-            run.font.size = Pt(9) if compact else Pt(10)
-            run.font.name = 'Times New Roman'
-            
-            run = p.add_run(instr)
-            run.font.size = Pt(9) if compact else Pt(10)
-            run.font.name = 'Times New Roman'
+    if paper.instructions:
+        _styled(doc.add_paragraph("General Instructions:"), 'InstructionHeading')
+
+        for idx, instr in enumerate(paper.instructions, 1):
+            _styled(doc.add_paragraph(f"{idx}. {instr}"), 'Instruction')
 
     # ─── Another divider ───────────────────────────────────────────────────
-    p = doc.add_paragraph()
-    p.paragraph_format.space_before = Pt(2)
-    p.paragraph_format.space_after = Pt(4)
-    pPr = p._p.get_or_add_pPr()
-    pBdr = parse_xml(
-        f'<w:pBdr {nsdecls("w")}>'
-        f'<w:bottom w:val="single" w:sz="4" w:space="1" w:color="000000"/>'
-        f'</w:pBdr>'
-    )
-    pPr.append(pBdr)
+    add_rule(doc, "bottom", 4, before=2, after=4)
 
     # ─── SECTIONS & QUESTIONS ──────────────────────────────────────────────
-    sections = data.get("sections", [])
-    
-    for si, section in enumerate(sections):
-        section_name = section.get("section_name", f"Section {si + 1}")
+    for si, section in enumerate(paper.sections):
+        section_name = section.name or f"Section {si + 1}"
         
         # Section header
-        p = doc.add_paragraph()
-        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        run = p.add_run(section_name.upper())
-        run.bold = True
-        run.font.size = Pt(11) if compact else Pt(12)
-        run.font.name = 'Times New Roman'
-        p.paragraph_format.space_before = Pt(6) if compact else Pt(10)
-        p.paragraph_format.space_after = Pt(3) if compact else Pt(6)
-
-        questions = section.get("questions", [])
-        
-        for qi, question in enumerate(questions):
-            q_num = question.get("number", str(qi + 1))
-            q_text = question.get("text", "")
-            q_marks = question.get("marks", "")
-            subparts = question.get("subparts", [])
+        _styled(doc.add_paragraph(section_name.upper()), 'SectionHeader')
+
+        for qi, question in enumerate(section.questions):
+            q_num = question.number or str(qi + 1)
+            q_text = question.text
+            q_marks = question.marks
+            subparts = question.subpart_texts
             
             # ── Question with marks on the right using tab stop ──
-            p = doc.add_paragraph()
-            p.paragraph_format.space_before = Pt(3) if compact else Pt(4)
-            p.paragraph_format.space_after = Pt(1) if compact else Pt(2)
-            p.paragraph_format.line_spacing = 1.0 if compact else 1.1
-            
-            # Add tab stop for right-aligned marks
-            tab_stops = p.paragraph_format.tab_stops
-            tab_stops.add_tab_stop(Cm(18.0), alignment=WD_ALIGN_PARAGRAPH.RIGHT)
+            p = _styled(doc.add_paragraph(), 'QuestionText')
             
             # Question number (bold)
-            run = p.add_run(f"Q{q_num}. ")
-            run.bold = True
-            run.font.size = Pt(10.5) if compact else Pt(11)
-            run.font.name = 'Times New Roman'
+            _styled_run(p, f"Q{q_num}. ", 'QuestionNumber')
             
             # Question text
-            run = p.add_run(q_text)
-            run.font.size = Pt(10.5) if compact else Pt(11)
-            run.font.name = 'Times New Roman'
+            p.add_run(q_text)
             
             # Marks (right-aligned via tab)
             if q_marks:
-                run = p.add_run(f"\t[{q_marks}]")
-                run.bold = True
-                run.font.size = Pt(10) if compact else Pt(11)
-                run.font.name = 'Times New Roman'
+                _styled_run(p, f"\t[{q_marks}]", 'Marks')
             
             # ── Subparts ──
             if subparts:
-                # Detect subpart type
-                is_mcq = (len(subparts) == 4 and 
-                          all(sp.strip().startswith(('(a)', '(b)', '(c)', '(d)', 
-                                                     'a)', 'b)', 'c)', 'd)',
-                                                     'A)', 'B)', 'C)', 'D)',
-                                                     '(A)', '(B)', '(C)', '(D)')) 
-                                for sp in subparts))
-                
-                # Detect match-the-following / two-column data
-                # Look for tab characters, multiple spaces (3+), or arrow/dash separators
-                import re as _re
-                is_match_columns = any(
-                    ('\t' in sp or '  ' in sp.strip() or 
-                     _re.search(r'\s{3,}', sp) or
-                     ' → ' in sp or ' -> ' in sp or ' – ' in sp or ' — ' in sp)
-                    for sp in subparts
-                )
-                
-                if is_match_columns:
+                if question.is_match:
                     # ── Match-the-following: render as a 2-column table ──
-                    # Parse each line into two columns
-                    rows_data = []
-                    for sp in subparts:
-                        sp = sp.strip()
-                        # Try splitting by tab, arrow, or multiple spaces
-                        parts = None
-                        if '\t' in sp:
-                            parts = [x.strip() for x in sp.split('\t', 1)]
-                        elif ' → ' in sp:
-                            parts = [x.strip() for x in sp.split(' → ', 1)]
-                        elif ' -> ' in sp:
-                            parts = [x.strip() for x in sp.split(' -> ', 1)]
-                        elif ' — ' in sp:
-                            parts = [x.strip() for x in sp.split(' — ', 1)]
-                        elif ' – ' in sp:
-                            parts = [x.strip() for x in sp.split(' – ', 1)]
-                        elif _re.search(r'\s{3,}', sp):
-                            parts = [x.strip() for x in _re.split(r'\s{3,}', sp, maxsplit=1)]
-                        
-                        if parts and len(parts) == 2:
-                            rows_data.append(parts)
-                        else:
-                            rows_data.append([sp, ""])
+                    rows_data = question.match_rows
                     
                     match_table = doc.add_table(rows=len(rows_data), cols=2)
                     match_table.alignment = WD_TABLE_ALIGNMENT.LEFT
@@ -359,27 +591,14 @@ def create_question_paper(
                         for ci, text in enumerate([col_a, col_b]):
                             cell = match_table.cell(ri, ci)
                             cell_para = cell.paragraphs[0]
-                            cell_para.paragraph_format.space_before = Pt(1)
-                            cell_para.paragraph_format.space_after = Pt(1)
-                            cell_para.paragraph_format.left_indent = Cm(0.2)
-                            run = cell_para.add_run(text)
-                            run.font.size = Pt(10) if compact else Pt(11)
-                            run.font.name = 'Times New Roman'
-                            
-                            # Light borders for match tables
-                            set_cell_border(cell,
-                                top={"sz": 4, "color": "CCCCCC"},
-                                bottom={"sz": 4, "color": "CCCCCC"},
-                                left={"sz": 4, "color": "CCCCCC"},
-                                right={"sz": 4, "color": "CCCCCC"})
+                            _styled(cell_para, 'MatchCell')
+                            cell_para.add_run(text)
                     
-                    for row in match_table.rows:
-                        tr = row._tr
-                        trPr = tr.get_or_add_trPr()
-                        trHeight = parse_xml(f'<w:trHeight {nsdecls("w")} w:val="300" w:hRule="atLeast"/>')
-                        trPr.append(trHeight)
+                    # Light borders for match tables
+                    set_table_borders(match_table, **all_edges(LIGHT_BORDER))
+                    set_row_heights(match_table, 300)
                 
-                elif is_mcq and compact:
+                elif compact and question.is_mcq:
                     # ── MCQ: 2x2 grid ──
                     opt_table = doc.add_table(rows=2, cols=2)
                     opt_table.alignment = WD_TABLE_ALIGNMENT.LEFT
@@ -389,135 +608,46 @@ def create_question_paper(
                         col_idx = oi % 2
                         cell = opt_table.cell(row_idx, col_idx)
                         cell_para = cell.paragraphs[0]
-                        cell_para.paragraph_format.space_before = Pt(0)
-                        cell_para.paragraph_format.space_after = Pt(0)
-                        cell_para.paragraph_format.left_indent = Cm(0.3)
-                        run = cell_para.add_run(opt.strip())
-                        run.font.size = Pt(10) if compact else Pt(11)
-                        run.font.name = 'Times New Roman'
-                        
-                        set_cell_border(cell,
-                            top={"sz": 0, "color": "FFFFFF"},
-                            bottom={"sz": 0, "color": "FFFFFF"},
-                            left={"sz": 0, "color": "FFFFFF"},
-                            right={"sz": 0, "color": "FFFFFF"})
+                        _styled(cell_para, 'OptionCell')
+                        cell_para.add_run(opt)
                     
-                    for row in opt_table.rows:
-                        tr = row._tr
-                        trPr = tr.get_or_add_trPr()
-                        trHeight = parse_xml(f'<w:trHeight {nsdecls("w")} w:val="280" w:hRule="atLeast"/>')
-                        trPr.append(trHeight)
+                    set_table_borders(opt_table, **all_edges(NO_BORDER))
+                    set_row_heights(opt_table, 280)
                 else:
                     # ── Regular subparts ──
                     for sp in subparts:
-                        p = doc.add_paragraph()
-                        p.paragraph_format.left_indent = Cm(1.2)
-                        p.paragraph_format.space_before = Pt(0)
-                        p.paragraph_format.space_after = Pt(0)
-                        p.paragraph_format.line_spacing = 1.0
-                        
-                        run = p.add_run(sp.strip())
-                        run.font.size = Pt(10) if compact else Pt(11)
-                        run.font.name = 'Times New Roman'
+                        _styled(doc.add_paragraph(sp), 'Subpart')
 
             # ── Question Image ──
             if question_images:
-                img_key = f"{si}_{qi}"
-                if img_key in question_images:
-                    img_path = question_images[img_key]
-                    if os.path.exists(img_path):
-                        p = doc.add_paragraph()
-                        p.paragraph_format.left_indent = Cm(0.5)
-                        p.paragraph_format.space_before = Pt(4)
-                        p.paragraph_format.space_after = Pt(4)
-                        p.paragraph_format.line_spacing = 1.0
-                        
-                        # Calculate max width based on mode
-                        max_width_cm = 8.0 if compact else 10.0
-                        
-                        try:
-                            from PIL import Image as PILImage
-                            with PILImage.open(img_path) as img:
-                                w, h = img.size
-                                aspect = h / w
-                                width_cm = min(max_width_cm, w * 0.0264583)  # px to cm approx
-                                height_cm = width_cm * aspect
-                                # Cap height to avoid full-page images
-                                max_height_cm = 8.0 if compact else 10.0
-                                if height_cm > max_height_cm:
-                                    height_cm = max_height_cm
-                                    width_cm = height_cm / aspect
-                                run = p.add_run()
-                                run.add_picture(img_path, width=Cm(width_cm))
-                        except ImportError:
-                            # No PIL, just insert with fixed width
-                            run = p.add_run()
-                            run.add_picture(img_path, width=Cm(max_width_cm))
+                img = question_image(find_question_image(question_images, si, qi, question), style)
+                if img is not None:
+                    p = _styled(doc.add_paragraph(), 'QuestionImage')
+                    p.add_run().add_picture(io.BytesIO(img.data), width=Cm(img.width_cm))
 
     # ─── Footer: End of Paper ──────────────────────────────────────────────
-    p = doc.add_paragraph()
-    p.paragraph_format.space_before = Pt(12)
-    pPr = p._p.get_or_add_pPr()
-    pBdr = parse_xml(
-        f'<w:pBdr {nsdecls("w")}>'
-        f'<w:top w:val="single" w:sz="4" w:space="1" w:color="000000"/>'
-        f'</w:pBdr>'
-    )
-    pPr.append(pBdr)
+    add_rule(doc, "top", 4, before=12)
     
-    p = doc.add_paragraph()
-    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    run = p.add_run("— End of Question Paper —")
-    run.italic = True
-    run.font.size = Pt(9)
-    run.font.name = 'Times New Roman'
-    run.font.color.rgb = RGBColor(100, 100, 100)
+    _styled(doc.add_paragraph("— End of Question Paper —"), 'EndOfPaper')
 
-    # ─── Page numbers in footer ────────────────────────────────────────────
-    for section in doc.sections:
-        footer = section.footer
-        footer.is_linked_to_previous = False
-        fp = footer.paragraphs[0] if footer.paragraphs else footer.add_paragraph()
-        fp.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        fp.paragraph_format.space_before = Pt(0)
-        fp.paragraph_format.space_after = Pt(0)
-        
-        run = fp.add_run("Page ")
-        run.font.size = Pt(8)
-        run.font.name = 'Times New Roman'
-        run.font.color.rgb = RGBColor(128, 128, 128)
-        
-        # Add page number field
-        fldChar1 = parse_xml(f'<w:fldChar {nsdecls("w")} w:fldCharType="begin"/>')
-        run1 = fp.add_run()
-        run1._r.append(fldChar1)
-        
-        instrText = parse_xml(f'<w:instrText {nsdecls("w")} xml:space="preserve"> PAGE </w:instrText>')
-        run2 = fp.add_run()
-        run2._r.append(instrText)
-        run2.font.size = Pt(8)
-        run2.font.name = 'Times New Roman'
-        run2.font.color.rgb = RGBColor(128, 128, 128)
-        
-        fldChar2 = parse_xml(f'<w:fldChar {nsdecls("w")} w:fldCharType="end"/>')
-        run3 = fp.add_run()
-        run3._r.append(fldChar2)
+    # Page numbers in the footer come with the template
 
     # ─── Save ──────────────────────────────────────────────────────────────
-    doc.save(output_path)
-    return output_path
+    with span("render.save"):
+        doc.save(output_path)
 
 
-def generate_filename(data: dict) -> str:
-    """Generate a descriptive filename from structured data."""
+def generate_filename(data) -> str:
+    """Generate a descriptive filename from structured data (a dict or a Paper)."""
+    paper = as_paper(data)
     parts = []
-    if data.get("class"):
-        parts.append(f"Class_{data['class']}")
-    if data.get("subject"):
-        parts.append(data['subject'].replace(" ", "_"))
-    if data.get("exam_title"):
+    if paper.class_name:
+        parts.append(f"Class_{paper.class_name}")
+    if paper.subject:
+        parts.append(paper.subject.replace(" ", "_"))
+    if paper.exam_title:
         # Take first few words
-        title_words = data['exam_title'].split()[:3]
+        title_words = paper.exam_title.split()[:3]
         parts.append("_".join(title_words))
     
     parts.append(datetime.now().strftime("%Y%m%d"))
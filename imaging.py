@@ -0,0 +1,308 @@
+"""
+Image preprocessing helpers built on Pillow.
+Shrinks phone photos before they are sent to the vision model, and turns
+question images into print-sized PNG/JPEG parts for the .docx.
+"""
+
+import collections
+import hashlib
+import io
+import threading
+from dataclasses import dataclass
+
+
+# GPT-4o "high" detail fits the image inside 2048x2048 and then scales the
+# shortest side down to 768px, so anything larger is wasted upload.
+OCR_MAX_SIDE = 2048
+OCR_SHORT_SIDE = 768
+OCR_FORMAT = "JPEG"
+OCR_QUALITY = 80
+
+_MIME_BY_FORMAT = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+
+
+def target_size(width: int, height: int, max_side: int = OCR_MAX_SIDE, short_side: int = OCR_SHORT_SIDE) -> tuple:
+    """Size the vision model would resample (width, height) to. Never upscales."""
+    scale = min(1.0, max_side / max(width, height))
+    if short_side:
+        scale = min(scale, short_side / min(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def prepare_for_ocr(
+    image_path: str,
+    max_side: int = OCR_MAX_SIDE,
+    short_side: int = OCR_SHORT_SIDE,
+    grayscale: bool = True,
+    fmt: str = OCR_FORMAT,
+    quality: int = OCR_QUALITY,
+) -> tuple:
+    """
+    Fix EXIF orientation, downscale, optionally convert to grayscale and
+    recompress an image for OCR.
+
+    Returns (image_bytes, mime_type, stats) where stats has original_bytes,
+    encoded_bytes, saved_bytes, original_size and size. If Pillow is not
+    installed or the file cannot be decoded, the original bytes are returned
+    unchanged.
+    """
+    with open(image_path, "rb") as f:
+        original = f.read()
+    stats = {
+        "original_bytes": len(original),
+        "encoded_bytes": len(original),
+        "saved_bytes": 0,
+        "original_size": None,
+        "size": None,
+    }
+
+    try:
+        from PIL import Image as PILImage, ImageOps
+    except ImportError:
+        return original, None, stats
+
+    try:
+        with PILImage.open(io.BytesIO(original)) as img:
+            stats["original_size"] = img.size
+            img = ImageOps.exif_transpose(img)
+            img = img.convert("L") if grayscale else img.convert("RGB")
+            size = target_size(img.width, img.height, max_side, short_side)
+            if size != img.size:
+                img = img.resize(size, PILImage.LANCZOS)
+            stats["size"] = img.size
+
+            buf = io.BytesIO()
+            fmt = fmt.upper()
+            if fmt == "PNG":
+                img.save(buf, format="PNG", optimize=True)
+            else:
+                img.save(buf, format=fmt, quality=quality, optimize=True)
+            encoded = buf.getvalue()
+    except (OSError, ValueError):
+        return original, None, stats
+
+    # Keep the original if recompression somehow made it bigger
+    if len(encoded) >= len(original):
+        return original, None, stats
+
+    stats["encoded_bytes"] = len(encoded)
+    stats["saved_bytes"] = len(original) - len(encoded)
+    return encoded, _MIME_BY_FORMAT.get(fmt, "image/jpeg"), stats
+
+
+# ─── Print images ──────────────────────────────────────────────────────────────
+
+# Question images print at most 8-10 cm wide; 200 dpi is sharp on an office
+# laser printer without shipping phone-camera resolution into the .docx.
+PRINT_DPI = 200
+PRINT_JPEG_QUALITY = 85
+# Pixels lighter than this count as paper when cropping margins away
+PAPER_WHITE = 235
+PRINT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+CM_PER_PX = 0.0264583  # native size at 96 dpi
+
+
+@dataclass(frozen=True)
+class PrintImage:
+    """A question image ready to embed: encoded bytes and the size to print it at."""
+    data: bytes
+    ext: str
+    width_cm: float
+    height_cm: float
+    original_bytes: int
+    size: tuple
+
+
+def print_width_cm(width_px: int, height_px: int, max_cm: float) -> float:
+    """Print width: native size, capped at max_cm on either side."""
+    aspect = height_px / width_px
+    width_cm = min(max_cm, width_px * CM_PER_PX)
+    # Cap height to avoid full-page images
+    if width_cm * aspect > max_cm:
+        width_cm = max_cm / aspect
+    return width_cm
+
+
+def _flatten(img):
+    """RGB/L on a white background - transparency means paper when printed."""
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        from PIL import Image as PILImage
+        rgba = img.convert("RGBA")
+        background = PILImage.new("RGB", rgba.size, "white")
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    return img.convert("L") if img.mode in ("1", "L", "I;16", "I") else img.convert("RGB")
+
+
+def _autocrop(img):
+    """Trim paper-white margins, keeping a small border around the content."""
+    ink = img.convert("L").point(lambda v: 255 if v < PAPER_WHITE else 0)
+    bbox = ink.getbbox()
+    if not bbox:
+        return img
+    pad = max(4, round(min(img.size) * 0.01))
+    left, top, right, bottom = bbox
+    bbox = (max(0, left - pad), max(0, top - pad), min(img.width, right + pad), min(img.height, bottom + pad))
+    return img if bbox == (0, 0, img.width, img.height) else img.crop(bbox)
+
+
+def _is_grayscale(img) -> bool:
+    from PIL import ImageChops
+    r, g, b = img.resize((64, 64)).split()
+    return all(ImageChops.difference(x, y).getextrema()[1] <= 12 for x, y in ((r, g), (g, b)))
+
+
+def prepare_for_print(data: bytes, max_cm: float, dpi: int = PRINT_DPI) -> PrintImage:
+    """
+    Decode a question image once, fix EXIF orientation, crop white
+    margins, resample to exactly dpi at its print width and re-encode:
+    PNG for flat line art (<= 256 colours, when smaller), JPEG for photos,
+    greyscale ones included. Without Pillow, or for undecodable data, the
+    original bytes are kept and printed max_cm wide.
+    """
+    fallback = PrintImage(data, None, max_cm, None, len(data), None)
+    try:
+        from PIL import Image as PILImage, ImageOps
+    except ImportError:
+        return fallback
+
+    try:
+        with PILImage.open(io.BytesIO(data)) as img:
+            img = _flatten(ImageOps.exif_transpose(img))
+        img = _autocrop(img)
+        if img.mode == "RGB" and _is_grayscale(img):
+            img = img.convert("L")
+
+        width_cm = print_width_cm(img.width, img.height, max_cm)
+        height_cm = width_cm * img.height / img.width
+        size = (max(1, round(width_cm / 2.54 * dpi)), max(1, round(height_cm / 2.54 * dpi)))
+        if size[0] < img.width:
+            img = img.resize(size, PILImage.LANCZOS)
+
+        buf = io.BytesIO()
+        img.save(buf, format="JPEG", quality=PRINT_JPEG_QUALITY, optimize=True, dpi=(dpi, dpi))
+        out, ext = buf.getvalue(), "jpeg"
+        colors = img.getcolors(256)
+        if colors is not None:
+            # Flat line art is smaller (and sharper) as PNG. Every "L" image
+            # passes the colour test, greyscale photos included, so the PNG
+            # is only kept when it actually comes out smaller.
+            buf = io.BytesIO()
+            flat = img.quantize(colors=len(colors)) if img.mode == "RGB" else img
+            flat.save(buf, format="PNG", optimize=True, dpi=(dpi, dpi))
+            if buf.tell() < len(out):
+                out, ext = buf.getvalue(), "png"
+    except (OSError, ValueError):
+        return fallback
+
+    return PrintImage(out, ext, width_cm, height_cm, len(data), img.size)
+
+
+class _PrintCache:
+    """LRU of prepared print images keyed by (content hash, max_cm, dpi), bounded in bytes."""
+
+    def __init__(self, max_bytes: int = PRINT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            image = self._entries.get(key)
+            if image is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return image
+
+    def put(self, key, image: PrintImage) -> None:
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = image
+            self._bytes += len(image.data)
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, old = self._entries.popitem(last=False)
+                self._bytes -= len(old.data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+
+_print_cache = _PrintCache()
+
+
+def print_image(data: bytes, max_cm: float, dpi: int = PRINT_DPI) -> PrintImage:
+    """prepare_for_print, memoized so re-rendering the same paper decodes nothing."""
+    key = (hashlib.sha256(data).hexdigest(), max_cm, dpi)
+    image = _print_cache.get(key)
+    if image is None:
+        image = prepare_for_print(data, max_cm, dpi)
+        _print_cache.put(key, image)
+    return image
+
+
+def print_cache_stats() -> dict:
+    return _print_cache.stats()
+
+
+# ─── Preview thumbnails ────────────────────────────────────────────────────────
+
+# The editor preview shows images at most ~180px tall; 2x that stays sharp
+# on high-dpi screens and keeps data URIs in the tens of KB.
+PREVIEW_MAX_SIDE = 360
+PREVIEW_JPEG_QUALITY = 80
+
+
+def preview_thumbnail(data: bytes, max_side: int = PREVIEW_MAX_SIDE) -> tuple:
+    """
+    Small (bytes, mime) version of an image for the HTML preview: PNG when
+    it has transparency, JPEG otherwise. Without Pillow, or for
+    undecodable data, the original bytes are returned with a sniffed mime.
+    """
+    try:
+        from PIL import Image as PILImage, ImageOps
+    except ImportError:
+        return data, _sniff_mime(data)
+
+    try:
+        with PILImage.open(io.BytesIO(data)) as img:
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((max_side, max_side), PILImage.LANCZOS)
+            buf = io.BytesIO()
+            if img.mode in ("RGBA", "LA", "P"):
+                img.save(buf, format="PNG", optimize=True)
+                mime = "image/png"
+            else:
+                img.convert("RGB").save(buf, format="JPEG", quality=PREVIEW_JPEG_QUALITY, optimize=True)
+                mime = "image/jpeg"
+    except (OSError, ValueError):
+        return data, _sniff_mime(data)
+
+    if len(buf.getvalue()) >= len(data):
+        return data, _sniff_mime(data)
+    return buf.getvalue(), mime
+
+
+def _sniff_mime(data: bytes) -> str:
+    if data[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    return "image/png"
+
+
+def format_bytes(n: int) -> str:
+    """Human-readable byte count, e.g. 4.2 MB."""
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
@@ -0,0 +1,341 @@
+"""
+Background OCR jobs that outlive Streamlit reruns and reconnects.
+
+submit() stores a job in a SQLite database and hands it to a local
+thread pool, which runs stream_images_to_structured and writes progress
+(stage, pages done, live OCR text) back to the row as it goes. The
+Streamlit script only polls get(); a rerun, refresh or dropped websocket
+no longer kills the paid-for API calls, and a reconnecting browser picks
+the result up by job id. OCR waits on the network, so one server runs
+many jobs side by side (PRASHNAPRO_JOB_WORKERS, default 8).
+
+API keys are held in memory only and never written to the database, so
+a job dies with the server process that took it. Each job records its
+owner (host, process id and boot id); a job whose owner is gone is marked
+failed when another server opens the database or a client polls it.
+Several server processes can share one database. Submitting a failed
+job again is cheap because finished OCR and structuring results are in
+the OCR cache.
+
+Inspect from the command line:
+    python jobs.py list
+    python jobs.py purge [--older-than SECONDS]   # default PRASHNAPRO_JOB_TTL
+"""
+
+import contextlib
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from metrics import trace
+from ocr import stream_images_to_structured
+from scheduler import session as api_session
+
+
+DEFAULT_JOBS_DB = os.environ.get(
+    "PRASHNAPRO_JOBS_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "jobs.db"),
+)
+DEFAULT_WORKERS = int(os.environ.get("PRASHNAPRO_JOB_WORKERS", 8))
+JOB_TTL_SECONDS = int(os.environ.get("PRASHNAPRO_JOB_TTL", 24 * 3600))
+PROGRESS_INTERVAL = 0.3  # seconds between progress writes while streaming
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    session TEXT,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    progress TEXT NOT NULL DEFAULT '{}',
+    result TEXT,
+    error TEXT,
+    error_type TEXT,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    owner TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created);
+"""
+
+ORPHANED = "The server handling this job stopped before it finished. Please try again."
+
+
+def _boot_id() -> str:
+    """Changes on every reboot (Linux), so a pid from before a reboot is never taken as alive."""
+    try:
+        with open("/proc/sys/kernel/random/boot_id", encoding="ascii") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+# host:pid:boot id of this process, stored with every job it takes
+OWNER = f"{socket.gethostname()}:{os.getpid()}:{_boot_id()}"
+
+
+def _owner_alive(owner: str) -> bool:
+    """Whether the process that took a job may still be running it."""
+    if not owner:
+        return False  # written before owners were recorded
+    host, pid, boot = (owner.split(":") + ["", ""])[:3]
+    if host != socket.gethostname():
+        return True  # another machine sharing the database; it cleans up its own jobs
+    if boot != _boot_id():
+        return False
+    if os.name == "nt":
+        return True  # os.kill would terminate the process
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        pass  # alive under another user, or an owner we cannot parse
+    return True
+
+
+def _purge(db, older_than: float) -> int:
+    """Delete finished jobs older than older_than seconds. Returns how many."""
+    cur = db.execute(f"DELETE FROM jobs WHERE status IN ({', '.join('?' * len(FINISHED))}) AND finished < ?",
+                     (*FINISHED, time.time() - older_than))
+    return cur.rowcount
+
+
+class JobCancelled(Exception):
+    pass
+
+
+@dataclass
+class Job:
+    id: str
+    status: str
+    progress: dict = field(default_factory=dict)  # stage, pages_done, n_pages, page_text, raw_text
+    result: dict = None                           # structured, raw_text, image_stats
+    error: str = None
+    error_type: str = None
+    created: float = 0.0
+    started: float = None
+    finished: float = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED
+
+
+class JobQueue:
+    """SQLite-backed job store plus the thread pool that works through it."""
+
+    def __init__(self, path: str = DEFAULT_JOBS_DB, workers: int = DEFAULT_WORKERS):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as db:
+            db.executescript(_SCHEMA)
+            if "owner" not in {row[1] for row in db.execute("PRAGMA table_info(jobs)")}:
+                db.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        self._fail_orphans()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr-job")
+        self._secrets = {}  # job id -> api key, memory only
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """Autocommit connection in WAL mode, so pollers never block the writing workers."""
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            yield db
+        finally:
+            db.close()
+
+    def _update(self, job_id: str, only_if: str = None, **columns) -> None:
+        """Set columns of a job; with only_if, only while it still has that status."""
+        for name in ("progress", "result"):
+            if name in columns:
+                columns[name] = json.dumps(columns[name], ensure_ascii=False)
+        assignments = ", ".join(f"{name} = ?" for name in columns)
+        where, args = "id = ?", [job_id]
+        if only_if:
+            where, args = where + " AND status = ?", args + [only_if]
+        with self._connect() as db:
+            db.execute(f"UPDATE jobs SET {assignments} WHERE {where}", (*columns.values(), *args))
+
+    # ─── Client side ───────────────────────────────────────────────────────
+
+    def submit(self, image_paths: list, api_key: str, model_name: str = "gpt-4o",
+               per_page: bool = False, base_url: str = None, session_id: str = None) -> str:
+        """Queue an OCR + structuring job. Returns its id at once."""
+        job_id = uuid.uuid4().hex
+        params = {"image_paths": list(image_paths), "model_name": model_name,
+                  "per_page": per_page, "base_url": base_url}
+        with self._connect() as db:
+            db.execute("INSERT INTO jobs (id, session, status, params, progress, created, owner) "
+                       "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                       (job_id, session_id, QUEUED, json.dumps(params),
+                        json.dumps({"stage": "queued", "pages_done": 0, "n_pages": len(image_paths)}),
+                        time.time(), OWNER))
+        with self._lock:
+            self._secrets[job_id] = api_key
+        self._pool.submit(self._run, job_id, params, session_id)
+        self.purge()
+        return job_id
+
+    def get(self, job_id: str) -> Job:
+        """Current state of a job, or None if unknown (or purged)."""
+        with self._connect() as db:
+            row = db.execute("SELECT id, status, progress, result, error, error_type, created, started, finished, "
+                             "owner FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        if row[1] in (QUEUED, RUNNING) and row[9] != OWNER and not _owner_alive(row[9]):
+            self._fail_orphans([job_id])
+            return self.get(job_id)
+        return Job(row[0], row[1], json.loads(row[2] or "{}"), json.loads(row[3]) if row[3] else None,
+                   row[4], row[5], row[6], row[7], row[8])
+
+    def cancel(self, job_id: str) -> None:
+        """Stop a job; a running one stops at its next progress event."""
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET status = ?, finished = ? WHERE id = ? AND status IN (?, ?)",
+                       (CANCELLED, time.time(), job_id, QUEUED, RUNNING))
+
+    def list(self, limit: int = 50) -> list:
+        with self._connect() as db:
+            rows = db.execute("SELECT id FROM jobs ORDER BY created DESC LIMIT ?", (limit,)).fetchall()
+        return [self.get(r[0]) for r in rows]
+
+    def counts(self) -> dict:
+        """Jobs per status."""
+        with self._connect() as db:
+            return dict(db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def purge(self, older_than: float = JOB_TTL_SECONDS) -> int:
+        """Delete finished jobs older than older_than seconds. Returns how many."""
+        with self._connect() as db:
+            return _purge(db, older_than)
+
+    # ─── Worker side ───────────────────────────────────────────────────────
+
+    def _fail_orphans(self, job_ids: list = None) -> int:
+        """Mark failed the unfinished jobs (all, or these) whose owning process is gone."""
+        with self._connect() as db:
+            rows = db.execute("SELECT id, owner FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)).fetchall()
+            orphans = [job_id for job_id, owner in rows
+                       if (job_ids is None or job_id in job_ids) and owner != OWNER and not _owner_alive(owner)]
+            for job_id in orphans:
+                db.execute("UPDATE jobs SET status = ?, error = ?, finished = ? WHERE id = ? AND status IN (?, ?)",
+                           (FAILED, ORPHANED, time.time(), job_id, QUEUED, RUNNING))
+        return len(orphans)
+
+    def _status(self, job_id: str) -> str:
+        with self._connect() as db:
+            row = db.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def _run(self, job_id: str, params: dict, session_id: str) -> None:
+        with self._lock:
+            api_key = self._secrets.pop(job_id, None)
+        if self._status(job_id) != QUEUED:
+            return
+        self._update(job_id, only_if=QUEUED, status=RUNNING, started=time.time())
+        try:
+            # The job id doubles as the trace id: cache/traces/<job id>.json
+            with api_session(session_id), trace("ocr_job", trace_id=job_id, session=session_id,
+                                                pages=len(params["image_paths"])):
+                result = self._stream(job_id, params, api_key)
+            self._update(job_id, only_if=RUNNING, status=DONE, result=result, finished=time.time(),
+                         progress={"stage": "done", "pages_done": len(params["image_paths"]),
+                                   "n_pages": len(params["image_paths"])})
+        except JobCancelled:
+            pass
+        except Exception as e:
+            self._update(job_id, only_if=RUNNING, status=FAILED, error=str(e), error_type=type(e).__name__,
+                         finished=time.time())
+
+    def _stream(self, job_id: str, params: dict, api_key: str) -> dict:
+        """Run the OCR pipeline, saving progress as it streams."""
+        n_pages = len(params["image_paths"])
+        progress = {"stage": "ocr", "pages_done": 0, "n_pages": n_pages, "page_text": {}, "json_chars": 0}
+        image_stats, last_write = [], 0.0
+        data = raw = None
+        for event, payload in stream_images_to_structured(
+            params["image_paths"], api_key, model_name=params["model_name"], per_page=params["per_page"],
+            base_url=params["base_url"], image_stats=image_stats,
+        ):
+            if event == "ocr_delta":
+                page, text = payload
+                progress["page_text"][str(page)] = progress["page_text"].get(str(page), "") + text
+            elif event == "page_done":
+                page, text = payload
+                progress["page_text"][str(page)] = text
+                progress["pages_done"] += 1 if page else n_pages
+            elif event == "ocr_done":
+                progress.update(stage="structure", raw_text=payload, page_text={})
+            elif event == "section":
+                progress["section"] = {"name": payload.get("section_name", ""),
+                                       "questions": len(payload.get("questions", []))}
+            elif event == "structure_delta":
+                progress["json_chars"] += len(payload)
+            elif event == "result":
+                data, raw = payload
+                continue
+
+            now = time.monotonic()
+            if event in ("page_done", "ocr_done", "section") or now - last_write > PROGRESS_INTERVAL:
+                last_write = now
+                if self._status(job_id) == CANCELLED:
+                    raise JobCancelled()
+                self._update(job_id, only_if=RUNNING, progress=progress)
+        return {"structured": data, "raw_text": raw, "image_stats": [s for s in image_stats if s]}
+
+
+_default_queue = None
+_default_lock = threading.Lock()
+
+
+def default_queue() -> JobQueue:
+    """Process-wide queue; every Streamlit session in this server shares its workers."""
+    global _default_queue
+    if _default_queue is None:
+        with _default_lock:
+            if _default_queue is None:
+                _default_queue = JobQueue()
+    return _default_queue
+
+
+def main(argv: list) -> int:
+    older_than = JOB_TTL_SECONDS
+    if argv[:2] == ["purge", "--older-than"]:
+        try:
+            older_than = float(argv[2])
+            argv = argv[:1] + argv[3:]
+        except (IndexError, ValueError):
+            argv = []
+    if argv not in (["list"], ["purge"]):
+        print("Usage: python jobs.py list | purge [--older-than SECONDS]")
+        return 2
+    # Read the database directly; no need for a JobQueue and its worker threads
+    with sqlite3.connect(DEFAULT_JOBS_DB) as db:
+        db.executescript(_SCHEMA)
+        if argv[0] == "list":
+            for job_id, status, created, error in db.execute(
+                    "SELECT id, status, created, error FROM jobs ORDER BY created DESC LIMIT 50"):
+                stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(created))
+                print(f"{job_id}  {stamp}  {status:<9} {error or ''}")
+        else:
+            # Same TTL as the server, so results a browser still polls via ?job= are kept
+            print(f"Removed {_purge(db, older_than)} finished jobs older than {older_than:g}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
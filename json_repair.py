@@ -0,0 +1,223 @@
+"""
+Tolerant JSON parsing for LLM output.
+Repairs the usual defects locally (code fences, trailing commas, raw
+newlines in strings, output truncated mid-object) so the network "fix the
+JSON" retry is only needed as a last resort, and parses streamed output
+incrementally so sections can be shown as soon as they are complete.
+"""
+
+import json
+import re
+import threading
+
+
+_CLOSER = {"{": "}", "[": "]"}
+_PARTIAL_LITERAL = re.compile(r"(?<=[\[:,])\s*(?:t|tr|tru|f|fa|fal|fals|n|nu|nul|-|\d+\.|\d+[eE][+-]?)$")
+
+_stats_lock = threading.Lock()
+_stats = {"clean": 0, "repaired": 0, "failed": 0}
+
+
+def strip_fences(text: str) -> str:
+    """Remove markdown code fences and any prose before the first { or [."""
+    text = text.strip()
+    text = re.sub(r'^```(?:json)?\s*', '', text)
+    text = re.sub(r'\s*```$', '', text)
+    return text.strip()
+
+
+def _strip_trailing_comma(out: list) -> None:
+    """Drop whitespace and a trailing comma from the end of out."""
+    i = len(out) - 1
+    while i >= 0 and out[i].isspace():
+        i -= 1
+    if i >= 0 and out[i] == ",":
+        del out[i:]
+
+
+def _trim_dangling(text: str, top: str) -> str:
+    """
+    Remove an incomplete member from the end of truncated JSON: a trailing
+    comma, a key with no value, a dangling colon or a half-written literal.
+    """
+    while True:
+        before = text
+        text = text.rstrip()
+        if text.endswith(","):
+            text = text[:-1]
+        elif text.endswith(":"):
+            # "key": with no value - drop the key as well
+            text = re.sub(r'"(?:[^"\\]|\\.)*"\s*:$', "", text)
+        elif top == "{" and text.endswith('"'):
+            # A string directly after { or , inside an object is a key with no value
+            m = re.search(r'([{,])\s*"(?:[^"\\]|\\.)*"$', text)
+            if m:
+                text = text[:m.start() + 1]
+        else:
+            text = _PARTIAL_LITERAL.sub("", text)
+        if text == before:
+            return text
+
+
+def repair_json(text: str) -> str:
+    """
+    Best-effort repair of malformed JSON text. Returns a string that is
+    much more likely to parse; raises ValueError if there is no JSON at all.
+    """
+    text = strip_fences(text)
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    if not starts:
+        raise ValueError("No JSON object found")
+
+    out, stack = [], []
+    in_str = esc = False
+    for ch in text[min(starts):]:
+        if in_str:
+            if esc:
+                esc = False
+            elif ch == "\\":
+                esc = True
+            elif ch == '"':
+                in_str = False
+            elif ch == "\n":
+                ch = "\\n"
+            elif ch == "\t":
+                ch = "\\t"
+            out.append(ch)
+            continue
+        if ch == '"':
+            in_str = True
+            out.append(ch)
+        elif ch in _CLOSER:
+            stack.append(ch)
+            out.append(ch)
+        elif ch in "}]":
+            if not stack:
+                break
+            _strip_trailing_comma(out)
+            out.append(_CLOSER[stack.pop()])
+            if not stack:
+                break  # ignore anything after the root value
+        else:
+            out.append(ch)
+
+    if in_str:
+        if esc:
+            out.pop()
+        out.append('"')
+    repaired = "".join(out)
+    while stack:
+        repaired = _trim_dangling(repaired, stack[-1])
+        repaired += _CLOSER[stack.pop()]
+    return repaired
+
+
+def loads_tolerant(text: str):
+    """
+    Parse JSON, repairing it locally if needed.
+    Returns (value, repaired) and raises ValueError if repair fails too.
+    """
+    try:
+        value = json.loads(strip_fences(text))
+        _count("clean")
+        return value, False
+    except ValueError:
+        pass
+    try:
+        value = json.loads(repair_json(text))
+    except ValueError:
+        _count("failed")
+        raise
+    _count("repaired")
+    return value, True
+
+
+def _count(outcome: str) -> None:
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def repair_stats() -> dict:
+    """
+    Counts of clean, locally repaired and unrepairable replies, plus
+    repair_rate: the share of malformed replies fixed without a retry.
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    malformed = stats["repaired"] + stats["failed"]
+    stats["repair_rate"] = stats["repaired"] / malformed if malformed else 1.0
+    return stats
+
+
+class IncrementalJSONParser:
+    """
+    Feed streamed JSON text chunk by chunk. feed() returns the elements of
+    the root object's `array_key` array (the paper's sections by default)
+    that were completed by the chunk, fully parsed.
+    """
+
+    def __init__(self, array_key: str = "sections"):
+        self.array_key = array_key
+        self.buffer = ""
+        self._pos = 0
+        self._in_str = False
+        self._esc = False
+        self._str_start = 0
+        self._last_str = None
+        # One entry per open container: [char, start, key it opened under, pending key]
+        self._stack = []
+        self._started = False
+
+    def feed(self, chunk: str) -> list:
+        self.buffer += chunk
+        done = []
+        buf = self.buffer
+        for i in range(self._pos, len(buf)):
+            ch = buf[i]
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif ch == "\\":
+                    self._esc = True
+                elif ch == '"':
+                    self._in_str = False
+                    self._last_str = buf[self._str_start + 1:i]
+                continue
+            if not self._started:
+                # Skip code fences / prose before the root value
+                if ch not in "{[":
+                    continue
+                self._started = True
+            if ch == '"':
+                self._in_str = True
+                self._str_start = i
+            elif ch == ":":
+                if self._stack:
+                    self._stack[-1][3] = self._last_str
+            elif ch == ",":
+                if self._stack:
+                    self._stack[-1][3] = None
+            elif ch in _CLOSER:
+                key = self._stack[-1][3] if self._stack and self._stack[-1][0] == "{" else None
+                self._stack.append([ch, i, key, None])
+            elif ch in "}]" and self._stack:
+                _, start, _, _ = self._stack.pop()
+                if self._is_array_element():
+                    try:
+                        done.append(json.loads(buf[start:i + 1]))
+                    except ValueError:
+                        pass
+        self._pos = len(buf)
+        return done
+
+    def _is_array_element(self) -> bool:
+        """True if the container just closed was a direct child of root[array_key]."""
+        return (len(self._stack) == 2 and self._stack[0][0] == "{"
+                and self._stack[1][0] == "[" and self._stack[1][2] == self.array_key)
+
+    def snapshot(self):
+        """Best-effort parse of everything received so far, or None."""
+        try:
+            return json.loads(repair_json(self.buffer))
+        except ValueError:
+            return None
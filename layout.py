@@ -0,0 +1,439 @@
+"""
+Page-count estimate for a question paper, before it is generated.
+
+Flows the paper the way Word lays out create_question_paper's .docx:
+Times New Roman advance widths, the PaperStyle font sizes, line and
+paragraph spacing, table cell margins and minimum row heights, and the
+print size of every image. Lines wrap greedily; there is no widow/orphan
+control (the template has none) and space before a paragraph is dropped
+at the top of a page, as Word does. Kerning, Devanagari (measured with
+average metrics) and Word's own rounding make it drift by a few lines on
+long papers, but one estimate takes about a millisecond, so fit_to_pages
+can try dozens of styles per request.
+
+Usage:
+    from layout import estimate_layout, fit_to_pages
+    est = estimate_layout(data, compact=True)
+    print(est.pages, est.breaks)
+    style = fit_to_pages(data, 2)   # then create_question_paper(data, path, style=style)
+
+    python layout.py output/paper.json [--fit 2]
+"""
+
+import dataclasses
+import functools
+import math
+import re
+from dataclasses import dataclass
+
+from formatter import (
+    PaperStyle, find_question_image, image_bytes, paper_meta_parts, paper_style, question_image,
+)
+from model import Paper, as_paper
+
+
+PT_PER_CM = 72 / 2.54
+PAGE_WIDTH_CM = 21.0   # A4
+PAGE_HEIGHT_CM = 29.7
+MARKS_TAB_CM = 18.0    # right tab stop of QuestionText
+CELL_MARGIN_CM = 0.19  # Word's default left/right cell margin
+FOOTER_DISTANCE_CM = 1.27
+FOOTER_SIZE = 8
+LOGO_IN_TABLE_CM = 1.8
+LOGO_ALONE_CM = 2.0
+LOGO_COLUMN_CM = 2.5
+
+# Times New Roman "single" line height (ascent + descent + line gap) in em;
+# Devanagari falls back to Nirmala UI/Mangal, which are taller
+LINE_HEIGHT = 1.15
+DEVANAGARI_LINE_HEIGHT = 1.33
+# Average advance for characters outside the Latin table, in em
+DEVANAGARI_ADVANCE = 0.5
+OTHER_ADVANCE = 0.55
+TAB_PT = 36.0  # default tab stops every 0.5"
+
+# Times-Roman and Times-Bold advance widths (1/1000 em) for ' '..'~'
+_TIMES = (
+    250, 333, 408, 500, 500, 833, 778, 180, 333, 333, 500, 564, 250, 333, 250, 278, 500, 500, 500, 500,
+    500, 500, 500, 500, 500, 500, 278, 278, 564, 564, 564, 444, 921, 722, 667, 667, 722, 611, 556, 722,
+    722, 333, 389, 722, 611, 889, 722, 722, 556, 722, 667, 556, 611, 722, 722, 944, 722, 722, 611, 333,
+    278, 333, 469, 500, 333, 444, 500, 444, 500, 444, 333, 500, 500, 278, 278, 500, 278, 778, 500, 500,
+    500, 500, 333, 389, 278, 500, 500, 722, 500, 500, 444, 480, 200, 480, 541,
+)
+_TIMES_BOLD = (
+    250, 333, 555, 500, 500, 1000, 833, 278, 333, 333, 500, 570, 250, 333, 250, 278, 500, 500, 500, 500,
+    500, 500, 500, 500, 500, 500, 333, 333, 570, 570, 570, 500, 930, 722, 667, 722, 722, 667, 611, 778,
+    778, 389, 500, 778, 667, 944, 722, 778, 611, 778, 722, 556, 667, 722, 722, 1000, 722, 722, 667, 333,
+    278, 333, 581, 500, 333, 500, 556, 444, 556, 444, 333, 500, 556, 278, 333, 556, 278, 833, 556, 500,
+    556, 556, 444, 389, 333, 556, 500, 722, 500, 500, 444, 394, 220, 394, 520,
+)
+_DEVANAGARI = re.compile("[\u0900-\u097F\uA8E0-\uA8FF\u1CD0-\u1CFF]")
+
+
+# ─── Text metrics ─────────────────────────────────────────────────────────────
+
+@functools.lru_cache(maxsize=65536)
+def _em_width(word: str, bold: bool = False) -> float:
+    """Advance width of word in em (multiply by the font size for points)."""
+    table = _TIMES_BOLD if bold else _TIMES
+    total = 0
+    for ch in word:
+        code = ord(ch)
+        if 32 <= code < 127:
+            total += table[code - 32]
+        elif 0x0900 <= code <= 0x097F:
+            total += DEVANAGARI_ADVANCE * 1000
+        else:
+            total += OTHER_ADVANCE * 1000
+    return total / 1000
+
+
+@functools.lru_cache(maxsize=16384)
+def _word_widths(text: str, bold: bool) -> tuple:
+    """Per hard line, the (em width, tab count) of each space-separated word."""
+    return tuple(
+        tuple((sum(_em_width(part, bold) for part in word.split("\t")), word.count("\t"))
+              for word in line.split(" "))
+        for line in text.split("\n")
+    )
+
+
+def _wrap(text: str, width: float, size: float, bold: bool = False, start: float = 0.0) -> tuple:
+    """
+    Greedy word wrap. start is the width already used on the first line.
+    Returns (lines, width used on the last line) in points.
+    """
+    space = _em_width(" ", bold) * size
+    lines, x = 1, start
+    for hard_index, words in enumerate(_word_widths(text, bold)):
+        if hard_index:
+            lines, x = lines + 1, 0.0
+        for word_index, (em, tabs) in enumerate(words):
+            w = em * size + TAB_PT * tabs
+            gap = space if word_index and x else 0.0
+            if x and x + gap + w > width:
+                lines, x, gap = lines + 1, 0.0, 0.0
+            while w > width:  # a single word longer than the line breaks anywhere
+                lines, w = lines + 1, w - width
+            x += gap + w
+    return lines, x
+
+
+def _line_height(size: float, line_spacing: float, text: str) -> float:
+    factor = DEVANAGARI_LINE_HEIGHT if _DEVANAGARI.search(text) else LINE_HEIGHT
+    return size * factor * line_spacing
+
+
+# ─── Blocks ───────────────────────────────────────────────────────────────────
+
+@dataclass
+class _Para:
+    """Paragraph: lines of equal height, splittable across pages."""
+    label: str
+    lines: int
+    line_height: float
+    before: float = 0.0
+    after: float = 0.0
+
+
+@dataclass
+class _Row:
+    """Table row: never split across pages."""
+    label: str
+    height: float
+
+
+@dataclass
+class LayoutEstimate:
+    """Predicted layout of a paper on A4."""
+    pages: int
+    breaks: list           # what each page after the first starts with, e.g. "Q14", "Q27 (line 3)"
+    last_page_fill: float  # share of the last page's body height in use
+    body_height_cm: float
+    content_height_cm: float
+    style: PaperStyle
+
+    def sheets(self, duplex: bool = False) -> int:
+        """Sheets of paper per copy."""
+        return math.ceil(self.pages / 2) if duplex else self.pages
+
+
+def _text_para(label: str, text: str, width: float, size: float, line_spacing: float,
+               before: float, after: float, bold: bool = False) -> _Para:
+    lines, _ = _wrap(text, width, size, bold)
+    return _Para(label, lines, _line_height(size, line_spacing, text), before, after)
+
+
+def _rule(style: PaperStyle, sz: int, before: float, after: float) -> _Para:
+    """formatter.add_rule: an empty Normal paragraph plus its border (sz/8 pt, 1 pt space)."""
+    height = style.base_size * LINE_HEIGHT * style.base_line_spacing + sz / 8 + 1
+    return _Para("rule", 1, height, before, after)
+
+
+def _image_cm(img, max_cm: float) -> tuple:
+    """Print size of a prepared question image when capped at max_cm instead."""
+    w, h = img.width_cm, img.height_cm or img.width_cm
+    scale = min(1.0, max_cm / w, max_cm / h)
+    return w * scale, h * scale
+
+
+def _blocks(paper: Paper, style: PaperStyle, school_name: str, logo, compact: bool, images: dict) -> list:
+    """The paper as a list of _Para/_Row, in create_question_paper's order."""
+    text_width = (PAGE_WIDTH_CM - style.left_margin_cm - style.right_margin_cm) * PT_PER_CM
+    cell_margins = 2 * CELL_MARGIN_CM * PT_PER_CM
+    half_cell = text_width / 2 - cell_margins
+    blocks = []
+
+    # ─── Header ────────────────────────────────────────────────────────────
+    display_school = school_name or paper.school_name
+    if logo and display_school:
+        school = _text_para("header", display_school.upper(),
+                            text_width - LOGO_COLUMN_CM * PT_PER_CM - cell_margins,
+                            style.school_size, style.base_line_spacing, 0, style.base_space_after, bold=True)
+        logo_height = LOGO_IN_TABLE_CM * PT_PER_CM + style.base_space_after
+        blocks.append(_Row("header", max(logo_height, school.lines * school.line_height + school.after)))
+    elif display_school:
+        blocks.append(_text_para("header", display_school.upper(), text_width, style.school_size,
+                                 style.base_line_spacing, 0, 0, bold=True))
+    elif logo:
+        blocks.append(_Para("header", 1, LOGO_ALONE_CM * PT_PER_CM, 0, 0))
+
+    if paper.exam_title:
+        blocks.append(_text_para("title", paper.exam_title, text_width, style.title_size,
+                                 style.base_line_spacing, 2, 2, bold=True))
+
+    meta_parts = paper_meta_parts(paper)
+    if len(meta_parts) >= 4:
+        for left, right in ((meta_parts[0], meta_parts[2]), (meta_parts[1], meta_parts[3])):
+            cells = [_text_para("meta", t, half_cell, style.meta_size, style.base_line_spacing, 0, 0)
+                     for t in (left, right)]
+            blocks.append(_Row("meta", max(c.lines * c.line_height for c in cells)))
+    elif meta_parts:
+        blocks.append(_text_para("meta", "  |  ".join(meta_parts), text_width, style.meta_size,
+                                 style.base_line_spacing, 0, 2))
+
+    blocks.append(_rule(style, 6, 3, 3))
+
+    if paper.instructions:
+        blocks.append(_text_para("instructions", "General Instructions:", text_width,
+                                 style.instruction_heading_size, style.base_line_spacing, 2, 1, bold=True))
+        indent = 0.5 * PT_PER_CM
+        for idx, instr in enumerate(paper.instructions, 1):
+            blocks.append(_text_para("instructions", f"{idx}. {instr}", text_width - indent,
+                                     style.instruction_size, 1.0, 0, 0))
+
+    blocks.append(_rule(style, 4, 2, 4))
+
+    # ─── Sections & questions ──────────────────────────────────────────────
+    tab_limit = MARKS_TAB_CM * PT_PER_CM
+    for si, section in enumerate(paper.sections):
+        name = section.name or f"Section {si + 1}"
+        blocks.append(_text_para(name, name.upper(), text_width, style.section_size, style.base_line_spacing,
+                                 style.section_space_before, style.section_space_after, bold=True))
+
+        for qi, question in enumerate(section.questions):
+            q_num = question.number or str(qi + 1)
+            label = f"Q{q_num}"
+            q_text = question.text
+            q_marks = question.marks
+            subparts = question.subpart_texts
+
+            size = style.question_size
+            prefix = _em_width(f"Q{q_num}.", True) * size + _em_width(" ") * size
+            lines, last = _wrap(q_text, text_width, size, start=prefix)
+            if q_marks and last + _em_width(f"[{q_marks}]", True) * style.marks_size > tab_limit:
+                lines += 1  # the marks do not fit before the tab stop and drop to a new line
+            blocks.append(_Para(label, lines, _line_height(size, style.question_line_spacing, q_text),
+                                style.question_space_before, style.question_space_after))
+
+            if subparts:
+                if question.is_match:
+                    width = half_cell - 0.2 * PT_PER_CM
+                    for row in question.match_rows:
+                        cells = [_text_para(label, t, width, style.subpart_size, style.base_line_spacing, 1, 1)
+                                 for t in row]
+                        height = max(c.lines * c.line_height + 2 for c in cells)
+                        blocks.append(_Row(label, max(height, 15.0)))  # rows are at least 300 twips
+                elif compact and question.is_mcq:
+                    width = half_cell - 0.3 * PT_PER_CM
+                    for pair in (subparts[0:2], subparts[2:4]):
+                        cells = [_text_para(label, opt, width, style.subpart_size,
+                                            style.base_line_spacing, 0, 0) for opt in pair]
+                        height = max((c.lines * c.line_height for c in cells), default=0)
+                        blocks.append(_Row(label, max(height, 14.0)))  # 280 twips
+                else:
+                    indent = 1.2 * PT_PER_CM
+                    for sp in subparts:
+                        blocks.append(_text_para(label, sp, text_width - indent, style.subpart_size,
+                                                 1.0, 0, 0))
+
+            img = find_question_image(images, si, qi, question)
+            if img is not None:
+                _, height_cm = _image_cm(img, style.image_max_cm)
+                blocks.append(_Para(label, 1, height_cm * PT_PER_CM, 4, 4))
+
+    blocks.append(_rule(style, 4, 12, style.base_space_after))
+    blocks.append(_text_para("end", "— End of Question Paper —", text_width, 9, style.base_line_spacing,
+                             0, style.base_space_after))
+    return blocks
+
+
+# ─── Pagination ───────────────────────────────────────────────────────────────
+
+def body_height_pt(style: PaperStyle) -> float:
+    """Usable page height: Word lowers the body when the footer reaches above the bottom margin."""
+    footer_top = FOOTER_DISTANCE_CM * PT_PER_CM + FOOTER_SIZE * LINE_HEIGHT
+    bottom = max(style.bottom_margin_cm * PT_PER_CM, footer_top)
+    return PAGE_HEIGHT_CM * PT_PER_CM - style.top_margin_cm * PT_PER_CM - bottom
+
+
+def _paginate(blocks: list, body: float) -> tuple:
+    """Returns (pages, breaks, height used on the last page, total content height)."""
+    pages, breaks, y, total = 1, [], 0.0, 0.0
+    for block in blocks:
+        if isinstance(block, _Row):
+            total += block.height
+            if y and y + block.height > body:
+                pages, y = pages + 1, 0.0
+                breaks.append(block.label)
+            y += block.height
+            continue
+
+        total += block.before + block.lines * block.line_height + block.after
+        before = block.before if y else 0.0
+        remaining = block.lines
+        while remaining:
+            fit = int((body - y - before) // block.line_height) if y + before < body else 0
+            if fit <= 0 and not y:
+                fit = 1  # a line taller than the page (large image) still takes a page
+            if fit >= remaining:
+                y += before + remaining * block.line_height
+                break
+            y += before + fit * block.line_height
+            remaining -= fit
+            pages, y, before = pages + 1, 0.0, 0.0
+            done = block.lines - remaining
+            breaks.append(f"{block.label} (line {done + 1})" if done else block.label)
+        y += block.after
+    return pages, breaks, min(y, body), total
+
+
+def estimate_layout(
+    structured_data: dict,
+    school_name: str = "",
+    logo_path=None,
+    compact: bool = True,
+    question_images: dict = None,
+    style: PaperStyle = None,
+) -> LayoutEstimate:
+    """Predict pages and page breaks for create_question_paper with the same arguments."""
+    style = style or paper_style(compact)
+    images = _prepared_images(question_images, style)
+    return _estimate(as_paper(structured_data), style, school_name, bool(image_bytes(logo_path)), compact,
+                     images)
+
+
+def _prepared_images(question_images: dict, style: PaperStyle) -> dict:
+    out = {}
+    for key, source in (question_images or {}).items():
+        img = question_image(source, style)
+        if img is not None:
+            out[key] = img
+    return out
+
+
+def _estimate(paper: Paper, style: PaperStyle, school_name: str, logo: bool, compact: bool,
+              images: dict) -> LayoutEstimate:
+    body = body_height_pt(style)
+    pages, breaks, last, total = _paginate(_blocks(paper, style, school_name, logo, compact, images), body)
+    return LayoutEstimate(pages, breaks, last / body, body / PT_PER_CM, total / PT_PER_CM, style)
+
+
+# ─── Fit to N pages ───────────────────────────────────────────────────────────
+
+# The tightest layout fit_to_pages will go to; still readable when printed
+TIGHTEST_STYLE = PaperStyle(
+    top_margin_cm=0.8, bottom_margin_cm=0.8, left_margin_cm=1.0, right_margin_cm=1.0,
+    base_size=9, base_space_after=0, base_line_spacing=1.0,
+    school_size=12, title_size=10.5, meta_size=8.5,
+    instruction_heading_size=8.5, instruction_size=8,
+    section_size=9.5, section_space_before=2, section_space_after=1,
+    question_size=9, question_space_before=1, question_space_after=0, question_line_spacing=1.0,
+    marks_size=8.5, subpart_size=8.5, image_max_cm=5.0,
+)
+
+_SPACING_FIELDS = (
+    "top_margin_cm", "bottom_margin_cm", "left_margin_cm", "right_margin_cm", "base_space_after",
+    "base_line_spacing", "section_space_before", "section_space_after", "question_space_before",
+    "question_space_after", "question_line_spacing",
+)
+_SIZE_FIELDS = tuple(f.name for f in dataclasses.fields(PaperStyle) if f.name not in _SPACING_FIELDS)
+
+
+def tightened(style: PaperStyle, amount: float, floor: PaperStyle = TIGHTEST_STYLE) -> PaperStyle:
+    """
+    style moved towards floor: amount 0..1 tightens margins and spacing,
+    1..2 then shrinks font and image sizes. Nothing is ever loosened, and
+    font sizes stay on Word's half-point steps.
+    """
+    def toward(name: str, t: float):
+        base, low = getattr(style, name), getattr(floor, name)
+        return base - (base - low) * max(0.0, min(1.0, t)) if low < base else base
+
+    changes = {name: round(toward(name, amount), 2) for name in _SPACING_FIELDS}
+    changes.update({name: round(toward(name, amount - 1) * 2) / 2 for name in _SIZE_FIELDS})
+    return dataclasses.replace(style, **changes)
+
+
+def fit_to_pages(
+    structured_data: dict,
+    pages: int,
+    school_name: str = "",
+    logo_path=None,
+    compact: bool = True,
+    question_images: dict = None,
+    style: PaperStyle = None,
+    steps: int = 40,
+) -> PaperStyle:
+    """
+    The loosest style, starting from style (or compact/normal) and
+    tightening step by step, whose estimate fits in `pages` pages. None
+    when even TIGHTEST_STYLE needs more.
+    """
+    style = style or paper_style(compact)
+    paper = as_paper(structured_data)  # validated and classified once for every step
+    logo = bool(image_bytes(logo_path))
+    images = _prepared_images(question_images, style)
+    for step in range(steps + 1):
+        candidate = tightened(style, 2 * step / steps)
+        if _estimate(paper, candidate, school_name, logo, compact, images).pages <= pages:
+            return candidate
+    return None
+
+
+# ─── CLI ──────────────────────────────────────────────────────────────────────
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    p = argparse.ArgumentParser(description="Estimate the page count of a structured paper")
+    p.add_argument("paper", help="JSON file with the structured data (as batch.py writes it)")
+    p.add_argument("--fit", type=int, default=0, help="Also find a style that fits in this many pages")
+    args = p.parse_args()
+
+    with open(args.paper, encoding="utf-8") as f:
+        data = json.load(f)
+    data = data.get("structured_data", data)
+
+    for compact in (True, False):
+        est = estimate_layout(data, compact=compact)
+        where = ", ".join(f"p{i + 2}: {b}" for i, b in enumerate(est.breaks)) or "-"
+        print(f"{'compact' if compact else 'normal':<8} {est.pages} pages "
+              f"(last {est.last_page_fill:.0%} full)  breaks {where}")
+    if args.fit:
+        style = fit_to_pages(data, args.fit)
+        if style is None:
+            print(f"Does not fit in {args.fit} pages even at the tightest style")
+        else:
+            print(f"Fits in {args.fit} pages with: {style}")
@@ -0,0 +1,416 @@
+"""
+Timing spans, counters and per-paper traces for the OCR -> .docx pipeline.
+
+span() times a block and feeds a per-span latency histogram; count()
+bumps a labelled counter (bytes sent, tokens, retries, cache hits, ...).
+Inside trace() every span and count is also collected into one trace,
+written as JSON to cache/traces/<id>.json when the block ends, so a slow
+paper can be taken apart afterwards. Spans started in worker threads join
+the trace when the work is submitted through bind().
+
+Everything is exported in the Prometheus text format: from a local HTTP
+endpoint (PRASHNAPRO_METRICS_PORT, served on 127.0.0.1) and/or a file
+rewritten after every trace (PRASHNAPRO_METRICS_FILE, e.g. for the
+node_exporter textfile collector). Traces go to PRASHNAPRO_TRACE_DIR
+(empty to disable); the newest PRASHNAPRO_TRACE_KEEP (default 500) are
+kept.
+
+Usage:
+    from metrics import span, count, trace
+    with trace("ocr_job", job=job_id):
+        with span("ocr.request", page=1) as s:
+            ...
+            s.set(tokens=412)
+        count("cache_total", cache="raw", result="hit")
+
+Summarise saved traces from the command line:
+    python metrics.py summary      # per-span count, p50, p95, max
+    python metrics.py show <id>    # one trace as a span tree
+"""
+
+import contextlib
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+PREFIX = "prashnapro_"
+TRACE_DIR = os.environ.get(
+    "PRASHNAPRO_TRACE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "traces"),
+)
+TRACE_KEEP = int(os.environ.get("PRASHNAPRO_TRACE_KEEP", 500))
+METRICS_PORT = int(os.environ.get("PRASHNAPRO_METRICS_PORT", 0))
+METRICS_FILE = os.environ.get("PRASHNAPRO_METRICS_FILE", "")
+
+# Seconds; OCR requests take tens of seconds, renders milliseconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+HELP = {
+    "span_seconds": "Duration of pipeline spans",
+    "span_errors_total": "Spans that ended with an exception",
+    "bytes_sent_total": "Bytes uploaded to the model API",
+    "tokens_total": "Model tokens used",
+    "api_requests_total": "Model API requests sent, including retries",
+    "api_retries_total": "Model API requests retried after a transient error",
+    "cache_total": "OCR cache lookups",
+    "json_repairs_total": "Structured replies that were not valid JSON",
+    "documents_total": "Documents rendered",
+    "document_bytes_total": "Bytes of rendered documents",
+}
+
+_span = contextvars.ContextVar("prashnapro_span", default=None)
+_trace = contextvars.ContextVar("prashnapro_trace", default=None)
+
+
+# ─── Registry ─────────────────────────────────────────────────────────────────
+
+def _labels(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+class Registry:
+    """Counters and span histograms for this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}    # (name, labels) -> value
+        self._histograms = {}  # span name -> [bucket counts..., +Inf count, sum]
+
+    def count(self, name: str, value: float = 1, **labels) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, span_name: str, seconds: float) -> None:
+        with self._lock:
+            h = self._histograms.get(span_name)
+            if h is None:
+                h = self._histograms[span_name] = [0] * (len(BUCKETS) + 2)
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    h[i] += 1
+            h[-2] += 1
+            h[-1] += seconds
+
+    def snapshot(self) -> tuple:
+        with self._lock:
+            return dict(self._counters), {k: list(v) for k, v in self._histograms.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+registry = Registry()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(labels) -> str:
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}" if labels else ""
+
+
+def prometheus_text(reg: Registry = None) -> str:
+    """All metrics in the Prometheus text exposition format."""
+    counters, histograms = (reg or registry).snapshot()
+    lines = []
+    by_name = {}
+    for (name, labels), value in counters.items():
+        by_name.setdefault(name, []).append((labels, value))
+    for name in sorted(by_name):
+        full = PREFIX + name
+        lines.append(f"# HELP {full} {HELP.get(name, name)}")
+        lines.append(f"# TYPE {full} counter")
+        for labels, value in sorted(by_name[name]):
+            lines.append(f"{full}{_label_text(labels)} {value:g}")
+
+    if histograms:
+        full = PREFIX + "span_seconds"
+        lines.append(f"# HELP {full} {HELP['span_seconds']}")
+        lines.append(f"# TYPE {full} histogram")
+        for span_name in sorted(histograms):
+            h = histograms[span_name]
+            for bound, n in zip(BUCKETS, h):
+                lines.append(f"{full}_bucket{_label_text((('le', f'{bound:g}'), ('span', span_name)))} {n}")
+            lines.append(f"{full}_bucket{_label_text((('le', '+Inf'), ('span', span_name)))} {h[-2]}")
+            lines.append(f"{full}_sum{_label_text((('span', span_name),))} {h[-1]:.6f}")
+            lines.append(f"{full}_count{_label_text((('span', span_name),))} {h[-2]}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: str = None) -> str:
+    """Write prometheus_text() atomically to path (default PRASHNAPRO_METRICS_FILE)."""
+    path = path or METRICS_FILE
+    if not path:
+        return None
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(path + ".tmp", path)
+    return path
+
+
+# ─── Spans and traces ─────────────────────────────────────────────────────────
+
+class Span:
+    __slots__ = ("id", "parent", "name", "attrs", "start", "duration", "error")
+
+    def __init__(self, name: str, attrs: dict, parent: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.parent = parent
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.duration = None
+        self.error = None
+
+    def set(self, **attrs) -> None:
+        """Attach attributes (bytes, tokens, cache result, ...) to the span."""
+        self.attrs.update(attrs)
+
+
+class Trace:
+    """Spans and counts of one paper, from upload to .docx."""
+
+    def __init__(self, trace_id: str, name: str, attrs: dict):
+        self.id = trace_id
+        self.name = name
+        self.attrs = attrs
+        self.started = time.time()
+        self.start = time.perf_counter()
+        self.spans = []
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, s: Span) -> None:
+        with self._lock:
+            self.spans.append(s)
+
+    def add_count(self, name: str, value: float, labels: tuple) -> None:
+        key = name + _label_text(labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start)
+            return {
+                "id": self.id, "name": self.name, "attrs": self.attrs, "started": self.started,
+                "duration": time.perf_counter() - self.start,
+                "spans": [{"id": s.id, "parent": s.parent, "name": s.name,
+                           "offset": round(s.start - self.start, 6),
+                           "duration": round(s.duration, 6) if s.duration is not None else None,
+                           "attrs": s.attrs, "error": s.error} for s in spans],
+                "counters": dict(self.counters),
+            }
+
+
+def _reset(var: contextvars.ContextVar, token) -> None:
+    try:
+        var.reset(token)
+    except ValueError:
+        pass  # a generator finalised from another context; nothing to restore
+
+
+@contextlib.contextmanager
+def span(name: str, **attrs):
+    """Time a block as a span (nested under the current one). Yields the Span."""
+    s = Span(name, attrs, _span.get())
+    token = _span.set(s.id)
+    try:
+        yield s
+    except GeneratorExit:
+        s.attrs["closed"] = True  # the consumer stopped early, e.g. a cancelled job
+        raise
+    except BaseException as e:
+        s.error = type(e).__name__
+        registry.count("span_errors_total", span=name, error=s.error)
+        raise
+    finally:
+        s.duration = time.perf_counter() - s.start
+        _reset(_span, token)
+        registry.observe(name, s.duration)
+        t = _trace.get()
+        if t is not None:
+            t.add_span(s)
+
+
+def count(name: str, value: float = 1, **labels) -> None:
+    """Add value to a counter, and to the current trace."""
+    registry.count(name, value, **labels)
+    t = _trace.get()
+    if t is not None:
+        t.add_count(name, value, _labels(labels))
+
+
+@contextlib.contextmanager
+def trace(name: str, trace_id: str = None, **attrs):
+    """
+    Collect every span and count inside the block into one trace, saved
+    as JSON when it ends. Nested trace() blocks just add a span to the
+    outer trace.
+    """
+    if _trace.get() is not None:
+        with span(name, **attrs) as s:
+            yield s
+        return
+    t = Trace(trace_id or uuid.uuid4().hex, name, attrs)
+    token = _trace.set(t)
+    try:
+        with span(name, **attrs) as s:
+            yield s
+    finally:
+        _reset(_trace, token)
+        save_trace(t)
+        if METRICS_FILE:
+            write_prometheus()
+
+
+def current_trace() -> Trace:
+    return _trace.get()
+
+
+def bind(fn):
+    """fn wrapped to run in (a copy of) the caller's context, e.g. for a thread pool."""
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.copy().run(fn, *args, **kwargs)
+
+
+def save_trace(t: Trace, directory: str = None) -> str:
+    directory = TRACE_DIR if directory is None else directory
+    if not directory:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{t.id}.json")
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(t.to_dict(), f, ensure_ascii=False, default=str)
+    os.replace(path + ".tmp", path)
+    _prune(directory)
+    return path
+
+
+def _prune(directory: str) -> None:
+    try:
+        entries = [e for e in os.scandir(directory) if e.name.endswith(".json")]
+    except OSError:
+        return
+    if len(entries) <= TRACE_KEEP:
+        return
+    entries.sort(key=lambda e: e.stat().st_mtime)
+    for e in entries[:len(entries) - TRACE_KEEP]:
+        try:
+            os.remove(e.path)
+        except OSError:
+            pass
+
+
+# ─── Endpoint ─────────────────────────────────────────────────────────────────
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def serve(port: int = METRICS_PORT, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve /metrics on a daemon thread. Idempotent; returns the server."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _Handler)
+            threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+    return _server
+
+
+def start_from_env() -> None:
+    """Start the endpoint if PRASHNAPRO_METRICS_PORT is set. Safe to call on every rerun."""
+    if METRICS_PORT and _server is None:
+        try:
+            serve(METRICS_PORT)
+        except OSError:
+            pass  # another process (e.g. a second server) already serves this port
+
+
+# ─── CLI ──────────────────────────────────────────────────────────────────────
+
+def _load_traces(directory: str) -> list:
+    traces = []
+    for name in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+        if name.endswith(".json"):
+            try:
+                with open(os.path.join(directory, name), encoding="utf-8") as f:
+                    traces.append(json.load(f))
+            except (OSError, ValueError):
+                pass
+    return traces
+
+
+def _percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main(argv: list) -> int:
+    if not argv or argv[0] not in ("summary", "show") or (argv[0] == "show" and len(argv) < 2):
+        print("Usage: python metrics.py summary | show <trace id>")
+        return 2
+    if argv[0] == "show":
+        path = os.path.join(TRACE_DIR, f"{argv[1]}.json")
+        if not os.path.isfile(path):
+            print(f"No trace {argv[1]!r} in {TRACE_DIR}")
+            return 1
+        with open(path, encoding="utf-8") as f:
+            t = json.load(f)
+        depth = {None: -1}
+        print(f"{t['name']} {t['id']}  {t['duration'] * 1000:.0f} ms  {t['attrs']}")
+        for s in t["spans"]:
+            depth[s["id"]] = depth.get(s["parent"], 0) + 1
+        for s in t["spans"]:
+            attrs = " ".join(f"{k}={v}" for k, v in s["attrs"].items())
+            error = f"  !{s['error']}" if s["error"] else ""
+            print(f"{'  ' * depth[s['id']]}{s['name']:<28} +{s['offset'] * 1000:7.0f} ms "
+                  f"{(s['duration'] or 0) * 1000:8.1f} ms  {attrs}{error}")
+        for name, value in sorted(t["counters"].items()):
+            print(f"  {name} {value:g}")
+        return 0
+
+    durations = {}
+    traces = _load_traces(TRACE_DIR)
+    for t in traces:
+        for s in t["spans"]:
+            if s["duration"] is not None:
+                durations.setdefault(s["name"], []).append(s["duration"])
+    print(f"{len(traces)} traces in {TRACE_DIR}\n")
+    print(f"{'span':<28} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    for name in sorted(durations):
+        v = durations[name]
+        print(f"{name:<28} {len(v):6d} {_percentile(v, 0.5) * 1000:9.1f} "
+              f"{_percentile(v, 0.95) * 1000:9.1f} {max(v) * 1000:9.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,245 @@
+"""
+Typed model of a structured question paper.
+
+The OCR/LLM pipeline produces plain JSON dicts. Paper.from_dict validates
+and normalises one in a single pass: numbers become strings, missing
+fields become "", options given as one string become a list, blank
+options are dropped, and anything that is not a paper at all raises
+PaperError. Each question carries its MCQ / match-the-following
+detection, split match rows and numeric marks, so renderers read flags
+instead of re-running the detection on every render.
+
+Usage:
+    from model import as_paper, normalize_paper
+    data = normalize_paper(llm_json)          # clean dict, for caches and the editor
+    paper = as_paper(data)                    # Paper; a Paper passes through unchanged
+    for section in paper.sections:
+        for q in section.questions:
+            if q.is_match: ...q.match_rows
+"""
+
+import re
+from dataclasses import dataclass
+
+
+# ─── Content detection ───────────────────────────────────────────────────────
+
+MCQ_PREFIXES = ('(a)', '(b)', '(c)', '(d)', 'a)', 'b)', 'c)', 'd)',
+                'A)', 'B)', 'C)', 'D)', '(A)', '(B)', '(C)', '(D)')
+MATCH_SEPARATORS = (' → ', ' -> ', ' — ', ' – ')
+
+# The same tests as the tuples above, one regex pass per subpart
+_LABEL = re.compile(r"\(?[a-dA-D]\)")
+_COLUMNS = re.compile(r"\t|\s{3,}|" + "|".join(map(re.escape, MATCH_SEPARATORS)))
+
+
+def is_mcq_options(subparts: list) -> bool:
+    """Four subparts labelled (a)-(d): laid out as a 2x2 option grid in compact mode."""
+    return len(subparts) == 4 and all(sp.strip().startswith(MCQ_PREFIXES) for sp in subparts)
+
+
+def is_match_columns(subparts: list) -> bool:
+    """Match-the-following / two-column data: tabs, runs of spaces, or arrow/dash separators."""
+    return any(_COLUMNS.search(sp) or '  ' in sp.strip() for sp in subparts)
+
+
+def split_match_rows(subparts: list) -> list:
+    """Split each subpart into [left, right] on its first column separator."""
+    rows = []
+    for sp in subparts:
+        sp = sp.strip()
+        parts = None
+        if '\t' in sp:
+            parts = [x.strip() for x in sp.split('\t', 1)]
+        else:
+            for sep in MATCH_SEPARATORS:
+                if sep in sp:
+                    parts = [x.strip() for x in sp.split(sep, 1)]
+                    break
+            else:
+                if re.search(r'\s{3,}', sp):
+                    parts = [x.strip() for x in re.split(r'\s{3,}', sp, maxsplit=1)]
+        rows.append(parts if parts and len(parts) == 2 else [sp, ""])
+    return rows
+
+
+_NUMBER = re.compile(r"\d+(?:\.\d+)?|\.\d+")
+
+
+def marks_value(marks: str) -> float:
+    """'2' -> 2.0, '1+1' -> 2.0, '1½' -> 1.5, '3 marks' -> 3.0; None when there is no number."""
+    marks = marks.replace("½", ".5")
+    if "+" in marks:
+        values = [float(n) for part in marks.split("+") for n in _NUMBER.findall(part)[:1]]
+        return sum(values) if values else None
+    match = _NUMBER.search(marks)
+    return float(match.group()) if match else None
+
+
+# ─── Model ────────────────────────────────────────────────────────────────────
+
+class PaperError(ValueError):
+    """Structured data that cannot be read as a question paper."""
+
+
+def _text(value, where: str) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f"{value:g}" if isinstance(value, float) else str(value)
+    raise PaperError(f"{where}: expected text, got {type(value).__name__}")
+
+
+def _texts(value, where: str) -> tuple:
+    """A list of strings; a single string is one line per item."""
+    if value is None:
+        return ()
+    if isinstance(value, str):
+        value = value.splitlines()
+    if not isinstance(value, (list, tuple)):
+        raise PaperError(f"{where}: expected a list, got {type(value).__name__}")
+    return tuple(t for t in (_text(v, f"{where}[{i}]") for i, v in enumerate(value)) if t.strip())
+
+
+@dataclass(frozen=True, slots=True)
+class Subpart:
+    text: str           # stripped, label included: "(a) Delhi"
+    label: str          # "(a)", "a)", ... or "" for unlabelled subparts
+
+
+@dataclass(frozen=True, slots=True)
+class Question:
+    number: str
+    text: str
+    marks: str
+    subparts: tuple     # of Subpart
+    id: str = ""
+    is_match: bool = False    # match-the-following table; wins over is_mcq
+    is_mcq: bool = False      # four (a)-(d) options, a 2x2 grid in compact mode
+    match_rows: tuple = ()    # (left, right) per subpart when is_match
+    marks_value: float = None
+
+    @property
+    def subpart_texts(self) -> tuple:
+        return tuple(sp.text for sp in self.subparts)
+
+    @classmethod
+    def from_dict(cls, data, where: str = "question") -> "Question":
+        if isinstance(data, str):
+            data = {"text": data}
+        if not isinstance(data, dict):
+            raise PaperError(f"{where}: expected an object, got {type(data).__name__}")
+        raw = _texts(data.get("subparts"), f"{where}.subparts")
+        subparts = []
+        for sp in raw:
+            text = sp.strip()
+            label = _LABEL.match(text)
+            subparts.append(Subpart(text, label.group() if label else ""))
+        is_match = bool(raw) and is_match_columns(raw)
+        marks = _text(data.get("marks"), f"{where}.marks").strip()
+        return cls(
+            number=_text(data.get("number"), f"{where}.number").strip(),
+            text=_text(data.get("text"), f"{where}.text"),
+            marks=marks,
+            subparts=tuple(subparts),
+            id=_text(data.get("id"), f"{where}.id"),
+            is_match=is_match,
+            is_mcq=not is_match and len(subparts) == 4 and all(sp.label for sp in subparts),
+            match_rows=tuple(tuple(row) for row in split_match_rows(raw)) if is_match else (),
+            marks_value=marks_value(marks),
+        )
+
+    def to_dict(self) -> dict:
+        d = {"number": self.number, "text": self.text, "marks": self.marks,
+             "subparts": [sp.text for sp in self.subparts]}
+        if self.id:
+            d["id"] = self.id
+        return d
+
+
+@dataclass(frozen=True, slots=True)
+class Section:
+    name: str
+    questions: tuple    # of Question
+    id: str = ""
+
+    @classmethod
+    def from_dict(cls, data, where: str = "section") -> "Section":
+        if not isinstance(data, dict):
+            raise PaperError(f"{where}: expected an object, got {type(data).__name__}")
+        questions = data.get("questions")
+        questions = [] if questions is None else questions
+        if not isinstance(questions, list):
+            raise PaperError(f"{where}.questions: expected a list, got {type(questions).__name__}")
+        return cls(
+            name=_text(data.get("section_name"), f"{where}.section_name"),
+            questions=tuple(Question.from_dict(q, f"{where}.questions[{i}]") for i, q in enumerate(questions)),
+            id=_text(data.get("id"), f"{where}.id"),
+        )
+
+    def to_dict(self) -> dict:
+        d = {"section_name": self.name, "questions": [q.to_dict() for q in self.questions]}
+        if self.id:
+            d["id"] = self.id
+        return d
+
+
+@dataclass(frozen=True, slots=True)
+class Paper:
+    exam_title: str = ""
+    class_name: str = ""
+    subject: str = ""
+    time: str = ""
+    total_marks: str = ""
+    school_name: str = ""
+    instructions: tuple = ()
+    sections: tuple = ()    # of Section
+
+    @property
+    def questions(self):
+        """Every question, in print order."""
+        return (q for s in self.sections for q in s.questions)
+
+    @property
+    def marks_sum(self) -> float:
+        """Sum of the questions' numeric marks (to check against total_marks)."""
+        return sum(q.marks_value or 0 for q in self.questions)
+
+    @classmethod
+    def from_dict(cls, data) -> "Paper":
+        if not isinstance(data, dict):
+            raise PaperError(f"expected a paper object, got {type(data).__name__}")
+        sections = data.get("sections")
+        sections = [] if sections is None else sections
+        if not isinstance(sections, list):
+            raise PaperError(f"sections: expected a list, got {type(sections).__name__}")
+        return cls(
+            exam_title=_text(data.get("exam_title"), "exam_title").strip(),
+            class_name=_text(data.get("class"), "class").strip(),
+            subject=_text(data.get("subject"), "subject").strip(),
+            time=_text(data.get("time"), "time").strip(),
+            total_marks=_text(data.get("total_marks"), "total_marks").strip(),
+            school_name=_text(data.get("school_name"), "school_name").strip(),
+            instructions=tuple(i.strip() for i in _texts(data.get("instructions"), "instructions")),
+            sections=tuple(Section.from_dict(s, f"sections[{i}]") for i, s in enumerate(sections)),
+        )
+
+    def to_dict(self) -> dict:
+        d = {"exam_title": self.exam_title, "class": self.class_name, "subject": self.subject,
+             "time": self.time, "total_marks": self.total_marks, "instructions": list(self.instructions),
+             "sections": [s.to_dict() for s in self.sections]}
+        if self.school_name:
+            d["school_name"] = self.school_name
+        return d
+
+
+def as_paper(data) -> Paper:
+    """A Paper for structured data given as a dict or a Paper."""
+    return data if isinstance(data, Paper) else Paper.from_dict(data)
+
+
+def normalize_paper(data) -> dict:
+    """Validated, normalised copy of structured data as a plain dict. Raises PaperError."""
+    return as_paper(data).to_dict()
@@ -3,17 +3,43 @@ OCR module using OpenAI GPT-4o Vision API.
 Handles image-to-text extraction and structuring.
 """
 
-import openai
 import base64
-import json
-import re
 import os
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
 
+from clients import get_client
+from imaging import prepare_for_ocr
+from json_repair import IncrementalJSONParser, loads_tolerant, strip_fences
+from metrics import bind, count, span
+from model import normalize_paper
+from scheduler import create_chat_completion, current_session, session
+from rule_structurer import DEFAULT_MIN_CONFIDENCE, RULES_VERSION, structure_text_locally
+from ocr_cache import OCRCache, default_cache, file_sha256, make_key, prompt_version, sha256_hex
 
-def encode_image_to_base64(image_path: str) -> str:
+
+def encode_image(image_path: str, optimize: bool = True, image_options: dict = None) -> tuple:
+    """
+    Read an image file and return (base64, mime_type, stats).
+
+    With optimize=True the image is orientation-fixed, downscaled to the
+    size the vision model actually uses, and recompressed first (see
+    imaging.prepare_for_ocr; image_options are passed through to it).
+    stats reports original_bytes, encoded_bytes and saved_bytes.
+    """
+    if optimize:
+        data, mime, stats = prepare_for_ocr(image_path, **(image_options or {}))
+    else:
+        with open(image_path, "rb") as f:
+            data = f.read()
+        mime, stats = None, {"original_bytes": len(data), "encoded_bytes": len(data), "saved_bytes": 0}
+    return base64.b64encode(data).decode("utf-8"), mime or get_mime_type(image_path), stats
+
+
+def encode_image_to_base64(image_path: str, optimize: bool = True, image_options: dict = None) -> str:
     """Read an image file and return its base64 encoding."""
-    with open(image_path, "rb") as f:
-        return base64.b64encode(f.read()).decode("utf-8")
+    return encode_image(image_path, optimize=optimize, image_options=image_options)[0]
 
 
 def get_mime_type(image_path: str) -> str:
@@ -28,23 +54,7 @@ def get_mime_type(image_path: str) -> str:
     }.get(ext, "image/jpeg")
 
 
-def extract_text_from_images(image_paths: list, api_key: str, model: str = "gpt-4o") -> str:
-    """
-    Send all images to OpenAI GPT-4o Vision in a single request.
-    Returns raw extracted text.
-    """
-    client = openai.OpenAI(api_key=api_key)
-
-    # Build content array: prompt + all images
-    content = [
-        {
-            "type": "text",
-            "text": """You are an expert OCR system specialized in reading handwritten exam/question papers.
-
-You are given images of a handwritten question paper (pages in order). Extract ALL text EXACTLY as written.
-
-Rules:
-- Preserve ALL question numbering (Q1, Q2, 1., 2., etc.)
+OCR_RULES = """- Preserve ALL question numbering (Q1, Q2, 1., 2., etc.)
 - Preserve ALL subparts (a), (b), (c), (i), (ii), etc.
 - Preserve ALL marks in brackets like (5), [10], (2 marks), etc.
 - Preserve section headings (Section A, Section B, Part I, Part II, etc.)
@@ -55,40 +65,131 @@ Rules:
   For example: [DIAGRAM: Triangle ABC with angle B = 90 degrees] or [DIAGRAM: Bar graph showing population data]
 - Do NOT summarize or paraphrase anything
 - Do NOT skip any text, even if partially legible (mark unclear parts with [unclear])
-- Do NOT add any commentary or explanation
+- Do NOT add any commentary or explanation"""
+
+OCR_PROMPT = f"""You are an expert OCR system specialized in reading handwritten exam/question papers.
+
+You are given images of a handwritten question paper (pages in order). Extract ALL text EXACTLY as written.
+
+Rules:
+{OCR_RULES}
 - Clearly mark page boundaries as --- Page 1 ---, --- Page 2 ---, etc.
 
 Return ONLY the raw extracted text, nothing else."""
+
+PAGE_OCR_PROMPT = f"""You are an expert OCR system specialized in reading handwritten exam/question papers.
+
+You are given ONE page of a handwritten question paper. Extract ALL text on it EXACTLY as written.
+
+Rules:
+{OCR_RULES}
+- Do NOT add page markers, they are added automatically
+
+Return ONLY the raw extracted text, nothing else."""
+
+DEFAULT_PAGE_WORKERS = 4
+
+
+def _image_part(path: str, image_options: dict = None, stats_out: list = None, index: int = 0) -> dict:
+    """Build the image_url content part for one page, recording its stats in stats_out[index]."""
+    with span("image.encode", page=index + 1) as s:
+        b64, mime, stats = encode_image(path, image_options=image_options)
+        s.set(bytes=len(b64))
+    count("bytes_sent_total", len(b64), kind="image")
+    if stats_out is not None:
+        stats_out[index] = stats
+    return {
+        "type": "image_url",
+        "image_url": {
+            "url": f"data:{mime};base64,{b64}",
+            "detail": "high"
         }
-    ]
-
-    for i, path in enumerate(image_paths):
-        b64 = encode_image_to_base64(path)
-        mime = get_mime_type(path)
-        content.append({
-            "type": "image_url",
-            "image_url": {
-                "url": f"data:{mime};base64,{b64}",
-                "detail": "high"
-            }
-        })
-
-    response = client.chat.completions.create(
-        model=model,
-        messages=[{"role": "user", "content": content}],
-        max_tokens=4096,
-    )
+    }
+
+
+def _ocr_single_page(client, path: str, model: str, image_options: dict = None,
+                     stats_out: list = None, index: int = 0) -> str:
+    """OCR one page in its own request. Returns the page text."""
+    with span("ocr.page", page=index + 1):
+        content = [
+            {"type": "text", "text": PAGE_OCR_PROMPT},
+            _image_part(path, image_options, stats_out, index),
+        ]
+        response = create_chat_completion(
+            client,
+            model=model,
+            messages=[{"role": "user", "content": content}],
+            max_tokens=4096,
+        )
+        return (response.choices[0].message.content or "").strip()
+
 
-    return response.choices[0].message.content.strip()
+def merge_pages(page_texts: list) -> str:
+    """Join per-page texts in page order with --- Page N --- markers."""
+    return "\n\n".join(
+        f"--- Page {i} ---\n{text}" for i, text in enumerate(page_texts, 1)
+    )
 
 
-def structure_extracted_text(raw_text: str, api_key: str, model: str = "gpt-4o") -> dict:
+def extract_text_from_images(
+    image_paths: list,
+    api_key: str,
+    model: str = "gpt-4o",
+    per_page: bool = False,
+    max_workers: int = DEFAULT_PAGE_WORKERS,
+    base_url: str = None,
+    image_options: dict = None,
+    image_stats: list = None,
+) -> str:
     """
-    Send combined raw text to OpenAI for cleaning and structuring into JSON.
+    Send images to OpenAI GPT-4o Vision and return raw extracted text.
+
+    By default all pages go in a single request. With per_page=True every
+    page gets its own request (each with its own max_tokens budget), sent
+    in parallel on a bounded thread pool, and the results are merged back
+    in page order. base_url points the client at any OpenAI-compatible
+    server, e.g. a local fake for testing.
+
+    Images are shrunk before upload (see encode_image); pass a list as
+    image_stats to receive one stats dict per page, in page order.
     """
-    client = openai.OpenAI(api_key=api_key)
+    client = get_client(api_key, base_url)
+    stats_out = [None] * len(image_paths)
 
-    prompt = f"""You are an exam paper formatting assistant. You will receive raw OCR text from a handwritten question paper.
+    if per_page:
+        workers = max(1, min(max_workers, len(image_paths)))
+        session_id = current_session()
+
+        def run_page(index: int, path: str) -> str:
+            with session(session_id):
+                return _ocr_single_page(client, path, model, image_options, stats_out, index)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # map() yields in submission order, so pages stay ordered
+            page_texts = list(pool.map(bind(run_page), range(len(image_paths)), image_paths))
+        if image_stats is not None:
+            image_stats.extend(stats_out)
+        return merge_pages(page_texts)
+
+    # Build content array: prompt + all images
+    with span("ocr.request", pages=len(image_paths)):
+        content = [{"type": "text", "text": OCR_PROMPT}]
+        for i, path in enumerate(image_paths):
+            content.append(_image_part(path, image_options, stats_out, i))
+        if image_stats is not None:
+            image_stats.extend(stats_out)
+
+        response = create_chat_completion(
+            client,
+            model=model,
+            messages=[{"role": "user", "content": content}],
+            max_tokens=4096,
+        )
+
+        return response.choices[0].message.content.strip()
+
+
+STRUCTURE_PROMPT = """You are an exam paper formatting assistant. You will receive raw OCR text from a handwritten question paper.
 
 Your job is to:
 1. Clean the text while PRESERVING the exact meaning of every question
@@ -139,49 +240,477 @@ Here is the raw OCR text:
 
 Return ONLY the JSON object:"""
 
-    response = client.chat.completions.create(
-        model=model,
-        messages=[{"role": "user", "content": prompt}],
-        max_tokens=4096,
-        temperature=0.1,
-    )
-
-    response_text = response.choices[0].message.content.strip()
-
-    # Clean markdown code fences if present
-    response_text = re.sub(r'^```json\s*', '', response_text)
-    response_text = re.sub(r'^```\s*', '', response_text)
-    response_text = re.sub(r'\s*```$', '', response_text)
-    response_text = response_text.strip()
 
+def _parse_structured_response(response_text: str, client, model: str) -> dict:
+    """
+    Parse the structuring reply. Malformed JSON is repaired locally first
+    (see json_repair); the model is only asked to fix it as a last resort.
+    """
     try:
-        return json.loads(response_text)
-    except json.JSONDecodeError:
+        return loads_tolerant(response_text)[0]
+    except ValueError:
         # Retry: ask the model to fix the JSON
-        retry_response = client.chat.completions.create(
+        count("json_repairs_total", via="model")
+        with span("structure.json_retry"):
+            retry_response = create_chat_completion(
+                client,
+                model=model,
+                messages=[
+                    {"role": "user", "content": f"The following text is supposed to be valid JSON but has errors. Fix it and return ONLY valid JSON, nothing else:\n\n{strip_fences(response_text)}"}
+                ],
+                max_tokens=4096,
+                temperature=0,
+            )
+            return loads_tolerant(retry_response.choices[0].message.content)[0]
+
+
+def structure_extracted_text(
+    raw_text: str,
+    api_key: str,
+    model: str = "gpt-4o",
+    base_url: str = None,
+    fast_path: bool = True,
+    min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+) -> dict:
+    """
+    Send combined raw text to OpenAI for cleaning and structuring into JSON.
+
+    With fast_path=True the local rule-based structurer runs first and its
+    result is returned without any API call when its confidence is at
+    least min_confidence.
+    """
+    if fast_path:
+        structured, confidence = _structure_locally(raw_text)
+        if confidence >= min_confidence:
+            return structured
+
+    client = get_client(api_key, base_url)
+
+    prompt = STRUCTURE_PROMPT.format(raw_text=raw_text)
+
+    with span("structure.llm"):
+        response = create_chat_completion(
+            client,
             model=model,
-            messages=[
-                {"role": "user", "content": f"The following text is supposed to be valid JSON but has errors. Fix it and return ONLY valid JSON, nothing else:\n\n{response_text}"}
-            ],
+            messages=[{"role": "user", "content": prompt}],
             max_tokens=4096,
-            temperature=0,
+            temperature=0.1,
         )
-        retry_text = retry_response.choices[0].message.content.strip()
-        retry_text = re.sub(r'^```json\s*', '', retry_text)
-        retry_text = re.sub(r'^```\s*', '', retry_text)
-        retry_text = re.sub(r'\s*```$', '', retry_text)
-        return json.loads(retry_text)
 
+        return _parse_structured_response(response.choices[0].message.content, client, model)
+
+
+# ─── Streaming variants ────────────────────────────────────────────────────────
+
+def _stream_deltas(client, model: str, messages: list, **kwargs):
+    """Yield content deltas from a streaming chat completion."""
+    stream = create_chat_completion(client, model=model, messages=messages, stream=True, **kwargs)
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            yield delta
 
-def process_images_to_structured(image_paths: list, api_key: str, model_name: str = "gpt-4o") -> dict:
+
+def stream_text_from_images(
+    image_paths: list,
+    api_key: str,
+    model: str = "gpt-4o",
+    per_page: bool = False,
+    max_workers: int = DEFAULT_PAGE_WORKERS,
+    base_url: str = None,
+    image_options: dict = None,
+    image_stats: list = None,
+):
+    """
+    Streaming version of extract_text_from_images.
+
+    Yields (event, page, text) tuples as tokens arrive:
+      ("delta", page, text)  - a chunk of text for page (1-based)
+      ("page", page, text)   - page finished, text is its full transcript
+    In single-request mode everything is reported as page 0 and the text
+    carries the model's own --- Page N --- markers. With per_page=True the
+    pages stream concurrently; join the "page" texts with merge_pages().
+    """
+    client = get_client(api_key, base_url)
+    stats_out = [None] * len(image_paths)
+
+    if not per_page:
+        content = [{"type": "text", "text": OCR_PROMPT}]
+        for i, path in enumerate(image_paths):
+            content.append(_image_part(path, image_options, stats_out, i))
+        if image_stats is not None:
+            image_stats.extend(stats_out)
+        parts = []
+        with span("ocr.request", pages=len(image_paths)) as s:
+            for delta in _stream_deltas(client, model, [{"role": "user", "content": content}], max_tokens=4096):
+                if not parts:
+                    s.set(first_token=round(time.perf_counter() - s.start, 3))
+                parts.append(delta)
+                yield "delta", 0, delta
+        yield "page", 0, "".join(parts).strip()
+        return
+
+    events = queue.Queue()
+    session_id = current_session()
+
+    def run_page(page: int, path: str) -> None:
+        with session(session_id):
+            _stream_page(page, path)
+
+    def _stream_page(page: int, path: str) -> None:
+        try:
+            with span("ocr.page", page=page) as s:
+                content = [
+                    {"type": "text", "text": PAGE_OCR_PROMPT},
+                    _image_part(path, image_options, stats_out, page - 1),
+                ]
+                parts = []
+                for delta in _stream_deltas(client, model, [{"role": "user", "content": content}],
+                                            max_tokens=4096):
+                    if not parts:
+                        s.set(first_token=round(time.perf_counter() - s.start, 3))
+                    parts.append(delta)
+                    events.put(("delta", page, delta))
+            events.put(("page", page, "".join(parts).strip()))
+        except Exception as e:
+            events.put(("error", page, e))
+
+    workers = max(1, min(max_workers, len(image_paths)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for page, path in enumerate(image_paths, 1):
+            pool.submit(bind(run_page), page, path)
+        remaining = len(image_paths)
+        while remaining:
+            event = events.get()
+            if event[0] == "error":
+                raise event[2]
+            if event[0] == "page":
+                remaining -= 1
+            yield event
+    if image_stats is not None:
+        image_stats.extend(stats_out)
+
+
+def _structure_locally(raw_text: str) -> tuple:
+    """Rule-based structuring (see rule_structurer), timed. Returns (structured, confidence)."""
+    with span("structure.local") as s:
+        structured, confidence = structure_text_locally(raw_text)
+        s.set(confidence=round(confidence, 3))
+    return structured, confidence
+
+
+def stream_structured_text(
+    raw_text: str,
+    api_key: str,
+    model: str = "gpt-4o",
+    base_url: str = None,
+    fast_path: bool = True,
+    min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+):
+    """
+    Streaming version of structure_extracted_text.
+    Yields ("delta", text) while the JSON is generated, ("section", dict)
+    as soon as each section is complete, then ("result", dict).
+    """
+    if fast_path:
+        structured, confidence = _structure_locally(raw_text)
+        if confidence >= min_confidence:
+            for section in structured["sections"]:
+                yield "section", section
+            yield "result", structured
+            return
+
+    client = get_client(api_key, base_url)
+    prompt = STRUCTURE_PROMPT.format(raw_text=raw_text)
+    parser = IncrementalJSONParser("sections")
+    with span("structure.llm", stream=True):
+        for delta in _stream_deltas(client, model, [{"role": "user", "content": prompt}],
+                                    max_tokens=4096, temperature=0.1):
+            yield "delta", delta
+            for section in parser.feed(delta):
+                yield "section", section
+        result = _parse_structured_response(parser.buffer, client, model)
+    yield "result", result
+
+
+# ─── Single-call mode: OCR + structure with JSON-schema structured outputs ──
+
+_STRING_LIST = {"type": "array", "items": {"type": "string"}}
+
+PAPER_SCHEMA = {
+    "type": "object",
+    "additionalProperties": False,
+    "required": ["transcript", "exam_title", "class", "subject", "time", "total_marks", "instructions", "sections"],
+    "properties": {
+        "transcript": {"type": "string"},
+        "exam_title": {"type": "string"},
+        "class": {"type": "string"},
+        "subject": {"type": "string"},
+        "time": {"type": "string"},
+        "total_marks": {"type": "string"},
+        "instructions": _STRING_LIST,
+        "sections": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "additionalProperties": False,
+                "required": ["section_name", "questions"],
+                "properties": {
+                    "section_name": {"type": "string"},
+                    "questions": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "additionalProperties": False,
+                            "required": ["number", "text", "marks", "subparts"],
+                            "properties": {
+                                "number": {"type": "string"},
+                                "text": {"type": "string"},
+                                "marks": {"type": "string"},
+                                "subparts": _STRING_LIST,
+                            },
+                        },
+                    },
+                },
+            },
+        },
+    },
+}
+
+SINGLE_CALL_PROMPT = f"""You are an expert OCR system and exam paper formatting assistant specialized in handwritten exam/question papers.
+
+You are given images of a handwritten question paper (pages in order). Do two things in ONE JSON reply:
+
+1. "transcript": the raw text of every page EXACTLY as written, following these rules:
+{OCR_RULES}
+- Clearly mark page boundaries as --- Page 1 ---, --- Page 2 ---, etc.
+
+2. The structured paper in the remaining fields:
+- Clean the text while PRESERVING the exact meaning of every question; fix only minor OCR errors
+- "number" is the question number without a Q prefix, "marks" is just the number of marks or an empty string
+- Subparts include their labels like "(a)", "(i)"; use (a), (b), (c) or (i), (ii), (iii)
+- If there are no clear sections, put all questions in a single section named "Questions"
+- If metadata (exam title, class, subject, time, total marks) is not found, use empty strings
+- Keep Hindi/Devanagari text as-is
+- Every question MUST be included - do not skip any"""
+
+SINGLE_CALL_MAX_TOKENS = 8192
+
+
+def extract_structured_from_images(
+    image_paths: list,
+    api_key: str,
+    model: str = "gpt-4o",
+    base_url: str = None,
+    image_options: dict = None,
+    image_stats: list = None,
+) -> tuple:
+    """
+    OCR and structure a paper in a single request using a strict JSON
+    schema (structured outputs), instead of two sequential round trips.
+    Returns (structured_dict, raw_text).
+    """
+    client = get_client(api_key, base_url)
+    stats_out = [None] * len(image_paths)
+
+    with span("ocr.single_call", pages=len(image_paths)):
+        content = [{"type": "text", "text": SINGLE_CALL_PROMPT}]
+        for i, path in enumerate(image_paths):
+            content.append(_image_part(path, image_options, stats_out, i))
+        if image_stats is not None:
+            image_stats.extend(stats_out)
+
+        response = create_chat_completion(
+            client,
+            model=model,
+            messages=[{"role": "user", "content": content}],
+            max_tokens=SINGLE_CALL_MAX_TOKENS,
+            temperature=0.1,
+            response_format={
+                "type": "json_schema",
+                "json_schema": {"name": "question_paper", "strict": True, "schema": PAPER_SCHEMA},
+            },
+        )
+
+        structured = _parse_structured_response(response.choices[0].message.content, client, model)
+    raw_text = structured.pop("transcript", "").strip()
+    return structured, raw_text
+
+
+def ocr_cache_key(image_paths: list, model: str, per_page: bool = False, image_options: dict = None) -> str:
+    """Cache key for raw OCR text: page image hashes + model + OCR prompt version."""
+    prompt = PAGE_OCR_PROMPT if per_page else OCR_PROMPT
+    return make_key(
+        "ocr", *[file_sha256(p) for p in image_paths],
+        model, prompt_version(prompt), "per_page" if per_page else "single",
+        repr(sorted((image_options or {}).items())),
+    )
+
+
+def structure_cache_key(raw_text: str, model: str, fast_path: bool = True) -> str:
+    """
+    Cache key for structured JSON: raw text hash + model + structuring prompt
+    version + structurer. With fast_path the rules (and their version and
+    confidence threshold) decide the result, so they are part of the key.
+    """
+    structurer = f"rules-{RULES_VERSION}-{DEFAULT_MIN_CONFIDENCE}" if fast_path else "llm"
+    return make_key("structured", sha256_hex(raw_text), model, prompt_version(STRUCTURE_PROMPT), structurer)
+
+
+def single_call_cache_key(image_paths: list, model: str, image_options: dict = None) -> str:
+    """Cache key for single-call results: page image hashes + model + prompt/schema version."""
+    return make_key(
+        "single_call", *[file_sha256(p) for p in image_paths], model,
+        prompt_version(SINGLE_CALL_PROMPT, repr(PAPER_SCHEMA)),
+        repr(sorted((image_options or {}).items())),
+    )
+
+
+def _cache_get(cache: OCRCache, key: str, name: str):
+    """cache.get, counted as a hit or miss; None when caching is off."""
+    if not cache:
+        return None
+    value = cache.get(key)
+    count("cache_total", cache=name, result="miss" if value is None else "hit")
+    return value
+
+
+def process_images_to_structured(
+    image_paths: list,
+    api_key: str,
+    model_name: str = "gpt-4o",
+    per_page: bool = False,
+    max_workers: int = DEFAULT_PAGE_WORKERS,
+    base_url: str = None,
+    cache: OCRCache = None,
+    use_cache: bool = True,
+    image_options: dict = None,
+    image_stats: list = None,
+    single_call: bool = False,
+    fast_path: bool = True,
+) -> dict:
     """
     Full pipeline: images -> OCR -> structure -> JSON
     Returns (structured_dict, raw_text)
+
+    Both the raw text and the structured JSON are cached on disk (see
+    ocr_cache), so re-uploading the same photos skips both API calls. The
+    structured JSON is validated and normalised (model.normalize_paper)
+    before it is cached or returned; malformed output raises PaperError.
+    With single_call=True both come back from one structured-outputs
+    request (see extract_structured_from_images).
     """
-    # Step 1: Extract text from all images in one call
-    raw_text = extract_text_from_images(image_paths, api_key, model=model_name)
+    if use_cache and cache is None:
+        cache = default_cache()
+    if not use_cache:
+        cache = None
+
+    if single_call:
+        key = single_call_cache_key(image_paths, model_name, image_options) if cache else None
+        cached = _cache_get(cache, key, "single_call")
+        if cached is not None:
+            return normalize_paper(cached["structured"]), cached["raw_text"]
+        structured, raw_text = extract_structured_from_images(
+            image_paths, api_key, model=model_name, base_url=base_url,
+            image_options=image_options, image_stats=image_stats,
+        )
+        structured = normalize_paper(structured)
+        if cache:
+            cache.put(key, {"structured": structured, "raw_text": raw_text})
+        return structured, raw_text
+
+    # Step 1: Extract text (one call, or one parallel call per page)
+    raw_key = ocr_cache_key(image_paths, model_name, per_page, image_options) if cache else None
+    cached_raw = _cache_get(cache, raw_key, "raw")
+    if cached_raw is not None:
+        raw_text = cached_raw["raw_text"]
+    else:
+        raw_text = extract_text_from_images(
+            image_paths, api_key, model=model_name,
+            per_page=per_page, max_workers=max_workers, base_url=base_url,
+            image_options=image_options, image_stats=image_stats,
+        )
+        if cache:
+            cache.put(raw_key, {"raw_text": raw_text})
 
     # Step 2: Structure the extracted text
-    structured = structure_extracted_text(raw_text, api_key, model=model_name)
-
-    return structured, raw_text
+    structured_key = structure_cache_key(raw_text, model_name, fast_path) if cache else None
+    structured = _cache_get(cache, structured_key, "structured")
+    if structured is None:
+        structured = normalize_paper(structure_extracted_text(raw_text, api_key, model=model_name,
+                                                              base_url=base_url, fast_path=fast_path))
+        if cache:
+            cache.put(structured_key, structured)
+
+    return normalize_paper(structured), raw_text
+
+
+def stream_images_to_structured(
+    image_paths: list,
+    api_key: str,
+    model_name: str = "gpt-4o",
+    per_page: bool = False,
+    max_workers: int = DEFAULT_PAGE_WORKERS,
+    base_url: str = None,
+    cache: OCRCache = None,
+    use_cache: bool = True,
+    image_options: dict = None,
+    image_stats: list = None,
+    fast_path: bool = True,
+):
+    """
+    Streaming version of process_images_to_structured, for live progress.
+
+    Yields (event, payload) tuples:
+      ("ocr_delta", (page, text))   - OCR tokens for a page
+      ("page_done", (page, text))   - a page finished
+      ("ocr_done", raw_text)        - all pages read (also sent on a cache hit)
+      ("structure_delta", text)     - JSON tokens from the structuring call
+      ("section", dict)             - a section finished parsing
+      ("result", (structured, raw_text))
+    """
+    if use_cache and cache is None:
+        cache = default_cache()
+    if not use_cache:
+        cache = None
+
+    raw_key = ocr_cache_key(image_paths, model_name, per_page, image_options) if cache else None
+    cached_raw = _cache_get(cache, raw_key, "raw")
+    if cached_raw is not None:
+        raw_text = cached_raw["raw_text"]
+    else:
+        page_texts = [""] * len(image_paths)
+        for event, page, text in stream_text_from_images(
+            image_paths, api_key, model=model_name, per_page=per_page, max_workers=max_workers,
+            base_url=base_url, image_options=image_options, image_stats=image_stats,
+        ):
+            if event == "delta":
+                yield "ocr_delta", (page, text)
+            else:
+                if page:
+                    page_texts[page - 1] = text
+                else:
+                    page_texts = [text]
+                yield "page_done", (page, text)
+        raw_text = merge_pages(page_texts) if per_page else page_texts[0]
+        if cache:
+            cache.put(raw_key, {"raw_text": raw_text})
+    yield "ocr_done", raw_text
+
+    structured_key = structure_cache_key(raw_text, model_name, fast_path) if cache else None
+    structured = _cache_get(cache, structured_key, "structured")
+    if structured is None:
+        for event, payload in stream_structured_text(raw_text, api_key, model=model_name, base_url=base_url,
+                                                     fast_path=fast_path):
+            if event == "delta":
+                yield "structure_delta", payload
+            elif event == "section":
+                yield "section", payload
+            else:
+                structured = normalize_paper(payload)
+        if cache:
+            cache.put(structured_key, structured)
+
+    yield "result", (normalize_paper(structured), raw_text)
@@ -0,0 +1,184 @@
+"""
+On-disk cache for OCR results.
+Raw OCR text is keyed by the SHA-256 of the page images, the model and the
+OCR prompt version; structured JSON is keyed by the raw text, the model and
+the structuring prompt version. Entries are evicted least-recently-used once
+the cache grows past its size budget.
+
+Inspect or clear from the command line:
+    python ocr_cache.py stats
+    python ocr_cache.py clear
+"""
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "PRASHNAPRO_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache"),
+)
+DEFAULT_MAX_BYTES = int(os.environ.get("PRASHNAPRO_CACHE_MAX_BYTES", 50 * 1024 * 1024))
+
+
+def sha256_hex(data) -> str:
+    """SHA-256 hex digest of bytes or text."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_sha256(path: str) -> str:
+    """SHA-256 hex digest of a file's contents."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def prompt_version(*prompts: str) -> str:
+    """Short hash identifying a prompt text, so prompt edits invalidate old entries."""
+    return sha256_hex("\x00".join(prompts))[:12]
+
+
+def make_key(kind: str, *parts: str) -> str:
+    """Combine key parts into a single cache key."""
+    return f"{kind}-" + sha256_hex("\x00".join(parts))
+
+
+class OCRCache:
+    """
+    Size-bounded LRU cache of JSON values, one file per entry.
+    Recency is tracked with file mtimes so it survives restarts and is
+    shared between processes using the same directory.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str):
+        """Return the cached value for key, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path, None)  # mark as recently used
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put(self, key: str, value) -> None:
+        """Store a JSON-serialisable value and evict old entries if over budget."""
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self._evict()
+
+    def entries(self) -> list:
+        """List cache entries as dicts (key, bytes, last_used), most recent first."""
+        if not os.path.isdir(self.directory):
+            return []
+        out = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            out.append({"key": name[:-5], "bytes": st.st_size, "last_used": st.st_mtime})
+        out.sort(key=lambda e: e["last_used"], reverse=True)
+        return out
+
+    def _evict(self) -> None:
+        entries = self.entries()
+        total = sum(e["bytes"] for e in entries)
+        while entries and total > self.max_bytes:
+            oldest = entries.pop()
+            try:
+                os.remove(self._path(oldest["key"]))
+            except OSError:
+                pass
+            total -= oldest["bytes"]
+
+    def stats(self) -> dict:
+        """Entry count, total size and hit/miss counters for this process."""
+        entries = self.entries()
+        return {
+            "directory": self.directory,
+            "entries": len(entries),
+            "bytes": sum(e["bytes"] for e in entries),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def clear(self) -> int:
+        """Delete every entry. Returns the number of entries removed."""
+        removed = 0
+        for e in self.entries():
+            try:
+                os.remove(self._path(e["key"]))
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+
+_default_cache = None
+
+
+def default_cache() -> OCRCache:
+    """Process-wide cache instance using the default directory."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = OCRCache()
+    return _default_cache
+
+
+def main(argv: list) -> int:
+    cache = default_cache()
+    cmd = argv[1] if len(argv) > 1 else "stats"
+    if cmd == "stats":
+        print(json.dumps(cache.stats(), indent=2))
+    elif cmd == "list":
+        for e in cache.entries():
+            used = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(e["last_used"]))
+            print(f"{used}  {e['bytes']:>9}  {e['key']}")
+    elif cmd == "clear":
+        print(f"Removed {cache.clear()} entries from {cache.directory}")
+    else:
+        print("Usage: python ocr_cache.py [stats|list|clear]")
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
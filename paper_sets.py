@@ -0,0 +1,258 @@
+"""
+Several sets (A, B, C, ...) of one question paper for anti-cheating.
+
+make_sets shuffles the questions within each section and permutes the
+(a)-(d) options of MCQs, deterministically from a seed. Numbers and
+option labels stay in place, so every set still reads Q1, Q2, ... and
+(a)-(d), and the 2x2 option grid detection keeps working. Each set
+records where every question and option came from, so a master answer
+key can be translated per set. render_sets renders all sets in one
+batch through render_pool, reading the logo and images once.
+
+Usage:
+    from paper_sets import make_sets, render_sets, answer_key
+    sets = make_sets(data, n=3, seed=2024)
+    render_sets(sets, "output/", school_name="DPS", logo_path="logo.png")
+    answer_key(sets, {"1": "b", "2": "d"})   # {"A": {"4": "c", ...}, "B": {...}, ...}
+
+Answer keys address a question by its number. When numbering restarts
+in each section, use "<section>/<number>" (section counted from 1, e.g.
+"2/1" for the first question of the second section) or the question id;
+the per-set keys then use "<section>/<number>" too.
+"""
+
+import json
+import os
+import random
+import re
+from dataclasses import dataclass, field
+
+from formatter import find_question_image, image_bytes, generate_filename
+from model import as_paper
+
+
+SET_LABELS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+# Options that point at other options must keep their place
+_POSITIONAL_OPTION = re.compile(
+    r"\b(all|none|both|neither)\b.*\b(above|of these|and|nor)\b|\([a-dA-D]\)", re.IGNORECASE)
+
+
+@dataclass
+class QuestionOrigin:
+    """Where a question of a set came from in the original paper."""
+    section: int
+    number: str            # number printed in this set
+    original_number: str
+    original_index: int    # index within the original section
+    id: str = ""           # persistent question id, when the paper has them
+    options: dict = field(default_factory=dict)  # printed letter -> original letter, e.g. {"a": "c"}
+
+
+@dataclass
+class PaperSet:
+    label: str
+    structured_data: dict
+    question_images: dict
+    origins: list          # QuestionOrigin per question, in print order
+    seed: object = None
+
+    def translate(self, master_key: dict) -> dict:
+        """
+        Answer key for this set from one for the original: {number: letter
+        or answer}. The master key is looked up by question id, then by
+        "<section>/<number>", then (only if numbers are unique) by number.
+        """
+        unique = _numbers_unique(self.origins)
+        key = {}
+        for origin in self.origins:
+            answer = _lookup(master_key, origin, unique)
+            if answer is None:
+                continue
+            if origin.options and isinstance(answer, str):
+                letter = _letter(answer)
+                printed = {orig: new for new, orig in origin.options.items()}
+                answer = printed.get(letter, answer)
+            key[origin.number if unique else f"{origin.section + 1}/{origin.number}"] = answer
+        return key
+
+
+def _numbers_unique(origins: list) -> bool:
+    numbers = [o.original_number for o in origins]
+    return len(set(numbers)) == len(numbers)
+
+
+def _lookup(master_key: dict, origin: QuestionOrigin, unique: bool):
+    """A question's master answer; a bare number is ambiguous when numbering restarts per section."""
+    for k in (origin.id, f"{origin.section + 1}/{origin.original_number}",
+              origin.original_number if unique else None):
+        if k and k in master_key:
+            return master_key[k]
+    return None
+
+
+def _letter(prefix_or_answer: str) -> str:
+    """'(b)', 'B)', 'b' -> 'b'."""
+    return prefix_or_answer.strip().strip("()").lower()[:1]
+
+
+def _shuffle_options(subparts: tuple, rng: random.Random) -> tuple:
+    """Permuted options relabelled (a)-(d) in the original label style, and printed -> original letters."""
+    prefixes = [sp.label for sp in subparts]
+    bodies = [sp.text[len(sp.label):].strip() for sp in subparts]
+    if any(_POSITIONAL_OPTION.search(body) for body in bodies):
+        return [sp.text for sp in subparts], {}
+    order = list(range(len(subparts)))
+    rng.shuffle(order)
+    options = [f"{prefixes[i]} {bodies[j]}" for i, j in enumerate(order)]
+    mapping = {_letter(prefixes[i]): _letter(prefixes[j]) for i, j in enumerate(order)}
+    return options, mapping
+
+
+def make_set(structured_data: dict, label: str, seed, question_images: dict = None,
+             shuffle_questions: bool = True, shuffle_options: bool = True) -> PaperSet:
+    """One shuffled variant. The same (seed, label) always gives the same set."""
+    rng = random.Random(f"{seed}:{label}")
+    paper = as_paper(structured_data)
+    data = paper.to_dict()
+    if paper.exam_title:
+        data["exam_title"] = f"{paper.exam_title} (Set {label})"
+
+    images, origins = {}, []
+    for si, section in enumerate(paper.sections):
+        questions = section.questions
+        numbers = [q.number or str(qi + 1) for qi, q in enumerate(questions)]
+        order = list(range(len(questions)))
+        if shuffle_questions:
+            rng.shuffle(order)
+
+        new_questions = []
+        for qi, oi in enumerate(order):
+            original = questions[oi]
+            question = dict(original.to_dict(), number=numbers[qi])
+            mapping = {}
+            # is_mcq is false for match tables, as in create_question_paper
+            if shuffle_options and original.is_mcq:
+                question["subparts"], mapping = _shuffle_options(original.subparts, rng)
+            new_questions.append(question)
+            origins.append(QuestionOrigin(si, numbers[qi], numbers[oi], oi, original.id, mapping))
+            # Images keyed by question id travel with the question; positional keys are remapped
+            source = find_question_image(question_images, si, oi, original)
+            if source is not None:
+                images[original.id or f"{si}_{qi}"] = source
+        data["sections"][si]["questions"] = new_questions
+
+    return PaperSet(label, data, images, origins, seed)
+
+
+def make_sets(structured_data: dict, n: int = 3, seed=0, question_images: dict = None,
+              shuffle_questions: bool = True, shuffle_options: bool = True) -> list:
+    """n sets labelled A, B, C, ... of a paper given as a dict or a Paper."""
+    if not 1 <= n <= len(SET_LABELS):
+        raise ValueError(f"n must be between 1 and {len(SET_LABELS)}")
+    paper = as_paper(structured_data)  # validated once for all sets
+    return [make_set(paper, SET_LABELS[i], seed, question_images, shuffle_questions, shuffle_options)
+            for i in range(n)]
+
+
+def answer_key(sets: list, master_key: dict) -> dict:
+    """Per-set answer keys: {"A": {number: answer}, ...}. master_key is for the original paper."""
+    return {s.label: s.translate(master_key) for s in sets}
+
+
+def set_mapping(sets: list) -> dict:
+    """JSON-able record of every set's question and option origins."""
+    return {
+        s.label: [{"section": o.section, "number": o.number, "original_number": o.original_number,
+                   "id": o.id, "options": o.options} for o in s.origins]
+        for s in sets
+    }
+
+
+# ─── Rendering ────────────────────────────────────────────────────────────────
+
+def render_sets(
+    sets: list,
+    output_dir: str = None,
+    school_name: str = "",
+    logo_path=None,
+    compact: bool = True,
+    style=None,
+    backend: str = "python-docx",
+    workers: int = 1,
+    master_key: dict = None,
+) -> list:
+    """
+    Render every set through render_pool.render_papers. With output_dir the
+    sets are written as <paper>_Set_A.docx, ... next to sets.json (the
+    question/option mapping and, given master_key, the per-set answer keys);
+    without it the RenderResults carry the .docx bytes.
+
+    The logo and each question image are read once and shared by all sets,
+    and templates are built once; with workers > 1 each worker receives them
+    once at startup rather than with every set. workers=1 renders in this
+    process, where print-prepared images are also reused across sets.
+    """
+    from render_pool import RenderJob, render_papers
+
+    logo = image_bytes(logo_path)
+    images = {}  # read each image source once, even if it moved to a different key per set
+    jobs = []
+    for paper_set in sets:
+        q_images = {}
+        for key, source in paper_set.question_images.items():
+            if id(source) not in images:
+                images[id(source)] = image_bytes(source)
+            q_images[key] = images[id(source)]
+        output_path = None
+        if output_dir:
+            data = paper_set.structured_data
+            title = data.get("exam_title", "").removesuffix(f" (Set {paper_set.label})")
+            base = os.path.splitext(generate_filename(dict(data, exam_title=title)))[0]
+            output_path = os.path.join(output_dir, f"{base}_Set_{paper_set.label}.docx")
+        jobs.append(RenderJob(paper_set.structured_data, output_path, school_name=school_name,
+                              logo_path=logo, compact=compact, question_images=q_images, style=style,
+                              backend=backend, name=f"Set {paper_set.label}"))
+
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        record = {"seed": sets[0].seed if sets else None, "mapping": set_mapping(sets)}
+        if master_key:
+            record["answer_keys"] = answer_key(sets, master_key)
+        with open(os.path.join(output_dir, "sets.json"), "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False, indent=2)
+
+    return render_papers(jobs, workers=workers)
+
+
+# ─── CLI ──────────────────────────────────────────────────────────────────────
+
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser(description="Render shuffled sets A, B, C, ... of a structured paper")
+    p.add_argument("paper", help="JSON file with the structured data (as batch.py writes it)")
+    p.add_argument("--sets", type=int, default=3, help="Number of sets (default: 3)")
+    p.add_argument("--seed", default="0", help="Same seed, same sets")
+    p.add_argument("--output", default="output", help="Folder for the .docx files and sets.json")
+    p.add_argument("--key", help="JSON answer key of the original paper: {question number: answer}, "
+                                 "or {\"<section>/<number>\": answer} when numbering restarts per section")
+    p.add_argument("--school-name", default="")
+    p.add_argument("--logo", default=None, help="School logo image")
+    p.add_argument("--normal", action="store_true", help="Normal spacing instead of compact mode")
+    p.add_argument("--no-option-shuffle", action="store_true", help="Keep MCQ options in order")
+    args = p.parse_args()
+
+    with open(args.paper, encoding="utf-8") as f:
+        data = json.load(f)
+    data = data.get("structured_data", data)
+    master = None
+    if args.key:
+        with open(args.key, encoding="utf-8") as f:
+            master = json.load(f)
+
+    sets = make_sets(data, args.sets, seed=args.seed, shuffle_options=not args.no_option_shuffle)
+    for result in render_sets(sets, args.output, school_name=args.school_name, logo_path=args.logo,
+                              compact=not args.normal, master_key=master):
+        print(f"  {result.name}: {result.output_path if result.ok else 'FAILED ' + result.error}")
+    print(f"Mapping{' and answer keys' if master else ''} in {os.path.join(args.output, 'sets.json')}")
@@ -0,0 +1,405 @@
+"""
+Native PDF export of question papers, built on reportlab.
+
+Lays out the same structured_data as formatter.create_question_paper -
+header with logo, metadata table, instructions, sections, questions with
+right-aligned marks, 2x2 MCQ grids (compact mode), match-the-following
+tables, question images and "Page N" footers - using the PaperStyle sizes
+and spacing, without Word or LibreOffice.
+
+Fonts are embedded TrueType: a Times-like Latin family (Liberation Serif,
+Times New Roman or DejaVu Serif, else the built-in Times) plus a
+Devanagari font for Hindi text. The Devanagari font is looked up in
+$PRASHNAPRO_DEVANAGARI_FONT, the repo's fonts/ folder and the usual system
+locations (Noto Sans Devanagari, Lohit, FreeSerif, Nirmala, Mangal).
+With uharfbuzz installed, Devanagari is shaped (conjuncts, matras).
+No Devanagari font is shipped: when none is found a warning is logged,
+and devanagari_font_missing() lets the UI tell the user that Hindi text
+in the PDF will not render.
+
+reportlab is optional: pdf_available() says whether PDF export works.
+"""
+
+import io
+import json
+import logging
+import os
+import re
+import threading
+from xml.sax.saxutils import escape
+
+from formatter import (
+    PaperStyle, find_question_image, image_bytes, paper_meta_parts, paper_style, question_image,
+)
+from metrics import count, span
+from model import Paper, as_paper
+
+try:
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.lib.units import cm
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.platypus import (
+        BaseDocTemplate, Frame, HRFlowable, Image, PageTemplate, Paragraph, Spacer, Table, TableStyle,
+    )
+except ImportError:  # pragma: no cover - optional dependency
+    pdfmetrics = None
+
+log = logging.getLogger(__name__)
+
+FONT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts")
+SYSTEM_FONT_DIRS = [
+    "/usr/share/fonts", "/usr/local/share/fonts", os.path.expanduser("~/.fonts"),
+    "/Library/Fonts", "/System/Library/Fonts", "C:\\Windows\\Fonts",
+]
+
+# (regular, bold, italic, bold italic) file names, best match first
+LATIN_FONTS = [
+    ("LiberationSerif-Regular.ttf", "LiberationSerif-Bold.ttf",
+     "LiberationSerif-Italic.ttf", "LiberationSerif-BoldItalic.ttf"),
+    ("times.ttf", "timesbd.ttf", "timesi.ttf", "timesbi.ttf"),
+    ("DejaVuSerif.ttf", "DejaVuSerif-Bold.ttf", "DejaVuSerif-Italic.ttf", "DejaVuSerif-BoldItalic.ttf"),
+]
+DEVANAGARI_FONTS = [
+    ("NotoSansDevanagari-Regular.ttf", "NotoSansDevanagari-Bold.ttf"),
+    ("NotoSerifDevanagari-Regular.ttf", "NotoSerifDevanagari-Bold.ttf"),
+    ("Lohit-Devanagari.ttf", None),
+    ("FreeSerif.ttf", "FreeSerifBold.ttf"),
+    ("Nirmala.ttf", "NirmalaB.ttf"),
+    ("mangal.ttf", "mangalb.ttf"),
+]
+
+# Whole words containing Devanagari letters, signs or marks (incl. Vedic
+# extensions), with the spaces between them so a phrase stays in one font
+# run. Punctuation attached to a word ("है?") stays in the run too: reportlab
+# shapes a word with the font of its first character, so a word split
+# across two fonts would look up glyph ids in the wrong one.
+_DEVANAGARI_WORD = "\\S*[\u0900-\u097F\uA8E0-\uA8FF\u1CD0-\u1CFF]\\S*"
+_DEVANAGARI_RUN = re.compile(f"{_DEVANAGARI_WORD}(?:\\s+{_DEVANAGARI_WORD})*")
+
+# Word's "single" line spacing for Times New Roman is about 1.15 x font size
+LEADING = 1.15
+GREY = "#646464"
+
+
+def pdf_available() -> bool:
+    """True when reportlab is installed."""
+    return pdfmetrics is not None
+
+
+# ─── Fonts ────────────────────────────────────────────────────────────────────
+
+def _find_font(filename: str) -> str:
+    if not filename:
+        return None
+    for directory in [FONT_DIR] + SYSTEM_FONT_DIRS:
+        if not os.path.isdir(directory):
+            continue
+        direct = os.path.join(directory, filename)
+        if os.path.exists(direct):
+            return direct
+        for root, _dirs, files in os.walk(directory):
+            if filename in files:
+                return os.path.join(root, filename)
+    return None
+
+
+class _Fonts:
+    """Registered font names for the Latin family and Devanagari (None if unavailable)."""
+
+    def __init__(self):
+        self.regular, self.bold, self.italic, self.bold_italic = (
+            "Times-Roman", "Times-Bold", "Times-Italic", "Times-BoldItalic")
+        for names in LATIN_FONTS:
+            paths = [_find_font(n) for n in names]
+            if paths[0] and paths[1]:
+                self._register_latin(paths)
+                break
+
+        self.devanagari = None
+        self.shaping = False
+        override = os.environ.get("PRASHNAPRO_DEVANAGARI_FONT")
+        candidates = [(override, os.environ.get("PRASHNAPRO_DEVANAGARI_FONT_BOLD"))] if override else []
+        candidates += [(_find_font(r), _find_font(b)) for r, b in DEVANAGARI_FONTS]
+        for regular, bold in candidates:
+            if regular and os.path.exists(regular):
+                self._register_devanagari(regular, bold if bold and os.path.exists(bold) else regular)
+                break
+        else:
+            log.warning("No Devanagari font found, so Hindi text in PDFs will not render. Put "
+                        "NotoSansDevanagari-Regular.ttf in %s or set PRASHNAPRO_DEVANAGARI_FONT.", FONT_DIR)
+
+    def _register_latin(self, paths: list) -> None:
+        regular, bold, italic, bold_italic = paths
+        names = ["PPSerif", "PPSerif-Bold", "PPSerif-Italic", "PPSerif-BoldItalic"]
+        files = [regular, bold, italic or regular, bold_italic or bold]
+        for name, path in zip(names, files):
+            pdfmetrics.registerFont(TTFont(name, path))
+        pdfmetrics.registerFontFamily(names[0], normal=names[0], bold=names[1],
+                                      italic=names[2], boldItalic=names[3])
+        self.regular, self.bold, self.italic, self.bold_italic = names
+
+    def _register_devanagari(self, regular: str, bold: str) -> None:
+        pdfmetrics.registerFont(TTFont("PPDevanagari", regular))
+        pdfmetrics.registerFont(TTFont("PPDevanagari-Bold", bold))
+        pdfmetrics.registerFontFamily("PPDevanagari", normal="PPDevanagari", bold="PPDevanagari-Bold",
+                                      italic="PPDevanagari", boldItalic="PPDevanagari-Bold")
+        self.devanagari = "PPDevanagari"
+        try:
+            import uharfbuzz  # noqa: F401
+            self.shaping = True
+        except ImportError:
+            self.shaping = False
+
+
+_fonts = None
+_fonts_lock = threading.Lock()
+
+
+def _get_fonts() -> _Fonts:
+    global _fonts
+    if _fonts is None:
+        with _fonts_lock:
+            if _fonts is None:
+                _fonts = _Fonts()
+    return _fonts
+
+
+def devanagari_font_missing(structured_data, school_name: str = "") -> bool:
+    """True when the paper has Hindi text but no Devanagari font was found to render it."""
+    if not pdf_available() or _get_fonts().devanagari:
+        return False
+    text = json.dumps(as_paper(structured_data).to_dict(), ensure_ascii=False) + school_name
+    return bool(_DEVANAGARI_RUN.search(text))
+
+
+def _markup(text: str, fonts: _Fonts) -> str:
+    """Escape text for a Paragraph and switch Devanagari runs to the Devanagari font."""
+    text = escape(text)
+    if fonts.devanagari:
+        text = _DEVANAGARI_RUN.sub(lambda m: f'<font name="{fonts.devanagari}">{m.group(0)}</font>', text)
+    return text.replace("\t", "&nbsp;" * 4).replace("\r\n", "<br/>").replace("\n", "<br/>")
+
+
+# ─── Styles ───────────────────────────────────────────────────────────────────
+
+def _styles(style: PaperStyle, fonts: _Fonts) -> dict:
+    """ParagraphStyles mirroring the named styles in formatter.build_template."""
+    def ps(name, size=None, bold=False, italic=False, align=TA_LEFT, before=0.0,
+           after=style.base_space_after, line_spacing=style.base_line_spacing, indent_cm=0.0, color=None):
+        size = size or style.base_size
+        font = {(False, False): fonts.regular, (True, False): fonts.bold,
+                (False, True): fonts.italic, (True, True): fonts.bold_italic}[(bold, italic)]
+        return ParagraphStyle(
+            name, fontName=font, fontSize=size, leading=size * line_spacing * LEADING,
+            alignment=align, spaceBefore=before, spaceAfter=after, leftIndent=indent_cm * cm,
+            textColor=colors.HexColor(color) if color else colors.black,
+            shaping=1 if fonts.shaping else 0,
+        )
+
+    return {
+        "SchoolName": ps("SchoolName", style.school_size, bold=True, align=TA_CENTER, after=0),
+        "ExamTitle": ps("ExamTitle", style.title_size, bold=True, align=TA_CENTER, before=2, after=2),
+        "Meta": ps("Meta", style.meta_size, after=0),
+        "InstructionHeading": ps("InstructionHeading", style.instruction_heading_size, bold=True,
+                                 before=2, after=1),
+        "Instruction": ps("Instruction", style.instruction_size, after=0, line_spacing=1.0, indent_cm=0.5),
+        "SectionHeader": ps("SectionHeader", style.section_size, bold=True, align=TA_CENTER,
+                            before=style.section_space_before, after=style.section_space_after),
+        "QuestionText": ps("QuestionText", style.question_size, before=style.question_space_before,
+                           after=style.question_space_after, line_spacing=style.question_line_spacing),
+        "Marks": ps("Marks", style.marks_size, bold=True, align=TA_RIGHT, before=style.question_space_before,
+                    after=style.question_space_after),
+        "Subpart": ps("Subpart", style.subpart_size, after=0, line_spacing=1.0, indent_cm=1.2),
+        "MatchCell": ps("MatchCell", style.subpart_size, before=1, after=1, indent_cm=0.2),
+        "OptionCell": ps("OptionCell", style.subpart_size, after=0, indent_cm=0.3),
+        "EndOfPaper": ps("EndOfPaper", 9, italic=True, align=TA_CENTER, color=GREY),
+    }
+
+
+_NO_PADDING = [
+    ("LEFTPADDING", (0, 0), (-1, -1), 0), ("RIGHTPADDING", (0, 0), (-1, -1), 0),
+    ("TOPPADDING", (0, 0), (-1, -1), 0), ("BOTTOMPADDING", (0, 0), (-1, -1), 0),
+    ("VALIGN", (0, 0), (-1, -1), "TOP"),
+]
+
+
+def _rule(thickness_eighths: int, before: float, after: float):
+    """Same line as formatter.add_rule (w:sz is in eighths of a point)."""
+    return HRFlowable(width="100%", thickness=thickness_eighths / 8, color=colors.black,
+                      spaceBefore=before, spaceAfter=after)
+
+
+def _image(data: bytes, width: float = None, height: float = None):
+    """An Image flowable; give width or height and the other follows the aspect ratio."""
+    w, h = ImageReader(io.BytesIO(data)).getSize()
+    if width is None:
+        width = height * w / h
+    if height is None:
+        height = width * h / w
+    return Image(io.BytesIO(data), width=width, height=height)
+
+
+# ─── Paper ────────────────────────────────────────────────────────────────────
+
+def _story(paper: Paper, style: PaperStyle, styles: dict, fonts: _Fonts, avail: float,
+           school_name: str, logo_path, compact: bool, question_images: dict) -> list:
+    """Flowables for the paper, in create_question_paper's order."""
+    m = lambda text: _markup(text, fonts)
+    story = []
+
+    # ─── Header ────────────────────────────────────────────────────────────
+    display_school = school_name or paper.school_name
+    logo = image_bytes(logo_path)
+    if logo and display_school:
+        name = ParagraphStyle("SchoolNameLeft", parent=styles["SchoolName"], alignment=TA_LEFT)
+        header = Table([[_image(logo, height=1.8 * cm), Paragraph(m(display_school.upper()), name)]],
+                       colWidths=[2.5 * cm, avail - 2.5 * cm], hAlign="CENTER")
+        header.setStyle(TableStyle(_NO_PADDING + [("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+                                                  ("RIGHTPADDING", (0, 0), (0, 0), 6)]))
+        story.append(header)
+    elif display_school:
+        story.append(Paragraph(m(display_school.upper()), styles["SchoolName"]))
+    elif logo:
+        story.append(_image(logo, height=2.0 * cm))
+
+    if paper.exam_title:
+        story.append(Paragraph(m(paper.exam_title), styles["ExamTitle"]))
+
+    meta_parts = paper_meta_parts(paper)
+    if len(meta_parts) >= 4:
+        right = ParagraphStyle("MetaRight", parent=styles["Meta"], alignment=TA_RIGHT)
+        meta = Table([[Paragraph(m(meta_parts[0]), styles["Meta"]), Paragraph(m(meta_parts[2]), right)],
+                      [Paragraph(m(meta_parts[1]), styles["Meta"]), Paragraph(m(meta_parts[3]), right)]],
+                     colWidths=[avail / 2] * 2)
+        meta.setStyle(TableStyle(_NO_PADDING))
+        story.append(meta)
+    elif meta_parts:
+        line = ParagraphStyle("MetaLine", parent=styles["Meta"], alignment=TA_CENTER, spaceAfter=2)
+        story.append(Paragraph(m("  |  ".join(meta_parts)), line))
+
+    story.append(_rule(6, 3, 3))
+
+    if paper.instructions:
+        story.append(Paragraph(f"<u>{m('General Instructions:')}</u>", styles["InstructionHeading"]))
+        for idx, instr in enumerate(paper.instructions, 1):
+            story.append(Paragraph(m(f"{idx}. {instr}"), styles["Instruction"]))
+
+    story.append(_rule(4, 2, 4))
+
+    # ─── Sections & questions ──────────────────────────────────────────────
+    marks_width = 1.6 * cm
+    for si, section in enumerate(paper.sections):
+        section_name = section.name or f"Section {si + 1}"
+        story.append(Paragraph(m(section_name.upper()), styles["SectionHeader"]))
+
+        for qi, question in enumerate(section.questions):
+            q_num = question.number or str(qi + 1)
+            q_marks = question.marks
+            subparts = question.subpart_texts
+
+            text = Paragraph(f"<b>{m(f'Q{q_num}. ')}</b>{m(question.text)}", styles["QuestionText"])
+            if q_marks:
+                # Marks right-aligned at the margin, like the .docx tab stop
+                row = Table([[text, Paragraph(m(f"[{q_marks}]"), styles["Marks"])]],
+                            colWidths=[avail - marks_width, marks_width])
+                row.setStyle(TableStyle(_NO_PADDING))
+                story.append(row)
+            else:
+                story.append(text)
+
+            if subparts:
+                if question.is_match:
+                    rows = [[Paragraph(m(cell), styles["MatchCell"]) for cell in row]
+                            for row in question.match_rows]
+                    table = Table(rows, colWidths=[avail / 2] * 2, hAlign="LEFT", rowHeights=None)
+                    table.setStyle(TableStyle([
+                        ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#CCCCCC")),
+                        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+                        ("TOPPADDING", (0, 0), (-1, -1), 0), ("BOTTOMPADDING", (0, 0), (-1, -1), 0),
+                    ]))
+                    story.append(table)
+                elif compact and question.is_mcq:
+                    cells = [Paragraph(m(opt), styles["OptionCell"]) for opt in subparts]
+                    table = Table([cells[:2], cells[2:]], colWidths=[avail / 2] * 2, hAlign="LEFT")
+                    table.setStyle(TableStyle(_NO_PADDING + [("TOPPADDING", (0, 0), (-1, -1), 1),
+                                                             ("BOTTOMPADDING", (0, 0), (-1, -1), 1)]))
+                    story.append(table)
+                else:
+                    for sp in subparts:
+                        story.append(Paragraph(m(sp), styles["Subpart"]))
+
+            img = question_image(find_question_image(question_images, si, qi, question), style)
+            if img is not None:
+                flowable = _image(img.data, width=img.width_cm * cm)
+                flowable.hAlign = "LEFT"
+                story.append(Spacer(1, 4))
+                story.append(Table([[flowable]], colWidths=[avail], style=TableStyle(
+                    _NO_PADDING + [("LEFTPADDING", (0, 0), (-1, -1), 0.5 * cm)])))
+                story.append(Spacer(1, 4))
+
+    story.append(_rule(4, 12, 0))
+    story.append(Paragraph(m("— End of Question Paper —"), styles["EndOfPaper"]))
+    return story
+
+
+def create_question_paper_pdf(
+    structured_data: dict,
+    output_path=None,
+    school_name: str = "",
+    logo_path=None,
+    compact: bool = True,
+    question_images: dict = None,
+    style: PaperStyle = None,
+):
+    """
+    Render the paper as a PDF. Same arguments as
+    formatter.create_question_paper; returns output_path, or a BytesIO
+    positioned at the start when output_path is None.
+    """
+    if not pdf_available():
+        raise RuntimeError("PDF export needs reportlab: pip install reportlab")
+    style = style or paper_style(compact)
+    fonts = _get_fonts()
+    styles = _styles(style, fonts)
+    paper = as_paper(structured_data)
+
+    target = output_path if output_path is not None else io.BytesIO()
+    doc = BaseDocTemplate(
+        target, pagesize=A4,
+        topMargin=style.top_margin_cm * cm, bottomMargin=style.bottom_margin_cm * cm,
+        leftMargin=style.left_margin_cm * cm, rightMargin=style.right_margin_cm * cm,
+        title=paper.exam_title or "Question Paper",
+        author=school_name or paper.school_name,
+    )
+
+    def page_number(canvas, doc):
+        canvas.saveState()
+        canvas.setFont(fonts.regular, 8)
+        canvas.setFillColor(colors.HexColor("#808080"))
+        canvas.drawCentredString(A4[0] / 2, max(0.4 * cm, style.bottom_margin_cm * cm / 2),
+                                 f"Page {doc.page}")
+        canvas.restoreState()
+
+    # No frame padding, so text runs margin to margin as in Word
+    frame = Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height,
+                  leftPadding=0, rightPadding=0, topPadding=0, bottomPadding=0)
+    doc.addPageTemplates([PageTemplate("paper", frames=[frame], onPage=page_number)])
+
+    with span("render.pdf") as s:
+        story = _story(paper, style, styles, fonts, doc.width, school_name, logo_path,
+                       compact, question_images)
+        doc.build(story)
+        size = target.tell() if hasattr(target, "tell") else os.path.getsize(target)
+        s.set(bytes=size, pages=doc.page)
+    count("documents_total", format="pdf")
+    count("document_bytes_total", size, format="pdf")
+
+    if output_path is None:
+        target.seek(0)
+        return target
+    return output_path
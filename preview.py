@@ -0,0 +1,179 @@
+"""
+Memoized HTML preview of a paper for the editor.
+
+Streamlit reruns the whole script on every keystroke, so the preview is
+assembled from cached fragments: the header and each question are
+memoized on their content, and question images become small thumbnail
+data URIs once per distinct image. An edit re-renders only the question
+that changed; everything else is a cache hit and a string join.
+
+Usage:
+    from preview import render_preview
+    html = render_preview(data, school_name="DPS", images={"0_1": png_bytes})
+"""
+
+import base64
+import collections
+import functools
+import hashlib
+import os
+import threading
+
+from formatter import find_question_image
+from imaging import preview_thumbnail
+from model import as_paper
+
+
+PREVIEW_CACHE_MAX_BYTES = 16 * 1024 * 1024
+FRAGMENT_CACHE_SIZE = 4096
+
+_IMG_STYLE = "max-width:60%;max-height:180px;border-radius:4px;border:1px solid #e5e5ea;"
+_HR = '<hr style="border:none;border-top:1px solid #e5e5ea;margin:10px 0">'
+_END = ('<div style="text-align:center;color:#aeaeb2;font-size:0.72rem;font-style:italic">'
+        'End of Question Paper</div></div>')
+
+
+# ─── Image data URIs ──────────────────────────────────────────────────────────
+
+class _DataUriCache:
+    """
+    Thumbnail data URIs keyed by image content hash, LRU-bounded in bytes.
+    Hashing is skipped for an image object already seen: session state
+    hands back the same bytes object on every rerun. An image given as a
+    path is keyed on its name, size and inode and only read on a miss.
+    """
+
+    def __init__(self, max_bytes: int = PREVIEW_CACHE_MAX_BYTES, max_seen: int = 64):
+        self.max_bytes = max_bytes
+        self.max_seen = max_seen
+        self._uris = collections.OrderedDict()
+        self._bytes = 0
+        # id(data) -> (data, digest); holding data keeps the id from being reused
+        self._seen = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def digest(self, data) -> str:
+        if isinstance(data, (str, os.PathLike)):
+            st = os.stat(data)
+            return hashlib.sha1(f"{os.fspath(data)}:{st.st_size}:{st.st_ino}".encode()).hexdigest()
+        with self._lock:
+            entry = self._seen.get(id(data))
+            if entry is not None and entry[0] is data:
+                self._seen.move_to_end(id(data))
+                return entry[1]
+        digest = hashlib.sha1(data).hexdigest()
+        with self._lock:
+            self._seen[id(data)] = (data, digest)
+            while len(self._seen) > self.max_seen:
+                self._seen.popitem(last=False)
+        return digest
+
+    def get(self, data) -> str:
+        key = self.digest(data)
+        with self._lock:
+            uri = self._uris.get(key)
+            if uri is not None:
+                self.hits += 1
+                self._uris.move_to_end(key)
+                return uri
+            self.misses += 1
+
+        if isinstance(data, (str, os.PathLike)):
+            with open(data, "rb") as f:
+                data = f.read()
+        thumb, mime = preview_thumbnail(data)
+        uri = f"data:{mime};base64,{base64.b64encode(thumb).decode()}"
+        with self._lock:
+            if key not in self._uris:
+                self._uris[key] = uri
+                self._bytes += len(uri)
+                while self._bytes > self.max_bytes and len(self._uris) > 1:
+                    _, old = self._uris.popitem(last=False)
+                    self._bytes -= len(old)
+        return uri
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._uris), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+
+_data_uris = _DataUriCache()
+
+
+def image_data_uri(data) -> str:
+    """Thumbnail of an image (bytes or a path) as a data: URI, cached per distinct image."""
+    return _data_uris.get(data)
+
+
+# ─── Fragments ────────────────────────────────────────────────────────────────
+
+@functools.lru_cache(maxsize=256)
+def _header_html(school: str, title: str, cls: str, subject: str, time: str, total_marks: str,
+                 instructions: tuple) -> str:
+    h = '<div class="pp-paper">'
+    if school: h += f'<h2>{school.upper()}</h2>'
+    if title: h += f'<h3>{title}</h3>'
+    ml, mr = [], []
+    if cls: ml.append(f'Class: <b>{cls}</b>')
+    if subject: ml.append(f'Subject: <b>{subject}</b>')
+    if time: mr.append(f'Time: <b>{time}</b>')
+    if total_marks: mr.append(f'Max Marks: <b>{total_marks}</b>')
+    if ml or mr:
+        h += f'<div class="pp-paper-meta"><span>{" &nbsp;·&nbsp; ".join(ml)}</span><span>{" &nbsp;·&nbsp; ".join(mr)}</span></div>'
+    if instructions:
+        h += '<div style="margin:6px 0;font-size:0.76rem;color:#48484a"><b>General Instructions:</b><br>'
+        for i, ins in enumerate(instructions, 1): h += f'<span style="color:#636366">{i}.</span> {ins}<br>'
+        h += '</div><hr style="border:none;border-top:1px solid #e5e5ea;margin:8px 0">'
+    return h
+
+
+@functools.lru_cache(maxsize=FRAGMENT_CACHE_SIZE)
+def _question_html(number: str, text: str, marks: str, subparts: tuple, image_uri: str) -> str:
+    m = f'<span class="pp-paper-m">[{marks}]</span>' if marks else ''
+    h = f'<div class="pp-paper-q"><span><b>Q{number}.</b> {text}</span>{m}</div>'
+    for sp in subparts: h += f'<div class="pp-paper-sp">{sp}</div>'
+    if image_uri:
+        h += f'<div style="margin:6px 0 6px 20px;"><img src="{image_uri}" style="{_IMG_STYLE}"/></div>'
+    return h
+
+
+def _section_html(name: str) -> str:
+    return f'<div class="pp-paper-sec">{name}</div>'
+
+
+# ─── Paper ────────────────────────────────────────────────────────────────────
+
+def render_preview(data, school_name: str = "", images: dict = None) -> str:
+    """
+    HTML preview of the paper (a dict or a Paper). images maps question ids (or
+    "<section>_<question>") to image bytes or paths. Fragments are keyed on
+    content, not position, so unchanged questions and images come from cache
+    even after others are added, deleted or moved.
+    """
+    images = images or {}
+    paper = as_paper(data)
+    parts = [_header_html(
+        school_name, paper.exam_title, paper.class_name, paper.subject,
+        paper.time, paper.total_marks, paper.instructions,
+    )]
+    for si, sec in enumerate(paper.sections):
+        parts.append(_section_html(sec.name))
+        for qi, q in enumerate(sec.questions):
+            img = find_question_image(images, si, qi, q)
+            parts.append(_question_html(
+                q.number, q.text, q.marks, q.subpart_texts, image_data_uri(img) if img else "",
+            ))
+    parts.append(_HR)
+    parts.append(_END)
+    return "".join(parts)
+
+
+def preview_cache_stats() -> dict:
+    """Hit/miss counters for question fragments and image data URIs."""
+    info = _question_html.cache_info()
+    return {
+        "questions": {"entries": info.currsize, "hits": info.hits, "misses": info.misses},
+        "images": _data_uris.stats(),
+    }
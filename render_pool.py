@@ -0,0 +1,166 @@
+"""
+Parallel rendering of many papers.
+
+create_question_paper is CPU-bound and single-threaded, so rendering the
+same paper in compact and normal mode, in several sets or for several
+classes runs serially. render_papers fans a list of RenderJobs out over a
+process pool instead. The docx templates are built once in the parent and
+handed to every worker when it starts. Logos and question images given as
+bytes travel the same way: each distinct image is sent to a worker once,
+and jobs refer to it by hash, so a logo shared by every job is not
+pickled once per job.
+
+Usage:
+    from render_pool import RenderJob, render_papers
+    results = render_papers([
+        RenderJob(data, "out/compact.docx", school_name="DPS", logo_path="logo.png"),
+        RenderJob(data, "out/normal.docx", school_name="DPS", logo_path="logo.png", compact=False),
+    ])
+"""
+
+import dataclasses
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import formatter
+
+
+@dataclass
+class RenderJob:
+    """One create_question_paper call. Without output_path the .docx comes back as bytes."""
+    structured_data: dict
+    output_path: str = None
+    school_name: str = ""
+    logo_path: str = None
+    compact: bool = True
+    question_images: dict = None
+    style: formatter.PaperStyle = None
+    backend: str = "python-docx"
+    name: str = ""
+
+
+@dataclass
+class RenderResult:
+    name: str
+    output_path: str = None
+    data: bytes = None
+    seconds: float = 0.0
+    worker: int = 0
+    error: str = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass(frozen=True)
+class _SharedImage:
+    """Stands in for image bytes in a job sent to a worker; the bytes arrive once, at worker start."""
+    digest: str
+
+
+# ─── Worker side ──────────────────────────────────────────────────────────────
+
+_images = {}  # digest -> image bytes, filled by _init_worker
+
+
+def _init_worker(templates: dict, images: dict) -> None:
+    """Seed this process's template cache and image table with the parent's copies."""
+    formatter._templates.update(templates)
+    _images.update(images)
+
+
+def _image(source):
+    return _images[source.digest] if isinstance(source, _SharedImage) else source
+
+
+def _render(job: RenderJob, name: str) -> RenderResult:
+    started = time.perf_counter()
+    result = RenderResult(name=name, output_path=job.output_path, worker=os.getpid())
+    try:
+        question_images = job.question_images
+        if question_images:
+            question_images = {key: _image(source) for key, source in question_images.items()}
+        out = formatter.create_question_paper(
+            job.structured_data, job.output_path, school_name=job.school_name, logo_path=_image(job.logo_path),
+            compact=job.compact, question_images=question_images, style=job.style,
+            backend=job.backend,
+        )
+        if job.output_path is None:
+            result.data = out.getvalue()
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+# ─── Parent side ──────────────────────────────────────────────────────────────
+
+def _share_images(jobs: list) -> tuple:
+    """
+    Swap the image bytes in jobs for _SharedImage references. Returns the
+    new jobs and {digest: bytes} holding each distinct image once. Paths
+    and file objects are left alone.
+    """
+    images, digests = {}, {}  # digests by id() so a bytes object shared by many jobs is hashed once
+
+    def share(source):
+        if not isinstance(source, (bytes, bytearray, memoryview)):
+            return source
+        if id(source) not in digests:
+            data = bytes(source)
+            digest = hashlib.sha256(data).hexdigest()
+            images[digest] = data
+            digests[id(source)] = digest
+        return _SharedImage(digests[id(source)])
+
+    shared = []
+    for job in jobs:
+        question_images = job.question_images
+        if question_images:
+            question_images = {key: share(source) for key, source in question_images.items()}
+        shared.append(dataclasses.replace(job, logo_path=share(job.logo_path), question_images=question_images))
+    return shared, images
+
+
+def render_papers(jobs: list, workers: int = None) -> list:
+    """
+    Render every job, in parallel across up to `workers` processes
+    (default: one per CPU). Results come back in job order; a failed job
+    has .error set instead of raising, so one bad paper does not sink the
+    rest.
+    """
+    jobs = list(jobs)
+    names = [job.name or f"job{i + 1}" for i, job in enumerate(jobs)]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+
+    # Build each distinct template once here; workers get copies at startup
+    templates = {}
+    for job in jobs:
+        style = job.style or formatter.paper_style(job.compact)
+        templates[style] = formatter.template_bytes(style)
+
+    if workers <= 1:
+        return [_render(job, name) for job, name in zip(jobs, names)]
+
+    jobs, images = _share_images(jobs)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(templates, images)) as pool:
+        return list(pool.map(_render, jobs, names))
+
+
+def summarize(results: list, wall_seconds: float) -> dict:
+    """Per-run totals: jobs, failures, wall time and the parallel speedup over summed job time."""
+    busy = sum(r.seconds for r in results)
+    return {
+        "jobs": len(results),
+        "failed": sum(1 for r in results if not r.ok),
+        "wall_seconds": wall_seconds,
+        "job_seconds_total": busy,
+        "job_seconds_max": max((r.seconds for r in results), default=0.0),
+        "workers": len({r.worker for r in results}),
+        "speedup": busy / wall_seconds if wall_seconds else 0.0,
+    }
@@ -0,0 +1,233 @@
+"""
+Deterministic rule-based structurer for raw OCR text.
+Produces the same exam_title/sections/questions/subparts schema as the LLM
+structuring prompt for well-formed papers, with a confidence score so the
+caller can fall back to the LLM when the layout is unusual.
+"""
+
+import re
+
+
+# Below this the LLM structuring call is used instead
+DEFAULT_MIN_CONFIDENCE = 0.85
+
+# Part of the structured-JSON cache key: bump on any change to the rules
+# below so results cached by the old rules are not served again
+RULES_VERSION = "2"
+
+PAGE_MARKER = re.compile(r"^-{2,}\s*Page\s*\d+\s*-{2,}$", re.IGNORECASE)
+
+SECTION = re.compile(
+    r"^(?:SECTION|Section|PART|Part|खंड|खण्ड|भाग)\s*[-–—:]?\s*"
+    r"(?:[A-Z]|[IVX]{1,4}|\d{1,2}|[कखगघङ])\b.*$"
+)
+
+QUESTION = re.compile(
+    r"^(?:Q(?:ue(?:s(?:tion)?)?)?\s*\.?\s*|प्रश्न\s*)(\d{1,3})\s*[.):\-]?\s*(.*)$"
+    r"|^(\d{1,3})\s*[.)]\s*(.*)$",
+    re.IGNORECASE,
+)
+
+SUBPART = re.compile(r"^(\(\s*(?:[a-hA-H]|[ivxIVX]{1,4}|[क-ह])\s*\)|(?:[a-hA-H]|[ivx]{1,4})\))\s*(.*)$")
+
+# Several options on one line: "(a) 1776 (b) 1789 (c) 1799 (d) 1804"
+INLINE_OPTIONS = re.compile(r"\(([a-dA-D])\)\s*")
+
+MARKS = re.compile(
+    r"\s*[\[(]\s*(\d{1,3}(?:\.\d)?)\s*(?:marks?|अंक)?\s*[\])]\s*$"
+    r"|\s*[\[(]\s*\d+\s*[x×]\s*\d+\s*=\s*(\d{1,3})\s*[\])]\s*$"
+    r"|\s+(\d{1,3})\s*(?:marks?|अंक)\s*$",
+    re.IGNORECASE,
+)
+
+INSTRUCTIONS_HEADING = re.compile(
+    r"^(?:general\s+)?instructions?\s*[:\-]?\s*$|^सामान्य\s+निर्देश|^निर्देश\s*[:\-]?\s*$",
+    re.IGNORECASE,
+)
+
+BULLET = re.compile(r"^(?:\(?\d{1,2}[.)]|\(?[ivx]{1,4}[.)]|[-•*])\s*(.*)$")
+
+METADATA = [
+    ("time", re.compile(r"(?:Time(?:\s+Allowed)?|Duration|समय)\s*[:\-]\s*([^|,]+?)(?=\s{2,}|\s*[|,]|\s+(?:Max|M\.M|Total|Full|पूर्णांक)|$)", re.IGNORECASE)),
+    ("total_marks", re.compile(r"(?:Max(?:imum)?\.?\s*Marks|M\.\s*M\.?|Total\s+Marks|Full\s+Marks|पूर्णांक)\s*[:\-]?\s*(\d{1,4})", re.IGNORECASE)),
+    ("class", re.compile(r"(?:Class|Grade|Std\.?|कक्षा)\s*[:\-]\s*([^|,]+?)(?=\s{2,}|\s*[|,]|\s+(?:Subject|विषय)|$)", re.IGNORECASE)),
+    ("subject", re.compile(r"(?:Subject|विषय)\s*[:\-]\s*([^|,]+?)(?=\s{2,}|\s*[|,]|\s+(?:Time|Class|Max|M\.M)|$)", re.IGNORECASE)),
+]
+
+
+def _split_marks(text: str) -> tuple:
+    """Split trailing marks like [5], (2 marks) or (1x5=5) off text."""
+    m = MARKS.search(text)
+    if not m:
+        return text.strip(), ""
+    marks = next(g for g in m.groups() if g)
+    return text[:m.start()].strip(), marks
+
+
+def _split_inline_options(text: str) -> list:
+    """Split "(a) x (b) y (c) z (d) w" into separate options, or return [] if not that shape."""
+    starts = [m.start() for m in INLINE_OPTIONS.finditer(text)]
+    if len(starts) < 2 or starts[0] != 0:
+        return []
+    starts.append(len(text))
+    return [text[starts[i]:starts[i + 1]].strip() for i in range(len(starts) - 1)]
+
+
+def _normalize_label(label: str) -> str:
+    """'a)' -> '(a)', '( i )' -> '(i)'."""
+    return "(" + label.strip("() ").strip() + ")"
+
+
+def _parse_metadata(line: str) -> dict:
+    found = {}
+    for field, pattern in METADATA:
+        m = pattern.search(line)
+        if m:
+            found[field] = m.group(1).strip()
+    return found
+
+
+def structure_text_locally(raw_text: str) -> tuple:
+    """
+    Parse raw OCR text into the structured paper schema.
+
+    Returns (structured_dict, confidence) where confidence is in [0, 1].
+    """
+    data = {
+        "exam_title": "", "class": "", "subject": "", "time": "", "total_marks": "",
+        "instructions": [], "sections": [],
+    }
+    section = None
+    question = None
+    in_instructions = False
+    last_instruction_no = 0
+    last_q_no = 0
+
+    total = recognised = 0
+    numbering_breaks = 0
+    orphans = 0
+
+    def current_section():
+        nonlocal section
+        if section is None:
+            section = {"section_name": "Questions", "questions": []}
+            data["sections"].append(section)
+        return section
+
+    for raw_line in raw_text.splitlines():
+        line = raw_line.strip()
+        if not line or PAGE_MARKER.match(line):
+            continue
+        total += 1
+
+        # ── Section heading ──
+        if SECTION.match(line) and len(line) < 80:
+            section = {"section_name": line.rstrip(":").strip(), "questions": []}
+            data["sections"].append(section)
+            question = None
+            in_instructions = False
+            last_q_no = 0  # numbering may restart at 1 in each section
+            recognised += 1
+            continue
+
+        # ── Instructions block ──
+        if INSTRUCTIONS_HEADING.match(line):
+            in_instructions = True
+            recognised += 1
+            continue
+        if in_instructions:
+            b = BULLET.match(line)
+            n = re.match(r"^\(?(\d{1,2})[.)]", line)
+            restarted = n and int(n.group(1)) <= last_instruction_no
+            has_marks = bool(MARKS.search(line))
+            if b and not restarted and not has_marks and not re.match(r"^Q", line, re.IGNORECASE):
+                data["instructions"].append(b.group(1).strip())
+                last_instruction_no = int(n.group(1)) if n else last_instruction_no + 1
+                recognised += 1
+                continue
+            if not b and data["instructions"] and not QUESTION.match(line):
+                data["instructions"][-1] += " " + line  # wrapped instruction
+                recognised += 1
+                continue
+            in_instructions = False
+
+        # ── Metadata (only before the first question) ──
+        if not any(s["questions"] for s in data["sections"]):
+            meta = _parse_metadata(line)
+            if meta:
+                for k, v in meta.items():
+                    data[k] = data[k] or v
+                recognised += 1
+                continue
+
+        # ── Question ──
+        qm = QUESTION.match(line)
+        if qm:
+            number = qm.group(1) or qm.group(3)
+            text = qm.group(2) if qm.group(1) else qm.group(4)
+            if int(number) != last_q_no + 1 and last_q_no:
+                numbering_breaks += 1
+            last_q_no = int(number)
+            text, marks = _split_marks(text)
+            subparts = _split_inline_options(text)
+            if subparts:
+                text, subparts = "", subparts
+            question = {"number": number, "text": text, "marks": marks, "subparts": subparts}
+            current_section()["questions"].append(question)
+            recognised += 1
+            continue
+
+        # ── Subpart / options ──
+        if question is not None:
+            if line.startswith("[DIAGRAM"):
+                question["text"] = (question["text"] + " " + line).strip()
+                recognised += 1
+                continue
+            inline = _split_inline_options(line)
+            if inline:
+                question["subparts"].extend(inline)
+                recognised += 1
+                continue
+            sm = SUBPART.match(line)
+            if sm:
+                question["subparts"].append(f"{_normalize_label(sm.group(1))} {sm.group(2).strip()}".strip())
+                recognised += 1
+                continue
+            # Trailing marks on their own line belong to the question
+            if not question["marks"] and re.fullmatch(r"[\[(]\s*\d{1,3}\s*(?:marks?)?\s*[\])]", line, re.IGNORECASE):
+                question["marks"] = re.search(r"\d+", line).group(0)
+                recognised += 1
+                continue
+            # Continuation line: extend the last subpart or the question text
+            if question["subparts"]:
+                question["subparts"][-1] += " " + line
+            else:
+                question["text"] = (question["text"] + " " + line).strip()
+            if not question["marks"]:
+                question["text"], question["marks"] = _split_marks(question["text"])
+            recognised += 1
+            continue
+
+        # ── Title: first unrecognised line before any question ──
+        if not data["exam_title"] and not data["sections"]:
+            data["exam_title"] = line
+            recognised += 1
+            continue
+
+        orphans += 1
+
+    return data, _confidence(data, total, recognised, numbering_breaks, orphans)
+
+
+def _confidence(data: dict, total: int, recognised: int, numbering_breaks: int, orphans: int) -> float:
+    questions = [q for s in data["sections"] for q in s["questions"]]
+    if not questions or not total:
+        return 0.0
+    score = recognised / total
+    score -= 0.1 * numbering_breaks
+    score -= 0.05 * orphans
+    # Questions without marks or text usually mean the layout was misread
+    unmarked = sum(1 for q in questions if not q["marks"]) / len(questions)
+    empty = sum(1 for q in questions if not q["text"] and not q["subparts"]) / len(questions)
+    score -= 0.3 * unmarked + 0.5 * empty
+    return max(0.0, min(1.0, score))
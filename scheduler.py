@@ -0,0 +1,319 @@
+"""
+Rate-limit-aware scheduler for OpenAI chat completion calls.
+
+Every call goes through the scheduler for its API key, which
+- keeps requests-per-minute and tokens-per-minute token buckets so calls
+  wait for budget instead of hitting 429s,
+- hands out budget round-robin across sessions, so one teacher's 5-page
+  paper cannot starve everyone else on the same org key,
+- retries 429s, 5xx errors, timeouts and connection errors with jittered
+  exponential backoff, honouring Retry-After when the server sends it,
+- exposes queue depth, wait time and retry counters via metrics().
+
+Budgets default to PRASHNAPRO_RPM / PRASHNAPRO_TPM (or 500 / 30000).
+"""
+
+import collections
+import contextlib
+import contextvars
+import itertools
+import os
+import random
+import threading
+import time
+
+import openai
+
+from metrics import count, span
+
+
+DEFAULT_RPM = int(os.environ.get("PRASHNAPRO_RPM", 500))
+DEFAULT_TPM = int(os.environ.get("PRASHNAPRO_TPM", 30000))
+DEFAULT_MAX_RETRIES = int(os.environ.get("PRASHNAPRO_MAX_RETRIES", 5))
+BASE_DELAY = 1.0
+MAX_DELAY = 60.0
+
+# Roughly what one "high" detail page costs after imaging.prepare_for_ocr
+IMAGE_TOKENS = 800
+
+_session = contextvars.ContextVar("prashnapro_session", default="default")
+
+RETRYABLE = (
+    openai.RateLimitError,
+    openai.InternalServerError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+)
+
+
+@contextlib.contextmanager
+def session(session_id: str):
+    """Attribute calls made inside this block to session_id for fair queueing."""
+    token = _session.set(session_id or "default")
+    try:
+        yield
+    finally:
+        _session.reset(token)
+
+
+def current_session() -> str:
+    return _session.get()
+
+
+def estimate_tokens(messages: list, max_tokens: int = 0) -> int:
+    """Rough token cost of a request as OpenAI's limiter counts it (input + max output)."""
+    tokens = max_tokens
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            tokens += len(content) // 4
+            continue
+        for part in content or []:
+            if part.get("type") == "image_url":
+                tokens += IMAGE_TOKENS
+            else:
+                tokens += len(part.get("text", "")) // 4
+    return tokens
+
+
+def retry_after_seconds(error) -> float:
+    """Server-requested delay from Retry-After / retry-after-ms headers, or None."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+class _Bucket:
+    """Token bucket refilled continuously at capacity per minute."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, amount: float) -> float:
+        """Seconds until amount is available (requests bigger than capacity need a full bucket)."""
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.level) / self.rate)
+
+
+class RateLimitScheduler:
+    """Fair, budget-aware gate in front of one API key's requests."""
+
+    def __init__(self, rpm: int = DEFAULT_RPM, tpm: int = DEFAULT_TPM, max_retries: int = DEFAULT_MAX_RETRIES):
+        self.requests = _Bucket(rpm)
+        self.tokens = _Bucket(tpm)
+        self.max_retries = max_retries
+        self._cond = threading.Condition()
+        self._queues = collections.OrderedDict()  # session -> deque of tickets
+        self._granted = set()
+        self._ticket_ids = itertools.count()
+        self._metrics = {
+            "requests": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "failures": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "tokens_estimated": 0,
+            "tokens_used": 0,
+        }
+
+    # ─── Budget and fairness ───────────────────────────────────────────────
+
+    def _dispatch(self) -> float:
+        """Grant queued tickets round-robin while budget lasts. Returns seconds until more budget."""
+        now = time.monotonic()
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        while self._queues:
+            sess, queue = next(iter(self._queues.items()))
+            ticket_id, tokens = queue[0]
+            wait = max(self.requests.wait_for(1), self.tokens.wait_for(tokens))
+            if wait > 0:
+                return wait
+            self.requests.level -= 1
+            self.tokens.level -= min(tokens, self.tokens.capacity)
+            self._granted.add(ticket_id)
+            queue.popleft()
+            # Rotate: this session goes to the back of the line
+            del self._queues[sess]
+            if queue:
+                self._queues[sess] = queue
+        return 0.0
+
+    def acquire(self, tokens: int, session_id: str = None) -> float:
+        """Block until this session's turn and budget come up. Returns seconds waited."""
+        session_id = session_id or current_session()
+        started = time.monotonic()
+        with self._cond:
+            ticket_id = next(self._ticket_ids)
+            self._queues.setdefault(session_id, collections.deque()).append((ticket_id, tokens))
+            while ticket_id not in self._granted:
+                wait = self._dispatch()
+                if ticket_id in self._granted:
+                    break
+                self._cond.wait(timeout=wait if wait > 0 else None)
+            self._granted.discard(ticket_id)
+            self._cond.notify_all()
+            waited = time.monotonic() - started
+            self._metrics["wait_seconds_total"] += waited
+            self._metrics["wait_seconds_max"] = max(self._metrics["wait_seconds_max"], waited)
+            self._metrics["tokens_estimated"] += tokens
+        return waited
+
+    def settle(self, estimated: int, used: int) -> None:
+        """Give back budget that was reserved but not used once actual usage is known."""
+        with self._cond:
+            self._metrics["tokens_used"] += used
+            if used < estimated:
+                self.tokens.level = min(self.tokens.capacity, self.tokens.level + (estimated - used))
+                self._cond.notify_all()
+
+    def penalize(self, seconds: float) -> None:
+        """After a 429, drain the request bucket so other callers back off too."""
+        with self._cond:
+            self.requests.refill(time.monotonic())
+            self.requests.level = min(self.requests.level, -seconds * self.requests.rate)
+
+    # ─── Calls ─────────────────────────────────────────────────────────────
+
+    def call(self, fn, tokens: int, session_id: str = None):
+        """Run fn() once budget allows, retrying transient failures with backoff."""
+        attempt = 0
+        while True:
+            waited = self.acquire(tokens, session_id)
+            with self._cond:
+                self._metrics["requests"] += 1
+            count("api_requests_total")
+            try:
+                with span("api.request", attempt=attempt, waited=round(waited, 3)):
+                    result = fn()
+            except RETRYABLE as e:
+                if attempt >= self.max_retries:
+                    with self._cond:
+                        self._metrics["failures"] += 1
+                    raise
+                delay = retry_after_seconds(e)
+                if delay is None:
+                    # Full jitter: uniform in [0, base * 2^attempt], capped
+                    delay = random.uniform(0, min(MAX_DELAY, BASE_DELAY * 2 ** attempt))
+                if isinstance(e, openai.RateLimitError):
+                    with self._cond:
+                        self._metrics["rate_limited"] += 1
+                    self.penalize(delay)
+                with self._cond:
+                    self._metrics["retries"] += 1
+                count("api_retries_total", reason=type(e).__name__)
+                attempt += 1
+                time.sleep(delay)
+                continue
+            except Exception:
+                with self._cond:
+                    self._metrics["failures"] += 1
+                raise
+            usage = getattr(result, "usage", None)
+            if usage is not None and getattr(usage, "total_tokens", None) is not None:
+                self.settle(tokens, usage.total_tokens)
+                count_usage(usage)
+            return result
+
+    def settle_stream(self, stream, estimated: int, prompt_tokens: int):
+        """
+        Pass a streamed response's chunks through, then settle its reservation:
+        with the usage the server sends on the last chunk, or else with the
+        prompt estimate plus the text actually received.
+        """
+        usage, chars = None, 0
+        try:
+            for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                for choice in getattr(chunk, "choices", None) or ():
+                    chars += len(getattr(choice.delta, "content", None) or "")
+                yield chunk
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+            if usage is not None and getattr(usage, "total_tokens", None) is not None:
+                self.settle(estimated, usage.total_tokens)
+                count_usage(usage)
+            else:
+                self.settle(estimated, prompt_tokens + chars // 4)
+
+    def metrics(self) -> dict:
+        """Counters plus current queue depth, per session and in total."""
+        with self._cond:
+            m = dict(self._metrics)
+            m["queue_depth"] = sum(len(q) for q in self._queues.values())
+            m["queue_depth_by_session"] = {s: len(q) for s, q in self._queues.items()}
+            m["requests_available"] = self.requests.level
+            m["tokens_available"] = self.tokens.level
+        m["wait_seconds_mean"] = m["wait_seconds_total"] / m["requests"] if m["requests"] else 0.0
+        return m
+
+
+_schedulers = {}
+_lock = threading.Lock()
+
+
+def get_scheduler(api_key: str) -> RateLimitScheduler:
+    """The shared scheduler for an API key (rate limits apply per key/org)."""
+    with _lock:
+        scheduler = _schedulers.get(api_key)
+        if scheduler is None:
+            scheduler = _schedulers[api_key] = RateLimitScheduler()
+        return scheduler
+
+
+def configure_scheduler(api_key: str, rpm: int = DEFAULT_RPM, tpm: int = DEFAULT_TPM,
+                        max_retries: int = DEFAULT_MAX_RETRIES) -> RateLimitScheduler:
+    """Replace the scheduler for an API key with one using these limits (e.g. a higher usage tier)."""
+    with _lock:
+        scheduler = _schedulers[api_key] = RateLimitScheduler(rpm, tpm, max_retries)
+        return scheduler
+
+
+def count_usage(usage) -> None:
+    """Add a response's (or final stream chunk's) token usage to the metrics."""
+    for kind in ("prompt", "completion"):
+        n = getattr(usage, f"{kind}_tokens", None)
+        if n:
+            count("tokens_total", n, kind=kind)
+
+
+def create_chat_completion(client, **kwargs):
+    """
+    client.chat.completions.create(**kwargs), scheduled under the client's
+    API key budget. A stream=True call returns an iterator over the chunks
+    that settles the token reservation once the stream is consumed or closed.
+    """
+    max_tokens = kwargs.get("max_tokens") or 0
+    tokens = estimate_tokens(kwargs.get("messages", []), max_tokens)
+    scheduler = get_scheduler(client.api_key)
+    if not kwargs.get("stream"):
+        return scheduler.call(lambda: client.chat.completions.create(**kwargs), tokens)
+    # Streams carry no .usage; ask for it on the final chunk instead
+    kwargs.setdefault("stream_options", {"include_usage": True})
+    stream = scheduler.call(lambda: client.chat.completions.create(**kwargs), tokens)
+    return scheduler.settle_stream(stream, tokens, tokens - max_tokens)
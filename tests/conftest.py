@@ -0,0 +1,19 @@
+"""
+Shared test setup: the repo root on sys.path, and every on-disk store
+(OCR cache, uploads, outputs, jobs, traces) in a throwaway directory.
+The stores read their PRASHNAPRO_* variables at import, so these are set
+before any test module imports them.
+"""
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_tmp = tempfile.mkdtemp(prefix="prashnapro-tests-")
+for name, sub in [("PRASHNAPRO_CACHE_DIR", "cache"), ("PRASHNAPRO_UPLOAD_DIR", "uploads"),
+                  ("PRASHNAPRO_OUTPUT_DIR", "output"), ("PRASHNAPRO_TRACE_DIR", "traces")]:
+    os.environ.setdefault(name, os.path.join(_tmp, sub))
+os.environ.setdefault("PRASHNAPRO_JOBS_DB", os.path.join(_tmp, "jobs.db"))
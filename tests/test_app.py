@@ -0,0 +1,43 @@
+import os
+
+from streamlit.testing.v1 import AppTest
+
+import upload_store
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def _app() -> AppTest:
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.run()
+    assert not at.exception
+    return at
+
+
+def _button(at: AppTest, label: str):
+    return next(b for b in at.button if b.label == label)
+
+
+def test_start_over_resets_to_upload_step():
+    at = _app()
+    _button(at, "Load demo").click().run()
+    assert not at.exception
+    assert at.session_state.step == 3
+
+    _button(at, "Start over").click().run()
+    assert not at.exception
+    assert at.session_state.step == 0
+    assert at.session_state.structured_data is None
+
+
+def test_start_over_releases_session_files():
+    at = _app()
+    handle = upload_store.uploads().put(b"page photo", ".jpg", session_id=at.session_state.session_id)
+    at.session_state.page_files = [handle]
+    at.session_state.step = 1
+    at.run()
+
+    _button(at, "Start over").click().run()
+    assert not at.exception
+    assert at.session_state.page_files == []
+    assert upload_store.uploads().path(handle) is None
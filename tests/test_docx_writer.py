@@ -0,0 +1,77 @@
+import io
+import zipfile
+from xml.etree import ElementTree
+
+import pytest
+from PIL import Image
+
+from formatter import create_question_paper
+from model import as_paper
+
+PAPER = {
+    "exam_title": "Unit Test", "class": "IX", "subject": "Maths", "time": "1 Hour", "total_marks": "10",
+    "instructions": ["All questions are compulsory.", "Draw neat diagrams."],
+    "sections": [
+        {"section_name": "Section A", "id": "s1", "questions": [
+            {"id": "q1", "number": "1", "text": "Pick one", "marks": "1",
+             "subparts": ["(a) 1", "(b) 2", "(c) 3", "(d) 4"]},
+            {"id": "q2", "number": "2", "text": "Match the following", "marks": "2",
+             "subparts": ["(i) Tundra\tCold", "(ii) Desert\tDry"]},
+        ]},
+        {"section_name": "Section B", "id": "s2", "questions": [
+            {"id": "q3", "number": "3", "text": "भारत की राजधानी क्या है?", "marks": "2",
+             "subparts": ["(a) Explain", "(b) Describe"]},
+        ]},
+    ],
+}
+
+
+def _png(colour: str) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (300, 200), colour).save(buf, "PNG")
+    return buf.getvalue()
+
+
+def _entries(xml: bytes) -> set:
+    """Child elements of a package part as a set: their order carries no meaning."""
+    return {tuple(sorted(child.attrib.items())) for child in ElementTree.fromstring(xml)}
+
+
+def _parts(docx: bytes) -> dict:
+    with zipfile.ZipFile(io.BytesIO(docx)) as zf:
+        return {name: zf.read(name) for name in zf.namelist()}
+
+
+@pytest.mark.parametrize("compact", [True, False])
+@pytest.mark.parametrize("with_images", [False, True])
+def test_stream_backend_writes_the_same_document_as_python_docx(compact, with_images):
+    kwargs = dict(compact=compact, school_name="Delhi Public School")
+    if with_images:
+        kwargs.update(logo_path=_png("red"), question_images={"q2": _png("blue")})
+    expected = _parts(create_question_paper(PAPER, **kwargs).getvalue())
+    actual = _parts(create_question_paper(PAPER, backend="stream", **kwargs).getvalue())
+    assert sorted(actual) == sorted(expected)
+    assert actual["word/document.xml"] == expected["word/document.xml"]
+    rels = "word/_rels/document.xml.rels"
+    assert _entries(actual[rels]) == _entries(expected[rels])
+    # The stream writer declares every image type up front; python-docx only those it used
+    assert _entries(actual["[Content_Types].xml"]) >= _entries(expected["[Content_Types].xml"])
+    for name in expected:
+        if name.startswith("word/media/"):
+            assert actual[name] == expected[name], name
+
+
+def test_paper_and_dict_render_identically():
+    assert (_parts(create_question_paper(PAPER, backend="stream").getvalue())["word/document.xml"]
+            == _parts(create_question_paper(as_paper(PAPER), backend="stream").getvalue())["word/document.xml"])
+
+
+def test_in_memory_render_matches_the_file_render(tmp_path):
+    path = tmp_path / "paper.docx"
+    assert create_question_paper(PAPER, str(path), logo_path=_png("red")) == str(path)
+    assert _parts(path.read_bytes()) == _parts(create_question_paper(PAPER, logo_path=_png("red")).getvalue())
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="Unknown backend"):
+        create_question_paper(PAPER, io.BytesIO(), backend="latex")
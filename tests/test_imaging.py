@@ -0,0 +1,67 @@
+import io
+
+from PIL import Image, ImageDraw, ImageFilter
+
+from imaging import prepare_for_ocr, prepare_for_print, target_size
+
+
+def _encode(img: Image.Image, fmt: str, **kwargs) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, fmt, **kwargs)
+    return buf.getvalue()
+
+
+def test_target_size_matches_high_detail_resampling():
+    assert target_size(3000, 4000) == (768, 1024)
+    assert target_size(5000, 1000) == (2048, 410)
+    assert target_size(500, 400) == (500, 400)  # never upscaled
+
+
+def test_page_photo_is_downscaled_to_greyscale_jpeg(tmp_path):
+    path = tmp_path / "page.jpg"
+    Image.effect_noise((1500, 2000), 40).convert("RGB").save(path, "JPEG", quality=95)
+    data, mime, stats = prepare_for_ocr(str(path))
+    assert mime == "image/jpeg"
+    with Image.open(io.BytesIO(data)) as img:
+        assert (img.mode, img.size) == ("L", (768, 1024))
+    assert stats["original_size"] == (1500, 2000)
+    assert stats["saved_bytes"] == stats["original_bytes"] - stats["encoded_bytes"] > 0
+
+
+def test_undecodable_page_is_sent_unchanged(tmp_path):
+    path = tmp_path / "page.jpg"
+    path.write_bytes(b"not an image")
+    data, mime, stats = prepare_for_ocr(str(path))
+    assert (data, mime, stats["saved_bytes"]) == (b"not an image", None, 0)
+
+
+def test_greyscale_photo_is_kept_as_jpeg():
+    noise = Image.effect_noise((1600, 1200), 40).convert("RGB")
+    gradient = Image.linear_gradient("L").resize((1600, 1200)).convert("RGB")
+    photo = Image.blend(noise, gradient, 0.5).filter(ImageFilter.GaussianBlur(1.5))
+    prepared = prepare_for_print(_encode(photo, "JPEG", quality=92), 12)
+    assert prepared.ext == "jpeg"
+
+
+def test_line_art_becomes_png():
+    art = Image.new("RGB", (1200, 800), "white")
+    draw = ImageDraw.Draw(art)
+    for x in range(0, 1200, 60):
+        draw.line((x, 0, 1200 - x, 800), fill="black", width=3)
+    prepared = prepare_for_print(_encode(art, "PNG"), 20)
+    assert prepared.ext == "png"
+
+
+def test_white_margins_are_cropped_and_resampled_to_print_size():
+    img = Image.new("RGB", (2000, 2000), "white")
+    ImageDraw.Draw(img).rectangle((500, 500, 1499, 999), fill="blue")
+    prepared = prepare_for_print(_encode(img, "PNG"), 5, dpi=200)
+    assert prepared.width_cm == 5
+    assert prepared.size[0] == round(5 / 2.54 * 200)
+    # Cropped to the 2:1 rectangle plus a small border, not the square page
+    assert 1.8 < prepared.size[0] / prepared.size[1] <= 2
+
+
+def test_undecodable_question_image_is_kept_as_is():
+    prepared = prepare_for_print(b"not an image", 8)
+    assert (prepared.data, prepared.ext, prepared.width_cm) == (b"not an image", None, 8)
@@ -0,0 +1,110 @@
+import os
+import time
+
+import pytest
+
+import jobs
+from jobs import CANCELLED, DONE, FAILED, RUNNING, JobQueue
+
+
+def _wait(queue: JobQueue, job_id: str, until=lambda job: job.done, timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if until(job):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job still {queue.get(job_id).status}")
+
+
+@pytest.fixture
+def queue(tmp_path):
+    q = JobQueue(str(tmp_path / "jobs.db"), workers=2)
+    yield q
+    q._pool.shutdown(wait=True, cancel_futures=True)
+
+
+def test_job_runs_to_done_with_result(queue, monkeypatch):
+    def fake_stream(image_paths, api_key, **kwargs):
+        assert api_key == "sk-test"
+        for page, path in enumerate(image_paths, 1):
+            yield "page_done", (page, f"text of {path}")
+        yield "ocr_done", "raw"
+        yield "section", {"section_name": "A", "questions": [{}]}
+        yield "result", ({"sections": []}, "raw")
+
+    monkeypatch.setattr(jobs, "stream_images_to_structured", fake_stream)
+    job_id = queue.submit(["p1.jpg", "p2.jpg"], "sk-test", session_id="s1")
+    job = _wait(queue, job_id)
+    assert job.status == DONE
+    assert job.result == {"structured": {"sections": []}, "raw_text": "raw", "image_stats": []}
+    assert job.progress["pages_done"] == 2
+    assert queue.counts() == {DONE: 1}
+
+
+def test_failing_job_records_the_error(queue, monkeypatch):
+    def fake_stream(image_paths, api_key, **kwargs):
+        raise ValueError("bad paper")
+        yield
+
+    monkeypatch.setattr(jobs, "stream_images_to_structured", fake_stream)
+    job = _wait(queue, queue.submit(["p1.jpg"], "sk-test"))
+    assert (job.status, job.error, job.error_type) == (FAILED, "bad paper", "ValueError")
+
+
+def test_running_job_can_be_cancelled(queue, monkeypatch):
+    def fake_stream(image_paths, api_key, **kwargs):
+        for page in range(1, 1000):
+            time.sleep(0.01)
+            yield "page_done", (page, "x")
+        yield "result", ({}, "")
+
+    monkeypatch.setattr(jobs, "stream_images_to_structured", fake_stream)
+    job_id = queue.submit(["p1.jpg"], "sk-test")
+    _wait(queue, job_id, until=lambda job: job.status == RUNNING)
+    queue.cancel(job_id)
+    time.sleep(0.2)
+    job = queue.get(job_id)
+    assert job.status == CANCELLED and job.result is None
+
+
+def _owner(pid: int) -> str:
+    return f"{jobs.socket.gethostname()}:{pid}:{jobs._boot_id()}"
+
+
+def test_opening_the_database_fails_only_orphaned_jobs(queue):
+    rows = [("mine", jobs.OWNER), ("other-live", _owner(os.getppid())), ("dead", _owner(999999999)),
+            ("rebooted", f"{jobs.socket.gethostname()}:{os.getppid()}:an-old-boot"),
+            ("other-host", "elsewhere:1:boot"), ("legacy", None)]
+    with queue._connect() as db:
+        for job_id, owner in rows:
+            db.execute("INSERT INTO jobs (id, status, params, created, owner) VALUES (?, ?, '{}', 0, ?)",
+                       (job_id, RUNNING, owner))
+
+    other = JobQueue(queue.path, workers=1)  # a second server process opening the same database
+    other._pool.shutdown()
+    status = {job_id: queue.get(job_id).status for job_id, _ in rows}
+    assert status == {"mine": RUNNING, "other-live": RUNNING, "dead": FAILED,
+                      "rebooted": FAILED if jobs._boot_id() else RUNNING,
+                      "other-host": RUNNING, "legacy": FAILED}
+
+
+def test_purge_removes_old_finished_jobs(queue):
+    with queue._connect() as db:
+        db.execute("INSERT INTO jobs (id, status, params, created, finished) VALUES ('old', ?, '{}', 0, 0)", (DONE,))
+    assert queue.purge() == 1
+    assert queue.get("old") is None
+
+
+def test_purge_command_keeps_recent_results(queue, monkeypatch, capsys):
+    now = time.time()
+    with queue._connect() as db:
+        for job_id, finished in [("old", 0), ("recent", now - 60)]:
+            db.execute("INSERT INTO jobs (id, status, params, created, finished) VALUES (?, ?, '{}', 0, ?)",
+                       (job_id, DONE, finished))
+    monkeypatch.setattr(jobs, "DEFAULT_JOBS_DB", queue.path)
+    assert jobs.main(["purge"]) == 0
+    assert (queue.get("old"), queue.get("recent").status) == (None, DONE)
+    assert jobs.main(["purge", "--older-than", "30"]) == 0
+    assert queue.get("recent") is None
+    assert jobs.main(["purge", "--older-than"]) == 2
@@ -0,0 +1,43 @@
+import pytest
+
+from json_repair import IncrementalJSONParser, loads_tolerant, repair_json, strip_fences
+
+
+def test_clean_json_is_not_marked_repaired():
+    assert loads_tolerant('{"a": 1}') == ({"a": 1}, False)
+
+
+def test_code_fences_are_stripped():
+    assert strip_fences('```json\n{"a": 1}\n```') == '{"a": 1}'
+    assert loads_tolerant('```json\n{"a": 1}\n```') == ({"a": 1}, False)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": [1, 2,], }', {"a": [1, 2]}),
+    ('{"a": "line\nbreak"}', {"a": "line\nbreak"}),
+    ('{"sections": [{"n": 1}, {"n": 2', {"sections": [{"n": 1}, {"n": 2}]}),
+    ('{"a": 1, "b": tru', {"a": 1}),
+    ('{"a": "unterminated', {"a": "unterminated"}),
+])
+def test_common_defects_are_repaired_locally(text, expected):
+    assert loads_tolerant(text) == (expected, True)
+
+
+def test_unrepairable_text_raises_value_error():
+    with pytest.raises(ValueError):
+        loads_tolerant("not json at all")
+
+
+def test_repair_ignores_text_after_the_root_value():
+    assert repair_json('{"a": 1} and some prose') == '{"a": 1}'
+
+
+def test_incremental_parser_yields_each_section_once_complete():
+    text = ('Here you go: {"exam_title": "x", "sections": [{"section_name": "A", '
+            '"questions": [{"text": "a ] tricky } string"}]}, {"section_name": "B", "questions": []}]}')
+    parser = IncrementalJSONParser("sections")
+    seen = []
+    for i in range(0, len(text), 5):
+        seen.extend(s["section_name"] for s in parser.feed(text[i:i + 5]))
+    assert seen == ["A", "B"]
+    assert loads_tolerant(parser.buffer)[0]["sections"][0]["questions"][0]["text"] == "a ] tricky } string"
@@ -0,0 +1,61 @@
+import re
+
+import pytest
+
+from model import Paper, PaperError, as_paper, normalize_paper
+
+
+def test_from_dict_normalises_llm_output():
+    paper = Paper.from_dict({
+        "exam_title": " Unit Test ", "class": 9, "total_marks": 20.0,
+        "instructions": "Answer all.\n\nNo calculators.",
+        "sections": [{"section_name": "A", "questions": [
+            {"number": 1, "text": "Pick", "marks": 1, "subparts": ["(a) x", "(b) y", "(c) z", "(d) w", "  "]},
+        ]}],
+    })
+    assert (paper.exam_title, paper.class_name, paper.total_marks) == ("Unit Test", "9", "20")
+    assert paper.instructions == ("Answer all.", "No calculators.")
+    q = paper.sections[0].questions[0]
+    assert (q.number, q.marks, q.marks_value) == ("1", "1", 1.0)
+    assert q.subpart_texts == ("(a) x", "(b) y", "(c) z", "(d) w")
+    assert q.is_mcq and not q.is_match
+
+
+def test_missing_fields_become_empty():
+    paper = Paper.from_dict({"sections": [{"questions": [{"text": "Only text"}]}]})
+    q = paper.sections[0].questions[0]
+    assert (paper.exam_title, q.number, q.marks, q.subparts, q.marks_value) == ("", "", "", (), None)
+
+
+def test_match_columns_win_over_mcq():
+    q = Paper.from_dict({"sections": [{"questions": [
+        {"subparts": ["(a) Tundra\tCold", "(b) Desert -> Dry", "(c) x   y", "(d) Monsoon — Rain"]},
+    ]}]}).sections[0].questions[0]
+    assert q.is_match and not q.is_mcq
+    assert q.match_rows == (("(a) Tundra", "Cold"), ("(b) Desert", "Dry"), ("(c) x", "y"), ("(d) Monsoon", "Rain"))
+
+
+@pytest.mark.parametrize("marks, value", [("2", 2.0), ("1+1", 2.0), ("1½", 1.5), ("3 marks", 3.0), ("", None)])
+def test_marks_value(marks, value):
+    q = Paper.from_dict({"sections": [{"questions": [{"marks": marks}]}]}).sections[0].questions[0]
+    assert q.marks_value == value
+
+
+@pytest.mark.parametrize("data, where", [
+    ([], "expected a paper object"),
+    ({"sections": {}}, "sections: expected a list"),
+    ({"sections": [{"questions": [{"text": ["a"]}]}]}, "sections[0].questions[0].text"),
+    ({"sections": [{"questions": [7]}]}, "sections[0].questions[0]"),
+])
+def test_malformed_data_raises_paper_error_with_path(data, where):
+    with pytest.raises(PaperError, match=re.escape(where)):
+        Paper.from_dict(data)
+
+
+def test_round_trip_keeps_ids_and_as_paper_passes_papers_through():
+    data = {"exam_title": "T", "class": "", "subject": "", "time": "", "total_marks": "", "instructions": [],
+            "sections": [{"section_name": "A", "id": "s1",
+                          "questions": [{"number": "1", "text": "x", "marks": "", "subparts": [], "id": "q1"}]}]}
+    assert normalize_paper(data) == data
+    paper = as_paper(data)
+    assert as_paper(paper) is paper
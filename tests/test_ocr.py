@@ -0,0 +1,164 @@
+"""OCR pipeline against a local fake of the OpenAI chat completions API."""
+
+import base64
+import io
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+import ocr
+from ocr_cache import OCRCache
+
+# Page photos are sent in greyscale, so the test pages differ in brightness
+SHADES = {"dark": 40, "grey": 128, "light": 200}
+LLM_PAPER = {"exam_title": "From the model", "sections": [
+    {"section_name": "Questions", "questions": [{"number": "1", "text": "From the model", "marks": "1"}]}]}
+
+
+def _shade(data_url: str) -> str:
+    """Which test page an uploaded image is, from its centre pixel."""
+    img = Image.open(io.BytesIO(base64.b64decode(data_url.split(",", 1)[1]))).convert("L")
+    pixel = img.getpixel((img.width // 2, img.height // 2))
+    return min(SHADES, key=lambda name: abs(SHADES[name] - pixel))
+
+
+class FakeOpenAI(BaseHTTPRequestHandler):
+    """
+    OCR requests read "Q<n>. Question on the <shade> page [2]" per image;
+    the dark page is slow. Text-only requests get structured_reply.
+    """
+
+    requests = []
+    structured_reply = json.dumps(LLM_PAPER)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        FakeOpenAI.requests.append(body)
+        content = body["messages"][0]["content"]
+        if isinstance(content, list):
+            shades = [_shade(p["image_url"]["url"]) for p in content if p["type"] == "image_url"]
+            if shades == ["dark"]:
+                time.sleep(0.3)  # page 1 finishes last in per-page mode
+            text = "\n".join(f"Q{i}. Question on the {shade} page [2]" for i, shade in enumerate(shades, 1))
+        else:
+            text = FakeOpenAI.structured_reply
+        if body.get("stream"):
+            self._stream(text, body.get("stream_options", {}).get("include_usage"))
+        else:
+            self._json({"id": "x", "object": "chat.completion", "created": 0, "model": body["model"],
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                                     "finish_reason": "stop"}],
+                        "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}})
+
+    def _json(self, value):
+        data = json.dumps(value).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, text, usage):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        chunk = {"id": "x", "object": "chat.completion.chunk", "created": 0, "model": "m"}
+        for i in range(0, len(text), 8):
+            delta = {"choices": [{"index": 0, "delta": {"content": text[i:i + 8]}, "finish_reason": None}]}
+            self.wfile.write(f"data: {json.dumps(dict(chunk, **delta))}\n\n".encode())
+        if usage:
+            final = {"choices": [], "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}}
+            self.wfile.write(f"data: {json.dumps(dict(chunk, **final))}\n\n".encode())
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def base_url():
+    FakeOpenAI.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/v1"
+    server.shutdown()
+
+
+@pytest.fixture
+def pages(tmp_path):
+    paths = []
+    for name, level in SHADES.items():
+        path = tmp_path / f"{name}.jpg"
+        Image.new("RGB", (1200, 1600), (level,) * 3).save(path, "JPEG")
+        paths.append(str(path))
+    return paths
+
+
+def test_single_request_sends_every_page(base_url, pages):
+    text = ocr.extract_text_from_images(pages, "sk-test", base_url=base_url)
+    assert len(FakeOpenAI.requests) == 1
+    assert text.splitlines() == ["Q1. Question on the dark page [2]", "Q2. Question on the grey page [2]",
+                                 "Q3. Question on the light page [2]"]
+
+
+def test_per_page_requests_run_concurrently_and_merge_in_page_order(base_url, pages):
+    stats = []
+    text = ocr.extract_text_from_images(pages, "sk-test", per_page=True, base_url=base_url, image_stats=stats)
+    assert len(FakeOpenAI.requests) == 3
+    assert text == ocr.merge_pages([f"Q1. Question on the {c} page [2]" for c in SHADES])
+    assert [s["size"] for s in stats] == [(768, 1024)] * 3
+
+
+def test_streamed_pages_report_deltas_and_full_pages(base_url, pages):
+    events = list(ocr.stream_text_from_images(pages, "sk-test", per_page=True, base_url=base_url))
+    done = {page: text for event, page, text in events if event == "page"}
+    assert done == {i: f"Q1. Question on the {c} page [2]" for i, c in enumerate(SHADES, 1)}
+    for page, text in done.items():
+        assert "".join(t for event, p, t in events if event == "delta" and p == page) == text
+    assert all(r["stream_options"] == {"include_usage": True} for r in FakeOpenAI.requests)
+
+
+def test_pipeline_is_cached_and_structurers_are_cached_apart(base_url, pages, tmp_path):
+    cache = OCRCache(str(tmp_path / "cache"))
+    local, raw = ocr.process_images_to_structured(pages, "sk-test", base_url=base_url, cache=cache)
+    assert len(FakeOpenAI.requests) == 1  # OCR only: the rule structurer handled the text
+    assert [q["text"] for q in local["sections"][0]["questions"]] == [
+        f"Question on the {c} page" for c in SHADES]
+
+    again, raw_again = ocr.process_images_to_structured(pages, "sk-test", base_url=base_url, cache=cache)
+    assert (again, raw_again) == (local, raw)
+    assert len(FakeOpenAI.requests) == 1
+
+    llm, _ = ocr.process_images_to_structured(pages, "sk-test", base_url=base_url, cache=cache, fast_path=False)
+    assert llm["exam_title"] == "From the model"
+    assert len(FakeOpenAI.requests) == 2  # raw text from cache, structuring from the model
+
+
+def test_malformed_structuring_reply_is_repaired_without_another_call(base_url, monkeypatch):
+    truncated = "```json\n" + json.dumps(LLM_PAPER)[:-3]
+    monkeypatch.setattr(FakeOpenAI, "structured_reply", truncated)
+    assert ocr.structure_extracted_text("Q1. x [1]", "sk-test", base_url=base_url, fast_path=False) == LLM_PAPER
+    assert len(FakeOpenAI.requests) == 1
+
+
+def test_streamed_pipeline_yields_progress_and_result(base_url, pages, tmp_path):
+    events = list(ocr.stream_images_to_structured(pages, "sk-test", base_url=base_url,
+                                                  cache=OCRCache(str(tmp_path / "cache"))))
+    kinds = [event for event, _ in events]
+    assert kinds.index("ocr_delta") < kinds.index("ocr_done") < kinds.index("section") < kinds.index("result")
+    structured, raw = events[-1][1]
+    assert [event for event in kinds if event != "ocr_delta"] == ["page_done", "ocr_done", "section", "result"]
+    assert len(structured["sections"][0]["questions"]) == 3
+    assert "dark page" in raw
+
+
+def test_streamed_pipeline_can_skip_the_rule_structurer(base_url, pages, tmp_path):
+    events = list(ocr.stream_images_to_structured(pages, "sk-test", base_url=base_url, fast_path=False,
+                                                  cache=OCRCache(str(tmp_path / "cache"))))
+    kinds = [event for event, _ in events]
+    assert kinds.index("ocr_done") < kinds.index("structure_delta") < kinds.index("section") < kinds.index("result")
+    assert events[-1][1][0]["exam_title"] == "From the model"
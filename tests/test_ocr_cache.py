@@ -0,0 +1,34 @@
+import os
+import time
+
+from ocr_cache import OCRCache, make_key
+
+
+def _age(cache: OCRCache, key: str, seconds: float) -> None:
+    t = time.time() - seconds
+    os.utime(cache._path(key), (t, t))
+
+
+def test_put_get_and_miss(tmp_path):
+    cache = OCRCache(str(tmp_path), max_bytes=1 << 20)
+    cache.put("k", {"raw_text": "hello"})
+    assert cache.get("k") == {"raw_text": "hello"}
+    assert cache.get("missing") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entries_are_evicted_over_budget(tmp_path):
+    value = {"raw_text": "x" * 1000}
+    cache = OCRCache(str(tmp_path), max_bytes=3500)
+    for i, key in enumerate(["a", "b", "c"]):
+        cache.put(key, value)
+        _age(cache, key, 100 - i)      # a oldest, c newest
+    assert cache.get("a") is not None  # a is now the most recently used
+    cache.put("d", value)              # over budget: b, the least recently used, goes
+    assert {e["key"] for e in cache.entries()} == {"a", "c", "d"}
+    assert cache.stats()["bytes"] <= 3500
+
+
+def test_make_key_separates_kinds_and_parts():
+    assert make_key("ocr", "a", "b") != make_key("structured", "a", "b")
+    assert make_key("ocr", "a", "b") != make_key("ocr", "ab")
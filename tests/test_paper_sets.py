@@ -0,0 +1,57 @@
+from paper_sets import answer_key, make_sets
+
+
+def _mcq(number: str, stem: str) -> dict:
+    return {"number": number, "text": stem, "marks": "1",
+            "subparts": [f"(a) {stem}-a", f"(b) {stem}-b", f"(c) {stem}-c", f"(d) {stem}-d"]}
+
+
+def _answer_text(paper_set, section: int, number: str, letter: str) -> str:
+    q = next(q for q in paper_set.structured_data["sections"][section - 1]["questions"] if q["number"] == number)
+    return next(sp for sp in q["subparts"] if sp.startswith(f"({letter})")).split(" ", 1)[1]
+
+
+def test_sets_are_deterministic_and_keep_numbers_in_place():
+    data = {"exam_title": "T", "sections": [{"section_name": "A", "questions": [_mcq(str(n), f"q{n}") for n in range(1, 6)]}]}
+    a1, a2 = make_sets(data, 2, seed=7), make_sets(data, 2, seed=7)
+    assert [s.structured_data for s in a1] == [s.structured_data for s in a2]
+    assert a1[0].structured_data["exam_title"] == "T (Set A)"
+    assert [q["number"] for q in a1[1].structured_data["sections"][0]["questions"]] == ["1", "2", "3", "4", "5"]
+
+
+def test_answer_keys_follow_shuffled_questions_and_options():
+    data = {"sections": [{"section_name": "A", "questions": [_mcq("1", "x"), _mcq("2", "y"), _mcq("3", "z")]}]}
+    master = {"1": "a", "2": "(b)", "3": "d"}
+    correct = {"x": "x-a", "y": "y-b", "z": "z-d"}
+    sets = make_sets(data, 3, seed=1)
+    keys = answer_key(sets, master)
+    for s in sets:
+        for number, letter in keys[s.label].items():
+            text = _answer_text(s, 1, number, letter)
+            assert text == correct[text.split("-")[0]]
+
+
+def test_numbering_restarting_per_section_keeps_answers_apart():
+    data = {"sections": [
+        {"section_name": "A", "questions": [_mcq("1", "w"), _mcq("2", "x")]},
+        {"section_name": "B", "questions": [_mcq("1", "y"), _mcq("2", "z")]},
+    ]}
+    master = {"1/1": "a", "1/2": "b", "2/1": "c", "2/2": "d"}
+    correct = {"w": "w-a", "x": "x-b", "y": "y-c", "z": "z-d"}
+    sets = make_sets(data, 3, seed=5)
+    keys = answer_key(sets, master)
+    for s in sets:
+        assert len(keys[s.label]) == 4
+        for qualified, letter in keys[s.label].items():
+            section, number = qualified.split("/")
+            text = _answer_text(s, int(section), number, letter)
+            assert text == correct[text.split("-")[0]]
+
+
+def test_master_key_by_question_id():
+    data = {"sections": [{"section_name": "A", "questions": [dict(_mcq("1", "x"), id="qx"), dict(_mcq("2", "y"), id="qy")]}]}
+    sets = make_sets(data, 2, seed=3)
+    keys = answer_key(sets, {"qx": "c", "qy": "a"})
+    for s in sets:
+        for number, letter in keys[s.label].items():
+            assert _answer_text(s, 1, number, letter) in ("x-c", "y-a")
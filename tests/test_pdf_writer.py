@@ -0,0 +1,67 @@
+import logging
+
+import pytest
+
+import pdf_writer
+from pdf_writer import create_question_paper_pdf, devanagari_font_missing
+
+HINDI = "भारत की राजधानी क्या है?"
+PAPER = {"exam_title": "Unit Test", "sections": [{"section_name": "Section A", "questions": [
+    {"number": "1", "text": HINDI, "marks": "2", "subparts": ["(a) दिल्ली", "(b) Mumbai"]}]}]}
+ENGLISH = {"exam_title": "Unit Test", "sections": [{"section_name": "Section A", "questions": [
+    {"number": "1", "text": "What is the capital of India?", "marks": "2"}]}]}
+
+
+def _devanagari_font(path, text: str) -> str:
+    """A TrueType font with a box glyph for every character in text, punctuation included."""
+    FontBuilder = pytest.importorskip("fontTools.fontBuilder").FontBuilder
+    from fontTools.pens.ttGlyphPen import TTGlyphPen
+
+    def box():
+        pen = TTGlyphPen(None)
+        pen.moveTo((50, 0))
+        for point in [(50, 700), (450, 700), (450, 0)]:
+            pen.lineTo(point)
+        pen.closePath()
+        return pen.glyph()
+
+    cmap = {ord(c): f"uni{ord(c):04X}" for c in text if not c.isspace()}
+    names = [".notdef", "space"] + sorted(set(cmap.values()))
+    fb = FontBuilder(1000, isTTF=True)
+    fb.setupGlyphOrder(names)
+    fb.setupCharacterMap({32: "space", **cmap})
+    fb.setupGlyf({name: TTGlyphPen(None).glyph() if name == "space" else box() for name in names})
+    fb.setupHorizontalMetrics({name: (500, 50) for name in names})
+    fb.setupHorizontalHeader(ascent=800, descent=-200)
+    fb.setupNameTable({"familyName": "Test Devanagari", "styleName": "Regular",
+                       "psName": "TestDevanagari-Regular"})
+    fb.setupOS2()
+    fb.setupPost()
+    fb.save(str(path))
+    return str(path)
+
+
+@pytest.fixture
+def fonts(monkeypatch):
+    """Look fonts up again for this test, and again after it."""
+    pytest.importorskip("reportlab")
+    monkeypatch.setattr(pdf_writer, "_fonts", None)
+    return monkeypatch
+
+
+def test_hindi_question_embeds_the_devanagari_font(fonts, tmp_path):
+    fonts.setenv("PRASHNAPRO_DEVANAGARI_FONT", _devanagari_font(tmp_path / "deva.ttf", HINDI + "दिल्ली"))
+    pdf = create_question_paper_pdf(PAPER).getvalue()
+    assert b"/BaseFont /" in pdf and b"TestDevanagari-Regular" in pdf
+    assert not devanagari_font_missing(PAPER)
+
+
+def test_missing_devanagari_font_is_logged_and_reported(fonts, caplog):
+    fonts.setenv("PRASHNAPRO_DEVANAGARI_FONT", "/nonexistent/font.ttf")
+    fonts.setattr(pdf_writer, "DEVANAGARI_FONTS", [])
+    with caplog.at_level(logging.WARNING, logger="pdf_writer"):
+        assert devanagari_font_missing(PAPER)
+    assert "No Devanagari font found" in caplog.text
+    assert not devanagari_font_missing(ENGLISH)
+    assert devanagari_font_missing(ENGLISH, school_name="केंद्रीय विद्यालय")
+    assert create_question_paper_pdf(PAPER).getvalue().startswith(b"%PDF")
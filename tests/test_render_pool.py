@@ -0,0 +1,41 @@
+import io
+import pickle
+import zipfile
+
+from PIL import Image
+
+from render_pool import RenderJob, _share_images, render_papers
+
+PAPER = {"exam_title": "Unit Test", "sections": [{"section_name": "Section A", "questions": [
+    {"id": "q1", "number": "1", "text": "Label the diagram.", "marks": "2"}]}]}
+
+
+def _png(colour: str) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (300, 200), colour).save(buf, "PNG")
+    return buf.getvalue()
+
+
+def test_shared_logo_is_sent_once_not_per_job():
+    logo, diagram = _png("red"), _png("blue")
+    jobs = [RenderJob(PAPER, logo_path=logo, question_images={"q1": diagram}, name=f"job{i}") for i in range(4)]
+    shared, images = _share_images(jobs)
+    assert sorted(images.values()) == sorted([logo, diagram])
+    assert logo not in pickle.dumps(shared) and diagram not in pickle.dumps(shared)
+    assert len({job.logo_path for job in shared}) == 1
+
+
+def _media(docx: bytes) -> set:
+    with zipfile.ZipFile(io.BytesIO(docx)) as zf:
+        return {zf.read(name) for name in zf.namelist() if name.startswith("word/media/")}
+
+
+def test_workers_render_shared_images_like_a_serial_run():
+    logo, diagram = _png("red"), _png("blue")
+    jobs = [RenderJob(PAPER, logo_path=logo, question_images={"q1": diagram}) for _ in range(2)]
+    [serial] = render_papers(jobs[:1], workers=1)
+    expected = _media(serial.data)
+    assert len(expected) == 2
+    for result in render_papers(jobs, workers=2):
+        assert result.ok, result.error
+        assert _media(result.data) == expected
@@ -0,0 +1,49 @@
+from rule_structurer import DEFAULT_MIN_CONFIDENCE, structure_text_locally
+
+RAW = """Half Yearly Examination
+Class: IX   Subject: Science
+Time: 3 Hours   Max Marks: 20
+General Instructions:
+1. All questions are compulsory.
+Section A
+Q1. What is photosynthesis? [2]
+Q2. Choose the correct option: [1]
+(a) Oxygen (b) Nitrogen (c) Carbon (d) Hydrogen
+Section B
+Q3. Explain Newton's laws. [5]
+(a) First law
+(b) Second law
+"""
+
+
+def test_well_formed_paper_is_structured_with_high_confidence():
+    data, confidence = structure_text_locally(RAW)
+    assert confidence >= DEFAULT_MIN_CONFIDENCE
+    assert data["exam_title"] == "Half Yearly Examination"
+    assert (data["class"], data["subject"], data["time"], data["total_marks"]) == ("IX", "Science", "3 Hours", "20")
+    assert data["instructions"] == ["All questions are compulsory."]
+    assert [s["section_name"] for s in data["sections"]] == ["Section A", "Section B"]
+
+    q1, q2 = data["sections"][0]["questions"]
+    assert (q1["number"], q1["text"], q1["marks"], q1["subparts"]) == ("1", "What is photosynthesis?", "2", [])
+    assert q2["subparts"] == ["(a) Oxygen", "(b) Nitrogen", "(c) Carbon", "(d) Hydrogen"]
+    assert data["sections"][1]["questions"][0]["subparts"] == ["(a) First law", "(b) Second law"]
+
+
+def test_page_markers_do_not_break_a_paper():
+    raw = RAW.replace("Section B", "--- Page 2 ---\nSection B")
+    data, confidence = structure_text_locally(raw)
+    assert confidence >= DEFAULT_MIN_CONFIDENCE
+    assert len(data["sections"]) == 2
+
+
+def test_numbering_may_restart_in_each_section():
+    raw = "\n".join(f"Section {s}\nQ1. First question of {s}. [1]\nQ2. Second question of {s}. [1]" for s in "ABC")
+    data, confidence = structure_text_locally(raw)
+    assert confidence >= DEFAULT_MIN_CONFIDENCE
+    assert [[q["number"] for q in s["questions"]] for s in data["sections"]] == [["1", "2"]] * 3
+
+
+def test_unstructured_text_has_low_confidence():
+    _, confidence = structure_text_locally("random scribbles\nno structure here at all")
+    assert confidence < DEFAULT_MIN_CONFIDENCE
@@ -0,0 +1,103 @@
+import collections
+import types
+
+import openai
+import pytest
+
+import scheduler
+from scheduler import RateLimitScheduler, _Bucket, create_chat_completion, estimate_tokens, session
+
+
+def test_bucket_refills_at_its_per_minute_rate():
+    bucket = _Bucket(60)
+    bucket.level = 0
+    bucket.updated = 100.0
+    bucket.refill(110.0)
+    assert bucket.level == pytest.approx(10)
+    assert bucket.wait_for(15) == pytest.approx(5)
+    bucket.refill(1000.0)
+    assert bucket.level == 60  # capped at capacity
+
+
+def test_estimate_counts_text_images_and_output_budget():
+    messages = [{"role": "user", "content": [{"type": "text", "text": "x" * 400},
+                                             {"type": "image_url", "image_url": {"url": "data:"}}]}]
+    assert estimate_tokens(messages, 1000) == 1000 + 100 + scheduler.IMAGE_TOKENS
+
+
+def test_acquire_reserves_and_settle_returns_unused_tokens():
+    s = RateLimitScheduler(rpm=100, tpm=10000)
+    s.acquire(4000)
+    assert s.metrics()["tokens_available"] == pytest.approx(6000, abs=5)
+    s.settle(4000, 1000)
+    m = s.metrics()
+    assert m["tokens_available"] == pytest.approx(9000, abs=5)
+    assert (m["tokens_estimated"], m["tokens_used"]) == (4000, 1000)
+
+
+def test_sessions_are_served_round_robin():
+    s = RateLimitScheduler(rpm=60, tpm=10000)
+    tickets = []
+    for sess in ("a", "a", "a", "b"):
+        ticket = next(s._ticket_ids)
+        s._queues.setdefault(sess, collections.deque()).append((ticket, 1))
+        tickets.append(ticket)
+    s.requests.level = 2  # budget for two requests: one of a's, then b's, not two of a's
+    s._dispatch()
+    assert s._granted == {tickets[0], tickets[3]}
+
+
+def test_transient_errors_are_retried(monkeypatch):
+    monkeypatch.setattr(scheduler.time, "sleep", lambda seconds: None)
+    s = RateLimitScheduler(rpm=100, tpm=10000, max_retries=3)
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise openai.APITimeoutError(request=openai.DefaultHttpxClient().build_request("POST", "http://test"))
+        return "ok"
+
+    assert s.call(flaky, 10) == "ok"
+    assert s.metrics()["retries"] == 2
+
+
+def test_non_transient_errors_are_not_retried():
+    s = RateLimitScheduler(rpm=100, tpm=10000)
+    with pytest.raises(KeyError):
+        s.call(lambda: {}["x"], 10)
+    assert s.metrics()["failures"] == 1
+
+
+def _chunk(text=None, usage=None):
+    choices = [types.SimpleNamespace(delta=types.SimpleNamespace(content=text))] if text else []
+    return types.SimpleNamespace(choices=choices, usage=usage)
+
+
+def _fake_client(api_key: str, send_usage: bool):
+    class Completions:
+        kwargs = None
+
+        def create(self, **kwargs):
+            Completions.kwargs = kwargs
+            yield _chunk("x" * 400)
+            if send_usage:
+                yield _chunk(usage=types.SimpleNamespace(prompt_tokens=10, completion_tokens=100,
+                                                         total_tokens=110))
+    return types.SimpleNamespace(api_key=api_key, chat=types.SimpleNamespace(completions=Completions()))
+
+
+@pytest.mark.parametrize("send_usage, used", [(True, 110), (False, 100 + 100)])
+def test_streamed_reservations_are_settled(send_usage, used):
+    client = _fake_client(f"stream-{send_usage}", send_usage)
+    s = scheduler.configure_scheduler(client.api_key, rpm=100, tpm=10000)
+    messages = [{"role": "user", "content": "p" * 400}]
+    with session("t"):
+        text = "".join(c.choices[0].delta.content
+                       for c in create_chat_completion(client, model="m", messages=messages,
+                                                       max_tokens=4000, stream=True) if c.choices)
+    assert len(text) == 400
+    assert client.chat.completions.kwargs["stream_options"] == {"include_usage": True}
+    m = s.metrics()
+    assert m["tokens_used"] == used
+    assert m["tokens_available"] == pytest.approx(10000 - used, abs=5)
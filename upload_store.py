@@ -0,0 +1,263 @@
+"""
+Content-addressed file store for uploads and generated papers.
+
+Page photos, logos and question images go to uploads/, generated .docx
+and .pdf files to output/, each as <sha256>.<ext>. Session state keeps
+only these handles, so a session's memory stays flat however many images
+it has, and the same photo uploaded twice is stored once. Each session
+has a small manifest of the handles it uses; release() ("Start over")
+deletes the files no other session still references. Files untouched for
+longer than the TTL, and the least recently used ones beyond the size
+quota, are evicted on every put.
+
+Budgets: PRASHNAPRO_UPLOAD_MAX_BYTES / PRASHNAPRO_UPLOAD_TTL (default
+500 MB, 6 hours) and PRASHNAPRO_OUTPUT_MAX_BYTES / PRASHNAPRO_OUTPUT_TTL
+(default 200 MB, 6 hours).
+
+Inspect or clean up from the command line:
+    python upload_store.py stats
+    python upload_store.py evict
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+UPLOAD_DIR = os.environ.get("PRASHNAPRO_UPLOAD_DIR", os.path.join(BASE_DIR, "uploads"))
+OUTPUT_DIR = os.environ.get("PRASHNAPRO_OUTPUT_DIR", os.path.join(BASE_DIR, "output"))
+UPLOAD_MAX_BYTES = int(os.environ.get("PRASHNAPRO_UPLOAD_MAX_BYTES", 500 * 1024 * 1024))
+UPLOAD_TTL = int(os.environ.get("PRASHNAPRO_UPLOAD_TTL", 6 * 3600))
+OUTPUT_MAX_BYTES = int(os.environ.get("PRASHNAPRO_OUTPUT_MAX_BYTES", 200 * 1024 * 1024))
+OUTPUT_TTL = int(os.environ.get("PRASHNAPRO_OUTPUT_TTL", 6 * 3600))
+
+# Only names of this form are ever read or deleted, so other files in the
+# directory (batch.py output, .gitkeep) are left alone
+_HANDLE = re.compile(r"^[0-9a-f]{64}(\.[a-z0-9]{1,5})?$")
+_SESSION = re.compile(r"^[0-9A-Za-z_-]{1,64}$")
+SESSIONS_DIR = ".sessions"
+
+
+def _ext(ext: str) -> str:
+    ext = (ext or "").lower().lstrip(".")
+    return f".{ext}" if re.fullmatch(r"[a-z0-9]{1,5}", ext) else ""
+
+
+class BlobStore:
+    """Files named by content hash, bounded by total size and age."""
+
+    def __init__(self, directory: str, max_bytes: int, ttl_seconds: float):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+    # ─── Handles ───────────────────────────────────────────────────────────
+
+    def put(self, data, ext: str = "", session_id: str = None) -> str:
+        """
+        Store bytes (or a binary file-like object, e.g. a Streamlit
+        UploadedFile) and return its handle. Storing the same content again
+        just refreshes it.
+        """
+        if not isinstance(data, (bytes, bytearray, memoryview)):
+            data = data.getvalue() if hasattr(data, "getvalue") else data.read()
+        handle = hashlib.sha256(data).hexdigest() + _ext(ext)
+        path = os.path.join(self.directory, handle)
+        os.makedirs(self.directory, exist_ok=True)
+        if os.path.exists(path):
+            os.utime(path, None)
+        else:
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+        if session_id:
+            self._reference(session_id, handle)
+        self.evict()
+        return handle
+
+    def path(self, handle: str) -> str:
+        """Filesystem path of a handle (marked as recently used), or None if it is gone."""
+        if not handle or not _HANDLE.match(handle):
+            return None
+        path = os.path.join(self.directory, handle)
+        try:
+            os.utime(path, None)
+        except OSError:
+            return None
+        return path
+
+    def read(self, handle: str) -> bytes:
+        path = self.path(handle)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    # ─── Sessions ──────────────────────────────────────────────────────────
+
+    def _manifest(self, session_id: str) -> str:
+        if not _SESSION.match(session_id):
+            raise ValueError(f"Bad session id {session_id!r}")
+        return os.path.join(self.directory, SESSIONS_DIR, f"{session_id}.json")
+
+    def _load(self, manifest: str) -> list:
+        try:
+            with open(manifest, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def _reference(self, session_id: str, handle: str) -> None:
+        manifest = self._manifest(session_id)
+        with self._lock:
+            handles = self._load(manifest)
+            if handle in handles:
+                os.utime(manifest, None)
+                return
+            os.makedirs(os.path.dirname(manifest), exist_ok=True)
+            with open(manifest + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(handles + [handle], f)
+            os.replace(manifest + ".tmp", manifest)
+
+    def _referenced(self, exclude: str = None) -> set:
+        """Handles used by any live session manifest."""
+        directory = os.path.join(self.directory, SESSIONS_DIR)
+        if not os.path.isdir(directory):
+            return set()
+        handles = set()
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.endswith(".json") and path != exclude:
+                handles.update(self._load(path))
+        return handles
+
+    def release(self, session_id: str) -> int:
+        """Forget a session and delete its files unless another session uses them. Returns files removed."""
+        manifest = self._manifest(session_id)
+        with self._lock:
+            handles = self._load(manifest)
+            keep = self._referenced(exclude=manifest)
+            try:
+                os.remove(manifest)
+            except OSError:
+                pass
+        return sum(self._remove(h) for h in handles if h not in keep)
+
+    # ─── Eviction ──────────────────────────────────────────────────────────
+
+    def _remove(self, handle: str) -> bool:
+        if not _HANDLE.match(handle):
+            return False
+        try:
+            os.remove(os.path.join(self.directory, handle))
+            return True
+        except OSError:
+            return False
+
+    def entries(self) -> list:
+        """Stored files as dicts (handle, bytes, last_used), most recent first."""
+        if not os.path.isdir(self.directory):
+            return []
+        out = []
+        for name in os.listdir(self.directory):
+            if not _HANDLE.match(name):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            out.append({"handle": name, "bytes": st.st_size, "last_used": st.st_mtime})
+        out.sort(key=lambda e: e["last_used"], reverse=True)
+        return out
+
+    def evict(self) -> int:
+        """Drop expired files, then least recently used ones until under quota. Returns files removed."""
+        cutoff = time.time() - self.ttl_seconds
+        removed = 0
+        sessions = os.path.join(self.directory, SESSIONS_DIR)
+        if os.path.isdir(sessions):
+            for name in os.listdir(sessions):
+                path = os.path.join(sessions, name)
+                try:
+                    if os.stat(path).st_mtime < cutoff:
+                        os.remove(path)
+                except OSError:
+                    pass
+
+        entries = self.entries()
+        total = sum(e["bytes"] for e in entries)
+        # The most recent file always stays, even if it alone is over quota
+        while entries and ((total > self.max_bytes and len(entries) > 1) or entries[-1]["last_used"] < cutoff):
+            oldest = entries.pop()
+            removed += self._remove(oldest["handle"])
+            total -= oldest["bytes"]
+        return removed
+
+    def stats(self) -> dict:
+        entries = self.entries()
+        sessions = os.path.join(self.directory, SESSIONS_DIR)
+        return {
+            "directory": self.directory,
+            "files": len(entries),
+            "bytes": sum(e["bytes"] for e in entries),
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "sessions": len(os.listdir(sessions)) if os.path.isdir(sessions) else 0,
+        }
+
+
+_uploads = None
+_outputs = None
+
+
+def uploads() -> BlobStore:
+    """Process-wide store for page photos, logos and question images."""
+    global _uploads
+    if _uploads is None:
+        _uploads = BlobStore(UPLOAD_DIR, UPLOAD_MAX_BYTES, UPLOAD_TTL)
+    return _uploads
+
+
+def outputs() -> BlobStore:
+    """Process-wide store for generated .docx and .pdf files."""
+    global _outputs
+    if _outputs is None:
+        _outputs = BlobStore(OUTPUT_DIR, OUTPUT_MAX_BYTES, OUTPUT_TTL)
+    return _outputs
+
+
+def release_session(session_id: str) -> int:
+    """Clean up everything a session stored ("Start over")."""
+    return uploads().release(session_id) + outputs().release(session_id)
+
+
+def main(argv: list) -> int:
+    if not argv or argv[0] not in ("stats", "evict"):
+        print("Usage: python upload_store.py stats|evict")
+        return 2
+    for store in (uploads(), outputs()):
+        if argv[0] == "stats":
+            print(json.dumps(store.stats(), indent=2))
+        else:
+            print(f"{store.directory}: removed {store.evict()} files")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))